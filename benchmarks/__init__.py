@@ -0,0 +1,5 @@
+"""Benchmarks for the Flaskr application.
+
+Run ``python -m benchmarks run`` to time the main pages against a synthetic
+dataset and ``python -m benchmarks compare`` to compare two result files.
+"""
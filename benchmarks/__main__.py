@@ -0,0 +1,173 @@
+"""Command line entry point: ``python -m benchmarks``."""
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess  # noqa: S404
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import click
+
+from benchmarks.dataset import generate
+from benchmarks.runner import run_scenario, SCENARIOS
+from flaskr import create_app
+
+#: The metrics compared between runs, and whether higher is better.
+METRICS = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def git_commit() -> Optional[str]:
+    """Return the commit being benchmarked, if this is a git checkout.
+
+    Returns:
+        Optional[str]: The commit hash.
+    """
+    try:
+        return subprocess.run(  # noqa: S603, S607
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_config(values: Tuple[str, ...]) -> Dict[str, Any]:
+    """Parse ``KEY=VALUE`` config overrides; values are read as JSON if they can be.
+
+    Args:
+        values (Tuple[str, ...]): The overrides.
+
+    Returns:
+        Dict[str, Any]: The config mapping.
+
+    Raises:
+        BadParameter: If an override has no ``=``.
+    """
+    config: Dict[str, Any] = {}
+    for item in values:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise click.BadParameter(f"{item!r} is not KEY=VALUE", param_hint="-c")
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value
+    return config
+
+
+@click.group()
+def cli() -> None:
+    """Benchmark the Flaskr application."""
+
+
+@cli.command()
+@click.option("--users", default=100, show_default=True)
+@click.option("--posts", default=10000, show_default=True)
+@click.option("--body-size", default=1000, show_default=True)
+@click.option("--requests", default=200, show_default=True, help="Per scenario.")
+@click.option("--warmup", default=10, show_default=True, help="Per scenario.")
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(SCENARIOS),
+    help="Run only these scenarios.",
+)
+@click.option("-c", "--config", "overrides", multiple=True, help="KEY=VALUE")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="JSON file.")
+def run(
+    users: int,
+    posts: int,
+    body_size: int,
+    requests: int,
+    warmup: int,
+    seed: int,
+    scenarios: Tuple[str, ...],
+    overrides: Tuple[str, ...],
+    output: Optional[str],
+) -> None:
+    """Generate a dataset, time each scenario and save the results."""
+    config: Dict[str, Any] = parse_config(overrides)
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            "users": users,
+            "posts": posts,
+            "body_size": body_size,
+            "requests": requests,
+            "warmup": warmup,
+            "seed": seed,
+            "config": config,
+        },
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as folder:
+        app = create_app(
+            {
+                "DATABASE": os.path.join(folder, "bench.sqlite"),
+                "METRICS_DIR": os.path.join(folder, "metrics"),
+                "JINJA_BYTECODE_CACHE": os.path.join(folder, "jinja-cache"),
+                **config,
+            }
+        )
+        generate(app, users, posts, body_size, seed)
+
+        for scenario in [s for s in SCENARIOS if s in scenarios or not scenarios]:
+            summary: Dict[str, Any] = run_scenario(app, scenario, requests, warmup)
+            results["scenarios"][scenario] = summary
+            click.echo(
+                f"{scenario:<8} {summary['rps']:9.1f} req/s"
+                f"  p50 {summary.get('p50_ms', 0):7.2f} ms"
+                f"  p99 {summary.get('p99_ms', 0):7.2f} ms"
+                f"  errors {summary['errors']}"
+            )
+
+    if output is None:
+        commit: str = (results["commit"] or "unknown")[:12]
+        output = os.path.join(".benchmarks", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    click.echo(f"Saved {output}")
+
+
+@cli.command()
+@click.argument("baseline", type=click.File("r"))
+@click.argument("candidate", type=click.File("r"))
+@click.option(
+    "--threshold", default=10.0, show_default=True, help="Allowed regression in %."
+)
+def compare(baseline: Any, candidate: Any, threshold: float) -> None:
+    """Compare two result files; fail if CANDIDATE regressed past the threshold."""
+    old: Dict[str, Any] = json.load(baseline)["scenarios"]
+    new: Dict[str, Any] = json.load(candidate)["scenarios"]
+    regressed: bool = False
+
+    for scenario in [s for s in SCENARIOS if s in old and s in new]:
+        for metric, higher_is_better in METRICS.items():
+            if not old[scenario].get(metric) or metric not in new[scenario]:
+                continue
+            change: float = (new[scenario][metric] / old[scenario][metric] - 1) * 100
+            worse: bool = (
+                -change > threshold if higher_is_better else change > threshold
+            )
+            regressed = regressed or worse
+            click.echo(
+                f"{scenario:<8} {metric:<7} {old[scenario][metric]:10.2f}"
+                f" -> {new[scenario][metric]:10.2f} ({change:+6.1f}%)"
+                + ("  REGRESSION" if worse else "")
+            )
+
+    if regressed:
+        raise click.ClickException(f"Regression of more than {threshold}%")
+
+
+if __name__ == "__main__":
+    cli()
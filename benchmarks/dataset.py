@@ -0,0 +1,92 @@
+"""Generate synthetic datasets through flaskr.db."""
+from datetime import datetime, timedelta
+import random
+from typing import Any, Iterator, Tuple
+
+from flask import Flask
+
+from flaskr.db import get_db, init_db
+from flaskr.hashing import get_hasher
+from flaskr.render import render_post
+
+#: The password of every generated user.
+PASSWORD = "benchmark"
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor"
+    " incididunt ut labore et dolore magna aliqua enim ad minim veniam quis"
+    " nostrud exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+
+def make_body(rng: random.Random, size: int) -> str:
+    """Make a body of roughly ``size`` characters split into paragraphs.
+
+    Args:
+        rng (random.Random): The random generator.
+        size (int): The target length.
+
+    Returns:
+        str: The body.
+    """
+    words = []
+    length: int = 0
+    while length < size:
+        word: str = rng.choice(_WORDS)
+        if rng.random() < 0.02:
+            word += "\n\n"
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def _posts(
+    rng: random.Random, users: int, posts: int, body_size: int, excerpt_length: int
+) -> Iterator[Tuple[Any, ...]]:
+    start = datetime(2020, 1, 1)
+    for n in range(posts):
+        # Bodies vary between half and one and a half times the target size.
+        size: int = int(body_size * rng.uniform(0.5, 1.5))
+        created = start + timedelta(seconds=n * 60 + rng.randrange(60))
+        body: str = make_body(rng, size)
+        yield (
+            f"Post {n} " + " ".join(rng.sample(_WORDS, 4)),
+            body,
+            *render_post(body, excerpt_length),
+            n % users + 1,
+            created.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+
+def generate(
+    app: Flask, users: int, posts: int, body_size: int = 1000, seed: int = 0
+) -> None:
+    """Create a fresh database holding the given number of users and posts.
+
+    Every user has the password :data:`PASSWORD`, hashed once with the app's
+    configured method, and posts are shared out between the users in turn.
+
+    Args:
+        app (Flask): The application whose database is filled.
+        users (int): The number of users, named ``user1`` onwards.
+        posts (int): The number of posts.
+        body_size (int): The average body length in characters.
+        seed (int): The random seed, so runs are reproducible.
+    """
+    rng = random.Random(seed)
+
+    with app.app_context():
+        init_db()
+        db = get_db()
+        pwhash: str = get_hasher().hash(PASSWORD)
+        db.executemany(
+            "INSERT INTO user (username, password) VALUES (?, ?)",
+            ((f"user{n}", pwhash) for n in range(1, users + 1)),
+        )
+        db.executemany(
+            "INSERT INTO post (title, body, excerpt, body_html, author_id, created)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            _posts(rng, users, posts, body_size, app.config["EXCERPT_LENGTH"]),
+        )
+        db.commit()
+        db.execute("ANALYZE")
@@ -0,0 +1,118 @@
+"""Time the main pages of the application through the Flask test client."""
+import time
+from typing import Any, Callable, Dict, List
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from benchmarks.dataset import PASSWORD
+from flaskr.db import get_db
+from flaskr.loadtest import percentile
+
+#: The scenarios, in the order they run. Later ones change the data. The
+#: anonymous ``index`` requests are served from the page cache after the
+#: first; ``uncached`` gives each request its own URL, so every one reads
+#: the posts and renders the template.
+SCENARIOS = ("index", "uncached", "api", "login", "create", "update", "delete")
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    """Summarize the latencies of one scenario, in milliseconds.
+
+    Args:
+        latencies (List[float]): The latency of each request, in seconds.
+        elapsed (float): The wall time of all the requests.
+        errors (int): How many requests got an unexpected status.
+
+    Returns:
+        Dict[str, Any]: The request count, errors, rate and distribution.
+    """
+    ordered: List[float] = sorted(latencies)
+    if not ordered:
+        return {"requests": 0, "errors": errors, "rps": 0.0}
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": len(ordered) / elapsed,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p90_ms": percentile(ordered, 0.90) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _own_posts(app: Flask, count: int) -> List[int]:
+    with app.app_context():
+        return [
+            row[0]
+            for row in get_db().execute(
+                "SELECT id FROM post WHERE author_id = 1 ORDER BY id DESC LIMIT ?",
+                (count,),
+            )
+        ]
+
+
+def _requests(app: Flask, client: FlaskClient, scenario: str, count: int) -> List[Any]:
+    login: Dict[str, str] = {"username": "user1", "password": PASSWORD}
+
+    if scenario == "index":
+        return [lambda: client.get("/")] * count
+    if scenario == "uncached":
+        return [lambda n=n: client.get(f"/?n={n}") for n in range(count)]
+    if scenario == "api":
+        return [lambda: client.get("/api/posts")] * count
+    if scenario == "login":
+        return [lambda: client.post("/auth/login", data=login)] * count
+
+    client.post("/auth/login", data=login)
+    if scenario == "create":
+        return [
+            lambda n=n: client.post("/create", data={"title": f"new {n}", "body": "x"})
+            for n in range(count)
+        ]
+
+    ids: List[int] = _own_posts(app, count)
+    if scenario == "update":
+        return [
+            lambda id=ids[n % len(ids)], n=n: client.post(
+                f"/{id}/update", data={"title": f"updated {n}", "body": "y"}
+            )
+            for n in range(count)
+        ]
+    return [lambda id=id: client.post(f"/{id}/delete") for id in ids]
+
+
+def run_scenario(app: Flask, scenario: str, count: int, warmup: int) -> Dict[str, Any]:
+    """Run one scenario and summarize it.
+
+    Responses other than 200, 302 and 304 count as errors.
+
+    Args:
+        app (Flask): The application, holding a generated dataset.
+        scenario (str): One of :data:`SCENARIOS`.
+        count (int): The number of timed requests.
+        warmup (int): The number of untimed requests made first.
+
+    Returns:
+        Dict[str, Any]: The summary from :func:`summarize`.
+    """
+    client: FlaskClient = app.test_client()
+    calls: List[Callable[[], Any]] = _requests(app, client, scenario, warmup + count)
+    latencies: List[float] = []
+    errors: int = 0
+
+    for call in calls[:warmup]:
+        call()
+
+    start: float = time.perf_counter()
+    for call in calls[warmup:]:
+        before: float = time.perf_counter()
+        status: int = call().status_code
+        latencies.append(time.perf_counter() - before)
+        errors += status not in (200, 302, 304)
+    elapsed: float = time.perf_counter() - start
+
+    return summarize(latencies, elapsed, errors)
@@ -8,7 +8,7 @@ from nox.sessions import Session
 
 package = "flaskr"
 nox.options.sessions = "lint", "safety", "mypy", "black", "tests"
-locations = "src", "tests", "noxfile.py", "docs/conf.py"
+locations = "src", "tests", "benchmarks", "noxfile.py", "docs/conf.py"
 
 
 def install_with_constraints(session: Session, *args: str, **kwargs: Any) -> None:
@@ -105,6 +105,14 @@ def xdoctest(session: Session) -> None:
     session.run("python", "-m", "xdoctest", package, *args)
 
 
+@nox.session(python=["3.8"])
+def benchmarks(session: Session) -> None:
+    """Run the benchmark suite and save the results under .benchmarks."""
+    args = session.posargs or ["run"]
+    session.run("poetry", "install", "--no-dev", external=True)
+    session.run("python", "-m", "benchmarks", *args)
+
+
 # @nox.session(python=["3.8"])
 # def docs(session: Session) -> None:
 #     """Build the documentation."""
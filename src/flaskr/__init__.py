@@ -1,45 +1,166 @@
 """Use an application factory to create the Flask instance."""
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+from flaskr.startup import StartupTimer, use_lazy_commands
 
 __version__ = "0.1.0"
 
+#: Commands that only run from the command line, by name and import name.
+COMMANDS = {
+    "assets-build": "flaskr.assets:build_command",
+    "export": "flaskr.bulk:export_command",
+    "import": "flaskr.bulk:import_command",
+    "loadtest": "flaskr.loadtest:loadtest_command",
+    "posts-render": "flaskr.db:render_posts_command",
+    "profiles": "flaskr.profiler:profiles_command",
+    "search-rebuild": "flaskr.db:rebuild_search_index_command",
+    "warmup": "flaskr.warmup:warmup_command",
+    "startup-report": "flaskr.coldstart:startup_report_command",
+}
+
 
 def create_app(test_config: Dict[str, Any] = None) -> Flask:
     """Create and configure the app object."""
-    app = Flask(__name__, instance_relative_config=True)
-    app.config.from_mapping(
-        SECRET_KEY="dev", DATABASE=os.path.join(app.instance_path, "flaskr.sqlite")
-    )
+    timer = StartupTimer()
+    with timer.phase("app"):
+        app = Flask(__name__, instance_relative_config=True)
+        app.extensions["flaskr_startup"] = timer
+        use_lazy_commands(app)
 
-    if test_config is None:
-        # Load the instance config, if it exists, when not testing
-        app.config.from_pyfile("config.py", silent=True)
-    else:
-        # Load the test config if passed in
-        app.config.from_mapping(test_config)
+    with timer.phase("config"):
+        _configure(app, test_config)
 
     # Ensure the instance folder exists
-    try:
-        os.makedirs(app.instance_path)
-    except OSError:
-        pass
+    with timer.phase("makedirs"):
+        try:
+            os.makedirs(app.instance_path)
+        except OSError:
+            pass
+
+        # Compiled templates are kept on disk so new workers skip compiling them
+        if app.config["JINJA_BYTECODE_CACHE"]:
+            os.makedirs(app.config["JINJA_BYTECODE_CACHE"], exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+                app.config["JINJA_BYTECODE_CACHE"]
+            )
 
     # A simple page that says hello
     @app.route("/hello")
     def hello() -> str:
         return "<h1>Hello, World!</h1>"
 
-    from . import db
+    # First, so the request timings cover the other hooks
+    with timer.phase("metrics"):
+        from . import metrics
+
+        metrics.init_app(app)
+
+    with timer.phase("db"):
+        from . import db
+
+        db.init_app(app)
+
+    with timer.phase("blueprints"):
+        from . import api, assets, auth, blog, compress
 
-    db.init_app(app)
+        app.register_blueprint(assets.bp)
+        app.register_blueprint(auth.bp)
+        app.register_blueprint(blog.bp)
+        app.register_blueprint(api.bp)
+        app.add_url_rule("/", endpoint="index")
+        compress.init_app(app)
 
-    from . import auth, blog
+    # After the blueprints, so the user is known when deciding to profile
+    if app.config["PROFILER_ENABLED"]:
+        with timer.phase("profiler"):
+            from . import profiler
 
-    app.register_blueprint(auth.bp)
-    app.register_blueprint(blog.bp)
-    app.add_url_rule("/", endpoint="index")
+            profiler.init_app(app)
+
+    # Only imported when run, since serving requests never needs them
+    with timer.phase("commands"):
+        for name, import_name in COMMANDS.items():
+            app.cli.add_lazy_command(name, import_name)
+
+    if app.config["WARMUP_ON_STARTUP"]:
+        with timer.phase("warmup"):
+            from . import warmup
+
+            warmup.warmup(app)
 
     return app
+
+
+def _configure(app: Flask, test_config: Optional[Dict[str, Any]]) -> None:
+    app.config.from_mapping(
+        SECRET_KEY="dev",
+        DATABASE=os.path.join(app.instance_path, "flaskr.sqlite"),
+        DATABASE_POOL_SIZE=8,
+        DATABASE_WRITE_POOL_SIZE=1,
+        DATABASE_POOL_TIMEOUT=10.0,
+        DATABASE_POOL_PING_INTERVAL=30.0,
+        SQLITE_JOURNAL_MODE="wal",
+        SQLITE_SYNCHRONOUS="normal",
+        SQLITE_CACHE_SIZE=-16000,
+        SQLITE_MMAP_SIZE=64 * 1024 * 1024,
+        SQLITE_BUSY_TIMEOUT=5000,
+        SQL_TRACE=False,
+        SQL_SLOW_QUERY_MS=None,
+        ASSETS_FOLDER=os.path.join(app.instance_path, "assets"),
+        ASSETS_BROTLI=True,
+        ASSETS_MAX_AGE=365 * 24 * 60 * 60,
+        COMPRESS_MIMETYPES=[
+            "text/html",
+            "text/css",
+            "text/plain",
+            "application/json",
+            "application/javascript",
+        ],
+        COMPRESS_MIN_SIZE=500,
+        COMPRESS_LEVEL=6,
+        COMPRESS_BROTLI_QUALITY=4,
+        METRICS_ENABLED=True,
+        METRICS_DIR=os.path.join(app.instance_path, "metrics"),
+        METRICS_FLUSH_INTERVAL=1.0,
+        PROFILER_ENABLED=False,
+        PROFILER_DIR=os.path.join(app.instance_path, "profiles"),
+        PROFILER_ADMINS=[],
+        PROFILER_TOKEN_MAX_AGE=3600,
+        PROFILER_SAMPLE_INTERVAL=0.001,
+        PROFILER_KEEP=100,
+        JINJA_BYTECODE_CACHE=os.path.join(app.instance_path, "jinja-cache"),
+        WARMUP_ON_STARTUP=False,
+        POSTS_PER_PAGE=20,
+        EXCERPT_LENGTH=300,
+        STREAM_INDEX=False,
+        STREAM_BUFFER_SIZE=16,
+        SEARCH_PER_PAGE=20,
+        SEARCH_MAX_PAGE=50,
+        IMPORT_BATCH_SIZE=1000,
+        WRITE_QUEUE_ENABLED=False,
+        WRITE_QUEUE_MAX_BATCH=64,
+        WRITE_QUEUE_MAX_DELAY=0.002,
+        WRITE_QUEUE_TIMEOUT=10.0,
+        WRITE_QUEUE_SYNCHRONOUS="full",
+        PAGE_CACHE_SIZE=256,
+        PAGE_CACHE_TTL=60.0,
+        ETAG_SALT=__version__,
+        USER_CACHE_SIZE=1024,
+        USER_CACHE_TTL=60.0,
+        PASSWORD_HASH_METHOD="pbkdf2:sha256:150000",
+        PASSWORD_SALT_LENGTH=8,
+        PASSWORD_HASH_WORKERS=2,
+        PASSWORD_HASH_QUEUE_SIZE=8,
+        PASSWORD_HASH_TIMEOUT=10.0,
+    )
+
+    if test_config is None:
+        # Load the instance config, if it exists, when not testing
+        app.config.from_pyfile("config.py", silent=True)
+    else:
+        # Load the test config if passed in
+        app.config.from_mapping(test_config)
@@ -0,0 +1,99 @@
+"""A read-only JSON API for posts."""
+import json
+from typing import Any, Dict
+
+from flask import Blueprint, current_app, request
+from werkzeug import Response
+from werkzeug.exceptions import HTTPException
+
+from flaskr.blog import get_post, get_posts
+from flaskr.conditional import conditional
+from flaskr.queries import Post
+
+bp = Blueprint("api", __name__, url_prefix="/api")
+
+
+def post_to_dict(post: Post) -> Dict[str, Any]:
+    """Build the JSON form of a post.
+
+    The slots of the post are read into a literal dict, so nothing is looked
+    up by name in a mapping or by reflection for each post. The body is only
+    included when it was read, as it is for a single post.
+
+    Args:
+        post (Post): The post.
+
+    Returns:
+        Dict[str, Any]: The post.
+    """
+    data: Dict[str, Any] = {
+        "id": post.id,
+        "title": post.title,
+        "excerpt": post.excerpt,
+        "created": post.created.isoformat(),
+        "author": {"id": post.author_id, "username": post.username},
+    }
+    if post.body is not None:
+        data["body"] = post.body
+    return data
+
+
+def to_json(payload: Any, status: int = 200) -> Response:
+    """Serialize a payload without whitespace or key sorting.
+
+    Args:
+        payload (Any): The value to send.
+        status (int): The status code.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return current_app.response_class(
+        json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+@bp.route("/posts")
+@conditional
+def list_posts() -> Response:
+    """List posts newest first, a page at a time.
+
+    Takes the same ``before`` and ``after`` cursors as the HTML index; the \
+    cursors for the neighbouring pages are returned with the posts.
+
+    Returns:
+        Response: ``{"posts": [...], "older": ..., "newer": ...}``.
+    """
+    page = get_posts(request.args.get("before"), request.args.get("after"))
+    posts = [post_to_dict(post) for post in page]
+
+    return to_json({"posts": posts, "older": page.older, "newer": page.newer})
+
+
+@bp.route("/posts/<int:id>")
+@conditional
+def post_detail(id: int) -> Response:
+    """Return a single post.
+
+    Args:
+        id (int): The post id.
+
+    Returns:
+        Response: The post.
+    """
+    return to_json(post_to_dict(get_post(id, check_author=False)))
+
+
+@bp.errorhandler(HTTPException)
+def http_error(e: HTTPException) -> Response:
+    """Report errors as JSON rather than HTML.
+
+    Args:
+        e (HTTPException): The error.
+
+    Returns:
+        Response: ``{"error": ...}`` with the status code of the error.
+    """
+    return to_json({"error": e.description}, e.code or 500)
@@ -0,0 +1,207 @@
+"""Serve content-hashed, precompressed copies of the static files."""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Any, Dict, List, Optional
+
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+from werkzeug import Response
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+bp = Blueprint("assets", __name__, url_prefix="/assets")
+
+#: The file, in ``ASSETS_FOLDER``, mapping each static file to its copy.
+MANIFEST = "manifest.json"
+
+#: The encodings of the precompressed copies and their suffixes, best first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def hashed_name(filename: str, content: bytes) -> str:
+    """Put a hash of a file's content into its name.
+
+    Args:
+        filename (str): The name, such as ``style.css``.
+        content (bytes): The content.
+
+    Returns:
+        str: The name with the hash, such as ``style.0123456789ab.css``.
+    """
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _write(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def compress(path: str, content: bytes, use_brotli: bool = True) -> List[str]:
+    """Write the compressed copies of a file that are smaller than it.
+
+    Args:
+        path (str): Where the file is; the copies get a suffix added.
+        content (bytes): The content.
+        use_brotli (bool): Whether to write a brotli copy, if the brotli \
+        package is installed.
+
+    Returns:
+        List[str]: The encodings written.
+    """
+    variants: Dict[str, bytes] = {"gzip": gzip.compress(content, 9, mtime=0)}
+    if use_brotli and brotli is not None:
+        variants["br"] = brotli.compress(content)
+
+    written: List[str] = []
+    for encoding, suffix in ENCODINGS:
+        data: Optional[bytes] = variants.get(encoding)
+        if data is not None and len(data) < len(content):
+            _write(path + suffix, data)
+            written.append(encoding)
+    return written
+
+
+def build_assets(
+    static_folder: str, output_folder: str, use_brotli: bool = True
+) -> Dict[str, str]:
+    """Copy every static file to a hashed name, compress it, write the manifest.
+
+    Copies from earlier builds are left in place, so pages that still link \
+    to them keep working.
+
+    Args:
+        static_folder (str): The static files.
+        output_folder (str): Where the copies and the manifest go.
+        use_brotli (bool): Whether to write brotli copies too.
+
+    Returns:
+        Dict[str, str]: The manifest: each static file, relative to \
+        ``static_folder``, and the name of its copy.
+    """
+    manifest: Dict[str, str] = {}
+    for root, _, files in os.walk(static_folder):
+        for filename in sorted(files):
+            source: str = os.path.join(root, filename)
+            with open(source, "rb") as f:
+                content: bytes = f.read()
+
+            name: str = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            manifest[name] = hashed_name(name, content)
+            target: str = os.path.join(output_folder, manifest[name])
+            _write(target, content)
+            compress(target, content, use_brotli)
+
+    # Replaced in one step, so a worker never reads half a manifest.
+    path: str = os.path.join(output_folder, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def get_manifest() -> Dict[str, str]:
+    """Return the manifest of the last build, reading it on first use.
+
+    Returns:
+        Dict[str, str]: The manifest, empty if the assets were never built.
+    """
+    manifest: Optional[Dict[str, str]] = current_app.extensions.get("flaskr_assets")
+
+    if manifest is None:
+        try:
+            path = os.path.join(current_app.config["ASSETS_FOLDER"], MANIFEST)
+            with open(path, encoding="utf8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        manifest = current_app.extensions.setdefault("flaskr_assets", manifest)
+
+    return manifest
+
+
+@bp.app_template_global()
+def asset_url(filename: str, **values: Any) -> str:
+    """Build the URL of a static file, like ``url_for("static", ...)``.
+
+    Files that were built point to their hashed copy, which is cached for \
+    good; others, and every file before the first build, are served by the \
+    static route.
+
+    Args:
+        filename (str): The file, relative to the static folder.
+        **values (Any): Passed to url_for, such as ``_external``.
+
+    Returns:
+        str: The URL.
+    """
+    hashed: Optional[str] = get_manifest().get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename, **values)
+    return url_for("assets.asset", filename=hashed, **values)
+
+
+@bp.route("/<path:filename>")
+def asset(filename: str) -> Response:
+    """Send a hashed copy, precompressed if the client accepts it.
+
+    Args:
+        filename (str): The hashed name.
+
+    Returns:
+        Response: The file, cached as immutable.
+    """
+    folder: str = current_app.config["ASSETS_FOLDER"]
+    options: Dict[str, Any] = {
+        "mimetype": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "cache_timeout": current_app.config["ASSETS_MAX_AGE"],
+        "conditional": True,
+    }
+
+    response: Optional[Response] = None
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding]:
+            try:
+                response = send_from_directory(folder, filename + suffix, **options)
+            except NotFound:
+                continue
+            response.content_encoding = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(folder, filename, **options)
+
+    response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
+
+
+@click.command("assets-build")
+@click.option(
+    "--brotli/--no-brotli",
+    "use_brotli",
+    default=None,
+    help="Write brotli copies [default: ASSETS_BROTLI].",
+)
+@with_appcontext
+def build_command(use_brotli: Optional[bool]) -> None:
+    """Write hashed, compressed copies of the static files."""
+    if use_brotli is None:
+        use_brotli = current_app.config["ASSETS_BROTLI"]
+    if use_brotli and brotli is None:
+        click.echo("The brotli package is not installed; writing gzip only.", err=True)
+
+    output_folder: str = current_app.config["ASSETS_FOLDER"]
+    manifest: Dict[str, str] = build_assets(
+        current_app.static_folder, output_folder, use_brotli
+    )
+    click.echo(f"Built {len(manifest)} assets in {output_folder}")
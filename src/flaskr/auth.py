@@ -1,8 +1,9 @@
 """Authentication for the Flaskr application."""
 
 import functools
+import sqlite3
 from sqlite3 import Connection
-from typing import Any, Dict
+from typing import Any, Optional, Set
 
 from flask import (
     Blueprint,
@@ -15,13 +16,19 @@ from flask import (
     url_for,
 )
 from werkzeug import Response
-from werkzeug.security import check_password_hash, generate_password_hash
 
 
-from flaskr.db import get_db
+from flaskr import queries
+from flaskr.cache import get_cache
+from flaskr.db import get_db, get_read_db
+from flaskr.hashing import get_hasher, HasherBusyError
+from flaskr.queries import User
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+#: Endpoints that never look at g.user, so the user is not loaded for them.
+skip_user_endpoints: Set[str] = {"static", "assets.asset", "metrics.metrics", "hello"}
+
 
 @bp.route("/register", methods=["GET", "POST"])
 def register() -> Any:
@@ -34,7 +41,6 @@ def register() -> Any:
         username = request.form["username"]
         password = request.form["password"]
 
-        db: Connection = get_db()
         error: Any = None
 
         if not username:
@@ -42,18 +48,22 @@ def register() -> Any:
         elif not password:
             error = "Password is required."
         elif (
-            db.execute("SELECT id FROM user WHERE username = ?", (username,)).fetchone()
+            get_read_db().execute(queries.USERNAME_TAKEN, (username,)).fetchone()
             is not None
         ):
             error = f"User {username} is already registered."
 
         if error is None:
-            db.execute(
-                "INSERT INTO user (username, password) VALUES (?, ?)",
-                (username, generate_password_hash(password)),
-            )
-            db.commit()
-            return redirect(url_for("auth.login"))
+            # Hash before taking the writer, which other requests wait for.
+            pwhash: str = get_hasher().hash(password)
+            db: Connection = get_db()
+            try:
+                db.execute(queries.INSERT_USER, (username, pwhash))
+                db.commit()
+            except sqlite3.IntegrityError:
+                error = f"User {username} is already registered."
+            else:
+                return redirect(url_for("auth.login"))
 
         flash(error)
 
@@ -64,7 +74,9 @@ def register() -> Any:
 def login() -> Any:
     """Handle the login form.
 
-    Either validating credentials or presenting the form for login.
+    Either validating credentials or presenting the form for login. A \
+    password stored with other hash parameters than the configured ones is \
+    re-hashed once it has been verified.
 
     Returns:
         Any: Either The HTML for the form (GET) or a URL (POST).
@@ -73,21 +85,20 @@ def login() -> Any:
         username = request.form["username"]
         password = request.form["password"]
 
-        db: Connection = get_db()
         error: Any = None
 
-        user: Dict[str, str] = db.execute(
-            "SELECT * FROM user WHERE username = ?", (username,)
-        ).fetchone()
+        user: Optional[User] = queries.get_user_by_username(get_read_db(), username)
 
         if user is None:
             error = "Incorrect username."
-        elif not check_password_hash(user["password"], password):
+        elif not get_hasher().verify(user.password or "", password):
             error = "Incorrect password."
+        else:
+            if get_hasher().needs_rehash(user.password or ""):
+                rehash_password(user.id, password)
 
-        if error is None:
             session.clear()
-            session["user_id"] = user["id"]
+            session["user_id"] = user.id
             return redirect(url_for("index"))
 
         flash(error)
@@ -95,6 +106,39 @@ def login() -> Any:
     return render_template("auth/login.html")
 
 
+def rehash_password(user_id: int, password: str) -> None:
+    """Store the password again using the configured hash parameters.
+
+    It is skipped when the hashing pool is busy; the next login tries again.
+
+    Args:
+        user_id (int): The user id.
+        password (str): The password, already verified.
+    """
+    try:
+        pwhash: str = get_hasher().hash(password)
+    except HasherBusyError:
+        return
+
+    db: Connection = get_db()
+    db.execute(queries.UPDATE_PASSWORD, (pwhash, user_id))
+    db.commit()
+    invalidate_user(user_id)
+
+
+@bp.errorhandler(HasherBusyError)
+def hasher_busy(e: HasherBusyError) -> Any:
+    """Ask the client to retry when the hashing pool is saturated.
+
+    Args:
+        e (HasherBusyError): The error.
+
+    Returns:
+        Any: A 503 response with a Retry-After header.
+    """
+    return render_template("auth/busy.html"), 503, {"Retry-After": "1"}
+
+
 @bp.before_app_request
 def load_logged_in_user() -> None:
     """Checks if a user id is stored in the session.
@@ -103,15 +147,34 @@ def load_logged_in_user() -> None:
     for the length of the request.
 
     If there is no user id, or if the id doesn’t exist, g.user will be None.
+
+    Only the id and username are loaded, and they are kept in the user \
+    cache for ``USER_CACHE_TTL`` seconds. Endpoints listed in \
+    ``skip_user_endpoints`` always get None.
     """
     user_id = session.get("user_id")
 
-    if user_id is None:
+    if user_id is None or request.endpoint in skip_user_endpoints:
         g.user = None
     else:
-        g.user = (
-            get_db().execute("SELECT * FROM user WHERE id = ?", (user_id,)).fetchone()
-        )
+        g.user = get_cache("user").get(user_id)
+        if g.user is None:
+            g.user = queries.get_user(get_read_db(), user_id)
+            if g.user is not None:
+                get_cache("user").set(user_id, g.user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user from the user cache.
+
+    Call this after changing or deleting a user row, as rehash_password and \
+    the bulk import do. The cache is per process, so other workers keep \
+    their entry until ``USER_CACHE_TTL`` runs out.
+
+    Args:
+        user_id (int): The user id.
+    """
+    get_cache("user").delete(user_id)
 
 
 @bp.route("/logout")
@@ -1,18 +1,40 @@
 """The blog."""
-from sqlite3 import Connection
-from typing import Any, List, Optional
 
-from flask import Blueprint, flash, g, redirect, render_template, request, url_for
+import base64
+from datetime import datetime
+import re
+from sqlite3 import Connection
+from typing import Any, cast, Iterable, Iterator, List, Optional, Tuple
+
+from flask import (
+    Blueprint,
+    current_app,
+    flash,
+    g,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from markupsafe import escape, Markup
 from werkzeug import Response
 from werkzeug.exceptions import abort
 
+from flaskr import queries
 from flaskr.auth import login_required
-from flaskr.db import get_db
+from flaskr.cache import get_cache
+from flaskr.conditional import conditional
+from flaskr.db import get_db, get_read_db
+from flaskr.queries import Author, Post, SearchResult
+from flaskr.render import render_post
+from flaskr.writequeue import run_write
 
 bp = Blueprint("blog", __name__)
 
 
-def get_post(id: int, check_author: Optional[bool] = True) -> Any:
+def get_post(id: int, check_author: Optional[bool] = True) -> Post:
     """Retrieve a specific post from the database.
 
     Args:
@@ -21,39 +43,355 @@ def get_post(id: int, check_author: Optional[bool] = True) -> Any:
         Defaults to True.
 
     Returns:
-        Any: The post row returned as a dict.
+        Post: The post.
     """
-    post: Any = get_db().execute(
-        "SELECT p.id, p.title, p.body, p.created, p.author_id, u.username"
-        " FROM post p, user u ON p.author_id = u.id"
-        " WHERE p.id = ?",
-        (id,),
-    ).fetchone()
+    post: Optional[Post] = queries.get_post(get_read_db(), id)
 
     if post is None:
         abort(404, f"Post id {id} does not exist.")
-
-    if check_author and post["author_id"] != g.user["id"]:
+    elif check_author and post.author_id != g.user.id:
         abort(403)
 
-    return post
+    # abort raises, so post is not None here.
+    return cast(Post, post)
+
+
+def encode_cursor(created: datetime, id: int) -> str:
+    """Encode the position of a post as an opaque pagination cursor.
+
+    The cursor is the url-safe base64 form of ``"<created>|<id>"``, where
+    ``created`` is written the same way SQLite stores ``CURRENT_TIMESTAMP``.
+
+    Args:
+        created (datetime): When the post was created.
+        id (int): The post id, used to break ties on ``created``.
+
+    Returns:
+        str: The cursor.
+    """
+    raw: str = f"{created.isoformat(' ')}|{id}"
+    return base64.urlsafe_b64encode(raw.encode("utf8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor (str): The cursor from the query string.
+
+    Returns:
+        Tuple[str, int]: The created timestamp (as stored) and the post id.
+    """
+    try:
+        padded: str = cursor + "=" * (-len(cursor) % 4)
+        raw: str = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf8")
+        created, id = raw.rsplit("|", 1)
+        datetime.fromisoformat(created)
+        position: Tuple[str, int] = (created, int(id))
+    except ValueError:
+        abort(400, "Invalid pagination cursor.")
+
+    return position
+
+
+class PostPage:
+    """One page of posts, read lazily from the database cursor.
+
+    Iterating the page yields at most ``per_page`` rows straight from the
+    cursor, then reads one row more to find out whether there is an older
+    page. ``older`` and ``newer`` hold the cursors for the neighbouring
+    pages once the page has been iterated.
+    """
+
+    def __init__(
+        self: Any, rows: Iterable[Post], per_page: int, before: Optional[str]
+    ) -> None:
+        """Wrap the rows of a page, newest first.
+
+        Args:
+            rows (Iterable[Post]): Up to ``per_page + 1`` posts.
+            per_page (int): The number of posts on a page.
+            before (str, optional): The cursor the page was requested with.
+        """
+        self._rows: Iterator[Post] = iter(rows)
+        self._per_page: int = per_page
+        self._before: Optional[str] = before
+        self.older: Optional[str] = None
+        self.newer: Optional[str] = None
+
+    def __iter__(self: Any) -> Iterator[Post]:
+        """Yield the posts of the page.
+
+        Yields:
+            Post: Each post.
+        """
+        last: Any = None
+        for n, post in enumerate(self._rows):
+            if n == self._per_page:
+                self.older = encode_cursor(last.created, last.id)
+                return
+            if n == 0 and self._before is not None:
+                self.newer = encode_cursor(post.created, post.id)
+            last = post
+            yield post
+
+
+def get_posts(
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    author_id: Optional[int] = None,
+) -> PostPage:
+    """Retrieve one page of posts, newest first, using keyset pagination.
+
+    Only ``POSTS_PER_PAGE + 1`` rows are read whatever the size of the table;
+    the extra row tells us whether there is another page.
+
+    Args:
+        before (str, optional): Cursor of the post the page starts after \
+        when paging towards older posts.
+        after (str, optional): Cursor of the post the page ends before \
+        when paging towards newer posts.
+        author_id (int, optional): Only read the posts of this author, \
+        from the (author_id, created, id) index.
+
+    Returns:
+        PostPage: The page, to be iterated once.
+    """
+    per_page: int = current_app.config["POSTS_PER_PAGE"]
+    db: Connection = get_db()
+    latest, older, newer = (
+        (queries.LATEST_POSTS, queries.POSTS_BEFORE, queries.POSTS_AFTER)
+        if author_id is None
+        else (
+            queries.AUTHOR_POSTS,
+            queries.AUTHOR_POSTS_BEFORE,
+            queries.AUTHOR_POSTS_AFTER,
+        )
+    )
+    where: Tuple[int, ...] = () if author_id is None else (author_id,)
+
+    if after is not None:
+        # Read towards newer posts, then put the page back in newest first
+        # order; the page is bounded, so it is fine to hold it in memory.
+        posts: List[Post] = list(
+            queries.fetch(
+                db, Post, newer, *where, *decode_cursor(after), per_page + 1
+            )
+        )
+        page = PostPage(posts[:per_page][::-1], per_page, None)
+        if posts:
+            page.older = encode_cursor(posts[0].created, posts[0].id)
+        if len(posts) > per_page:
+            page.newer = encode_cursor(
+                posts[per_page - 1].created, posts[per_page - 1].id
+            )
+        return page
+
+    if before is None:
+        rows: Iterable[Post] = queries.fetch(db, Post, latest, *where, per_page + 1)
+    else:
+        rows = queries.fetch(
+            db, Post, older, *where, *decode_cursor(before), per_page + 1
+        )
+
+    return PostPage(rows, per_page, before)
+
+
+def stream_template(template_name: str, **context: Any) -> Iterator[str]:
+    """Render a template as a stream of chunks.
+
+    The chunks are grouped by ``STREAM_BUFFER_SIZE`` template events so \
+    the client is not sent many tiny writes.
+
+    Args:
+        template_name (str): The name of the template.
+        **context (Any): The variables to render it with.
+
+    Returns:
+        Iterator[str]: The rendered chunks.
+    """
+    app: Any = current_app._get_current_object()  # type: ignore
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(app.config["STREAM_BUFFER_SIZE"])
+    return iter(stream)
+
+
+def _cache_page(
+    chunks: Iterable[str], key: str, version: Optional[int]
+) -> Iterator[str]:
+    parts: List[str] = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    get_cache("page").set(key, (version, "".join(parts)))
 
 
 @bp.route("/")
-def index() -> str:
+@conditional
+def index() -> Any:
     """The main index page for the Flaskr application.
 
+    The page shows ``POSTS_PER_PAGE`` posts. The ``before`` and ``after`` \
+    query arguments hold the cursors used by the "older" and "newer" links.
+
+    Pages rendered for logged out visitors are kept in the page cache until \
+    a post changes or ``PAGE_CACHE_TTL`` runs out. Entries are tagged with \
+    the content version, so a change made by another worker is seen too.
+
+    With ``STREAM_INDEX`` set, the page is sent while the posts are read \
+    from the cursor instead of being rendered in full first.
+
     Returns:
-        str: The HTML for index.html.
+        Any: The HTML for index.html, or a streamed response.
     """
-    db: Connection = get_db()
-    posts: List[Any] = db.execute(
-        "SELECT p.id, p.title, p.body, p.created, p.author_id, u.username"
-        " FROM post p JOIN user u ON p.author_id = u.id"
-        " ORDER BY p.created DESC"
-    ).fetchall()
+    cacheable: bool = g.user is None and "_flashes" not in session
+    version: Optional[int] = g.get("content_version")
+
+    if cacheable:
+        entry: Optional[Tuple[Optional[int], str]] = get_cache("page").get(
+            request.full_path
+        )
+        if entry is not None and entry[0] == version:
+            return entry[1]
 
-    return render_template("blog/index.html", posts=posts)
+    page: PostPage = get_posts(request.args.get("before"), request.args.get("after"))
+
+    if current_app.config["STREAM_INDEX"]:
+        chunks: Iterator[str] = stream_template("blog/index.html", page=page)
+        if cacheable:
+            chunks = _cache_page(chunks, request.full_path, version)
+        return Response(stream_with_context(chunks), mimetype="text/html")
+
+    html: str = render_template("blog/index.html", page=page)
+
+    if cacheable:
+        get_cache("page").set(request.full_path, (version, html))
+
+    return html
+
+
+@bp.route("/user/<path:username>")
+@conditional
+def author(username: str) -> str:
+    """List the posts of one author, with how many they wrote.
+
+    The count is read from ``user_stats``, which triggers keep up to date, \
+    and the posts from the author's index, so the page costs the same \
+    however many posts the author has. Paging works as on the index. \
+    Register accepts any user name, so the route takes slashes in it too.
+
+    Args:
+        username (str): The author's user name.
+
+    Returns:
+        str: The HTML for author.html.
+    """
+    author: Optional[Author] = queries.get_author(get_db(), username)
+
+    if author is None:
+        abort(404, f"User {username} does not exist.")
+    author = cast(Author, author)
+
+    page: PostPage = get_posts(
+        request.args.get("before"), request.args.get("after"), author.id
+    )
+    return render_template("blog/author.html", author=author, page=page)
+
+
+@bp.route("/<int:id>")
+@conditional
+def detail(id: int) -> str:
+    """Show a single post.
+
+    Args:
+        id (int): The post id.
+
+    Returns:
+        str: The HTML for detail.html.
+    """
+    return render_template("blog/detail.html", post=get_post(id, check_author=False))
+
+
+def to_match_query(q: str) -> str:
+    """Turn what a visitor typed into a safe FTS5 query.
+
+    Every word becomes a quoted phrase, so FTS5 operators in the input have \
+    no effect, and all of them must match. A trailing ``*`` keeps its \
+    meaning of a prefix search.
+
+    Args:
+        q (str): The search terms.
+
+    Returns:
+        str: The FTS5 MATCH expression, empty if there are no words.
+    """
+    return " ".join(
+        '"{}"{}'.format(word, star) for word, star in re.findall(r"(\w+)(\*?)", q)
+    )
+
+
+def highlight(text: str) -> Markup:
+    r"""Escape text from snippet() and turn its markers into <mark> tags.
+
+    Args:
+        text (str): Text with matches between ``\x02`` and ``\x03``.
+
+    Returns:
+        Markup: The HTML.
+    """
+    return (
+        escape(text)
+        .replace("\x02", Markup("<mark>"))
+        .replace("\x03", Markup("</mark>"))
+    )
+
+
+@bp.route("/search")
+@conditional
+def search() -> str:
+    """Search the titles and bodies of posts.
+
+    Results are ranked with bm25, matches in the title counting more, and \
+    shown ``SEARCH_PER_PAGE`` at a time. The ``page`` query argument is \
+    capped at ``SEARCH_MAX_PAGE`` so the offset stays cheap.
+
+    Returns:
+        str: The HTML for search.html.
+    """
+    q: str = request.args.get("q", "")
+    page: int = min(
+        max(request.args.get("page", 1, type=int), 1),
+        current_app.config["SEARCH_MAX_PAGE"],
+    )
+    per_page: int = current_app.config["SEARCH_PER_PAGE"]
+    match: str = to_match_query(q)
+    results: List[SearchResult] = []
+
+    if match:
+        results = list(
+            queries.fetch(
+                get_db(),
+                SearchResult,
+                queries.SEARCH_POSTS,
+                match,
+                per_page + 1,
+                (page - 1) * per_page,
+            )
+        )
+
+    has_next: bool = (
+        len(results) > per_page and page < current_app.config["SEARCH_MAX_PAGE"]
+    )
+
+    return render_template(
+        "blog/search.html",
+        q=q,
+        results=results[:per_page],
+        page=page,
+        has_next=has_next,
+        highlight=highlight,
+    )
 
 
 @bp.route("/create", methods=["GET", "POST"])
@@ -73,17 +411,19 @@ def create() -> Any:
         error: Any = None
 
         if not title:
-            error = "Title is a required field."
+            error = "Title is required."
 
         if error is not None:
             flash(error)
         else:
-            db: Connection = get_db()
-            db.execute(
-                "INSERT INTO post (title, body, author_id)" " VALUES (?, ?, ?)",
-                (title, body, g.user["id"]),
+            author_id: int = g.user.id
+            excerpt, body_html = render_post(body, current_app.config["EXCERPT_LENGTH"])
+            run_write(
+                lambda db: db.execute(
+                    queries.INSERT_POST, (title, body, excerpt, body_html, author_id)
+                )
             )
-            db.commit()
+            get_cache("page").clear()
 
             return redirect(url_for("blog.index"))
 
@@ -91,6 +431,7 @@ def create() -> Any:
 
 
 @bp.route("/<int:id>/update", methods=["GET", "POST"])
+@login_required
 def update(id: int) -> Any:
     """Handles the create.html page.
 
@@ -103,7 +444,7 @@ def update(id: int) -> Any:
     Returns:
         Any: Either the url for the index or the html for the create page.
     """
-    post: Any = get_post(id)
+    post: Post = get_post(id)
 
     if request.method == "POST":
         title: str = request.form["title"]
@@ -111,16 +452,18 @@ def update(id: int) -> Any:
         error: Any = None
 
         if not title:
-            error = "Title is a required field."
+            error = "Title is required."
 
         if error is not None:
             flash(error)
         else:
-            db: Connection = get_db()
-            db.execute(
-                "UPDATE post SET title = ?, body = ?" "WHERE id = ?", (title, body, id)
+            excerpt, body_html = render_post(body, current_app.config["EXCERPT_LENGTH"])
+            run_write(
+                lambda db: db.execute(
+                    queries.UPDATE_POST, (title, body, excerpt, body_html, id)
+                )
             )
-            db.commit()
+            get_cache("page").clear()
 
             return redirect(url_for("blog.index"))
 
@@ -128,6 +471,7 @@ def update(id: int) -> Any:
 
 
 @bp.route("/<int:id>/delete", methods=["POST"])
+@login_required
 def delete(id: int) -> Response:
     """Delete an existing post.
 
@@ -137,8 +481,8 @@ def delete(id: int) -> Response:
     Returns:
         Response: The blog index url.
     """
-    db: Connection = get_db()
-    db.execute("DELETE FROM post WHERE id = ?", (id,))
-    db.commit()
+    get_post(id)
+    run_write(lambda db: db.execute(queries.DELETE_POST, (id,)))
+    get_cache("page").clear()
 
     return redirect(url_for("blog.index"))
@@ -0,0 +1,179 @@
+"""Stream users and posts in and out of the database as NDJSON."""
+import json
+import sqlite3
+from sqlite3 import Connection
+import time
+from typing import Any, Dict, IO, Iterable, List, Tuple
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from flaskr.auth import invalidate_user
+from flaskr.db import get_db, get_read_db
+from flaskr.render import render_post
+
+#: The columns written for each record type, in insert order.
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "user": ("id", "username", "password"),
+    "post": ("id", "author_id", "created", "title", "body"),
+}
+
+#: The columns computed from a record on import instead of being exported.
+RENDERED: Dict[str, Tuple[str, ...]] = {"post": ("excerpt", "body_html")}
+
+
+def export_records(out: IO[str]) -> Dict[str, int]:
+    """Write every user, then every post, as one JSON object per line.
+
+    Rows are read from the cursor of a read-only connection one at a time,
+    so memory use does not depend on the size of the database.
+
+    Args:
+        out (IO[str]): Where to write the lines.
+
+    Returns:
+        Dict[str, int]: The number of records written of each type.
+    """
+    db: Connection = get_read_db()
+    counts: Dict[str, int] = {}
+
+    for kind, columns in COLUMNS.items():
+        counts[kind] = 0
+        cursor = db.execute(
+            f"SELECT {', '.join(columns)} FROM {kind} ORDER BY id"  # noqa: S608
+        )
+        for row in cursor:
+            record: Dict[str, Any] = {"type": kind}
+            record.update(zip(columns, row))
+            if kind == "post":
+                record["created"] = str(record["created"])
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[kind] += 1
+
+    return counts
+
+
+def _read_record(
+    line: str, number: int, excerpt_length: int
+) -> Tuple[str, Tuple[Any, ...]]:
+    try:
+        record: Dict[str, Any] = json.loads(line)
+        kind: str = record["type"]
+        values: Tuple[Any, ...] = tuple(record[c] for c in COLUMNS[kind])
+        if kind == "post":
+            values += render_post(record["body"], excerpt_length)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise click.ClickException(f"Line {number} is not a valid record: {e}") from e
+
+    return kind, values
+
+
+def import_records(
+    lines: Iterable[str], batch_size: int, skip_existing: bool = False
+) -> Dict[str, int]:
+    """Insert the records read from NDJSON lines.
+
+    Rows are inserted with executemany, and each batch of ``batch_size``
+    rows is committed as one transaction. Users must come before the posts
+    that refer to them, as they do in the output of export_records. The
+    excerpt and HTML of posts are rendered as they are read. If an import
+    fails, the batches committed before the failure are kept. Imported users
+    are dropped from this process's user cache; other processes see them
+    once their entries expire.
+
+    Args:
+        lines (Iterable[str]): The NDJSON lines.
+        batch_size (int): How many rows to insert per transaction.
+        skip_existing (bool): Skip records whose id is already taken \
+        instead of failing.
+
+    Returns:
+        Dict[str, int]: The number of records read of each type.
+
+    Raises:
+        ClickException: If a line is not a valid record or its id is taken.
+
+    # noqa: DAR402 ClickException
+    """
+    db: Connection = get_db()
+    verb: str = "INSERT OR IGNORE" if skip_existing else "INSERT"
+    excerpt_length: int = current_app.config["EXCERPT_LENGTH"]
+    counts: Dict[str, int] = {kind: 0 for kind in COLUMNS}
+    batch: List[Tuple[Any, ...]] = []
+    batch_kind: str = "user"
+
+    def flush() -> None:
+        if batch:
+            columns: Tuple[str, ...] = COLUMNS[batch_kind] + RENDERED.get(
+                batch_kind, ()
+            )
+            try:
+                db.executemany(
+                    f"{verb} INTO {batch_kind} ({', '.join(columns)})"  # noqa: S608
+                    f" VALUES ({', '.join('?' * len(columns))})",
+                    batch,
+                )
+            except sqlite3.IntegrityError as e:
+                raise click.ClickException(
+                    f"{e} (use --skip-existing to ignore records already present)"
+                ) from e
+            db.commit()
+            if batch_kind == "user":
+                for values in batch:
+                    invalidate_user(values[0])
+            batch.clear()
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        kind, values = _read_record(line, number, excerpt_length)
+        if kind != batch_kind or len(batch) >= batch_size:
+            flush()
+            batch_kind = kind
+
+        batch.append(values)
+        counts[kind] += 1
+
+    flush()
+    return counts
+
+
+def _report(action: str, counts: Dict[str, int], elapsed: float) -> None:
+    rows: int = sum(counts.values())
+    click.echo(
+        f"{action} {counts['user']} users and {counts['post']} posts"
+        f" in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)",
+        err=True,
+    )
+
+
+@click.command("export")
+@click.argument("output", type=click.File("w", encoding="utf8"), default="-")
+@with_appcontext
+def export_command(output: IO[str]) -> None:
+    """Export users and posts as NDJSON to OUTPUT (default stdout)."""
+    start: float = time.perf_counter()
+    counts: Dict[str, int] = export_records(output)
+    _report("Exported", counts, time.perf_counter() - start)
+
+
+@click.command("import")
+@click.argument("input", type=click.File("r", encoding="utf8"), default="-")
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    help="Rows per transaction [default: IMPORT_BATCH_SIZE].",
+)
+@click.option(
+    "--skip-existing", is_flag=True, help="Skip records whose id is already taken."
+)
+@with_appcontext
+def import_command(input: IO[str], batch_size: int, skip_existing: bool) -> None:
+    """Import users and posts from NDJSON in INPUT (default stdin)."""
+    start: float = time.perf_counter()
+    counts: Dict[str, int] = import_records(
+        input, batch_size or current_app.config["IMPORT_BATCH_SIZE"], skip_existing
+    )
+    _report("Imported", counts, time.perf_counter() - start)
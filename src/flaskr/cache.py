@@ -0,0 +1,112 @@
+"""Small in-process caches with size and age limits."""
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+from flask import current_app
+
+
+class TTLCache:
+    """A thread-safe least-recently-used cache whose entries expire.
+
+    At most ``maxsize`` entries are kept, and an entry older than ``ttl``
+    seconds is treated as missing. A cache with ``maxsize`` 0 stores nothing.
+    """
+
+    def __init__(self: Any, maxsize: int, ttl: float) -> None:
+        """Create an empty cache.
+
+        Args:
+            maxsize (int): The maximum number of entries.
+            ttl (float): How many seconds an entry stays valid.
+        """
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self: Any) -> int:
+        """The number of entries, including any that have expired.
+
+        Returns:
+            int: The number of entries.
+        """
+        return len(self._entries)
+
+    def get(self: Any, key: Hashable) -> Optional[Any]:
+        """Look up an entry.
+
+        Args:
+            key (Hashable): The key.
+
+        Returns:
+            Optional[Any]: The value, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry: Optional[Tuple[float, Any]] = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self: Any, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used one when full.
+
+        Args:
+            key (Hashable): The key.
+            value (Any): The value.
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self: Any, key: Hashable) -> None:
+        """Remove an entry if it is present.
+
+        Args:
+            key (Hashable): The key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self: Any) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+def get_cache(name: str) -> TTLCache:
+    """Return one of the app's named caches, creating it if needed.
+
+    The cache is sized from the ``<NAME>_CACHE_SIZE`` and
+    ``<NAME>_CACHE_TTL`` config values.
+
+    Args:
+        name (str): The cache name, such as ``"page"``.
+
+    Returns:
+        TTLCache: The cache.
+    """
+    key: str = f"flaskr_{name}_cache"
+    cache: Optional[TTLCache] = current_app.extensions.get(key)
+
+    if cache is None:
+        prefix: str = name.upper()
+        cache = current_app.extensions.setdefault(
+            key,
+            TTLCache(
+                current_app.config[f"{prefix}_CACHE_SIZE"],
+                current_app.config[f"{prefix}_CACHE_TTL"],
+            ),
+        )
+
+    return cache
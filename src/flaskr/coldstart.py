@@ -0,0 +1,84 @@
+"""Time cold starts of the app, each in a new interpreter."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+import click
+
+#: The most a new worker may spend importing flaskr and creating the app, in s.
+BUDGET = 1.0
+
+#: Run in a new interpreter to time a cold start.
+_CHILD = """\
+import json, sys, time
+start = time.perf_counter()
+import flaskr
+imported = time.perf_counter()
+app = flaskr.create_app(json.loads(sys.argv[1]))
+phases = {"import": imported - start}
+phases.update(app.extensions["flaskr_startup"].phases)
+print(json.dumps(phases))
+"""
+
+
+def measure(
+    runs: int, config: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, float]]:
+    """Time cold starts, each in a new interpreter.
+
+    Args:
+        runs (int): The number of starts.
+        config (Dict[str, Any], optional): Passed to create_app, such as \
+        paths that keep the runs out of the instance folder.
+
+    Returns:
+        List[Dict[str, float]]: The seconds spent in each phase of each run, \
+        ``import`` being the time to import flaskr and Flask.
+    """
+    env: Dict[str, str] = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, sys.path))
+    return [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", _CHILD, json.dumps(config)],
+                check=True,
+                env=env,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout
+        )
+        for _ in range(runs)
+    ]
+
+
+@click.command("startup-report")
+@click.option("-n", "--runs", default=5, show_default=True, type=click.IntRange(1))
+@click.option(
+    "--budget",
+    default=BUDGET,
+    show_default=True,
+    help="Fail if the median start takes longer, in seconds.",
+)
+def startup_report_command(runs: int, budget: float) -> None:
+    """Report the median time of each phase of a cold start."""
+    results: List[Dict[str, float]] = measure(runs)
+    totals: List[float] = [sum(phases.values()) for phases in results]
+
+    click.echo(f"{'phase':<12} {'median ms':>10} {'max ms':>8}")
+    for name in results[0]:
+        times: List[float] = [phases.get(name, 0.0) for phases in results]
+        click.echo(
+            f"{name:<12} {statistics.median(times) * 1000:>10.2f}"
+            f" {max(times) * 1000:>8.2f}"
+        )
+    total: float = statistics.median(totals)
+    click.echo(f"{'total':<12} {total * 1000:>10.2f} {max(totals) * 1000:>8.2f}")
+
+    if total > budget:
+        raise click.ClickException(
+            f"Startup took {total * 1000:.0f} ms, over the {budget * 1000:.0f} ms"
+            " budget."
+        )
@@ -0,0 +1,156 @@
+"""Compress responses with gzip or brotli, as the client accepts."""
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+import zlib
+
+from flask import current_app, Flask, request
+from werkzeug import Response
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class Compressor:
+    """Compress a body in pieces, in one content encoding."""
+
+    def __init__(self: Any, encoding: str, level: int) -> None:
+        """Start a compression stream.
+
+        Args:
+            encoding (str): ``"gzip"`` or ``"br"``.
+            level (int): The compression level, or the brotli quality.
+        """
+        self._compress: Callable[[bytes], bytes]
+        self._flush: Callable[[], bytes]
+        self._finish: Callable[[], bytes]
+
+        if encoding == "br":
+            compressor: Any = brotli.Compressor(quality=level)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            # 16 + MAX_WBITS writes the gzip header and trailer.
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self: Any, data: bytes, flush: bool = False) -> bytes:
+        """Compress a piece of the body.
+
+        Args:
+            data (bytes): The piece.
+            flush (bool): Whether to return all of it now, so the client can \
+            decompress it before the rest arrives.
+
+        Returns:
+            bytes: The compressed output so far.
+        """
+        output: bytes = self._compress(data)
+        return output + self._flush() if flush else output
+
+    def finish(self: Any) -> bytes:
+        """End the body.
+
+        Returns:
+            bytes: The rest of the compressed output.
+        """
+        return self._finish()
+
+
+def choose_encoding() -> Optional[str]:
+    """Pick the encoding to send, from the request's ``Accept-Encoding``.
+
+    Returns:
+        Optional[str]: ``"br"``, ``"gzip"`` or None; brotli wins a tie, \
+        when the brotli package is installed.
+    """
+    available: List[str] = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(available)
+
+
+def _stream(
+    chunks: Iterable[Any], compressor: Compressor, charset: str
+) -> Iterator[bytes]:
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(charset)
+        data: bytes = compressor.compress(chunk, flush=True)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a response, if it is worth it and the client accepts it.
+
+    Only responses of a type in ``COMPRESS_MIMETYPES`` are compressed, and \
+    never ones that are already encoded, are files sent as they are or are \
+    marked ``no-transform``. A response whose length is known is left alone \
+    if it is shorter than ``COMPRESS_MIN_SIZE``. Streamed responses are \
+    compressed chunk by chunk as they are sent, each chunk flushed so the \
+    client can render it right away.
+
+    A strong ETag is made weak, since the compressed bytes differ from the \
+    ones it was computed from.
+
+    Args:
+        response (Response): The response.
+
+    Returns:
+        Response: The response, compressed or not.
+    """
+    config: Any = current_app.config
+    if (
+        response.mimetype not in config["COMPRESS_MIMETYPES"]
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.cache_control
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding: Optional[str] = choose_encoding()
+    if encoding is None:
+        return response
+
+    length: Optional[int] = response.content_length
+    if not response.is_streamed:
+        length = len(response.get_data())
+    if length is not None and length < config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    compressor = Compressor(
+        encoding,
+        config["COMPRESS_BROTLI_QUALITY" if encoding == "br" else "COMPRESS_LEVEL"],
+    )
+    if response.is_streamed:
+        # Closing the original stream too tears down stream_with_context.
+        response.response = ClosingIterator(
+            _stream(response.response, compressor, response.charset),
+            getattr(response.response, "close", None),
+        )
+        del response.headers["Content-Length"]
+    else:
+        data: bytes = response.get_data()
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.content_encoding = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Register compress_response to run after each request.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.after_request(compress_response)
@@ -0,0 +1,82 @@
+"""Conditional GET support driven by the content version."""
+from datetime import datetime, timezone
+import functools
+from typing import Any, Optional, Tuple
+
+from flask import current_app, g, make_response, request, session
+from werkzeug import Response
+
+from flaskr import queries
+from flaskr.db import get_db
+
+
+def get_content_version() -> Tuple[int, datetime]:
+    """Return the version and time of the last change to any post.
+
+    Both are kept up to date by triggers on the ``post`` table.
+
+    Returns:
+        Tuple[int, datetime]: The version and when it last changed, in UTC.
+    """
+    version, modified = get_db().execute(queries.CONTENT_VERSION).fetchone()
+    return version, modified
+
+
+def _not_modified(etag: str, last_modified: datetime) -> bool:
+    if request.if_none_match:
+        # Weak comparison, as compress_response makes the ETag weak.
+        return bool(request.if_none_match.contains_weak(etag))
+
+    since: Optional[datetime] = request.if_modified_since
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return last_modified <= since
+
+    return False
+
+
+def conditional(view: Any) -> Any:
+    """Serve a view with an ETag and Last-Modified and honour them.
+
+    The validators are built from the content version, the id of the
+    logged in user and ``ETAG_SALT``, so they change whenever anything the
+    page shows might have changed. A request whose ``If-None-Match`` or
+    ``If-Modified-Since`` matches gets a 304 before the view runs. Responses
+    for a request with pending flash messages get no validators.
+
+    The version is left in ``g.content_version`` for the view to use.
+
+    Args:
+        view (Any): The view function to be decorated.
+
+    Returns:
+        Any: The decorated view function.
+    """
+
+    @functools.wraps(view)
+    def wrapped_view(**kwargs: Any) -> Any:
+        if "_flashes" in session:
+            return view(**kwargs)
+
+        version, last_modified = get_content_version()
+        g.content_version = version
+        user_id: int = 0 if g.user is None else g.user.id
+        etag: str = f"{current_app.config['ETAG_SALT']}-{version}-{user_id}"
+
+        response: Response
+        if _not_modified(etag, last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(**kwargs))
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        if g.user is not None:
+            response.cache_control.private = True
+
+        return response
+
+    return wrapped_view
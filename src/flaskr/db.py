@@ -1,48 +1,208 @@
 """Ensure that the database is available."""
+import os
+import re
 import sqlite3
 from sqlite3 import Connection
+import threading
+from typing import Any, cast, List, Optional, Tuple
 
 import click
-from flask import current_app, Flask, g
+from flask import current_app, Flask, g, has_request_context, request
 from flask.cli import with_appcontext
 
+from flaskr import render, tracing
+from flaskr.pool import ConnectionPool, PoolTimeoutError
+
+_pool_lock = threading.Lock()
+
+
+def get_pool(read_only: bool = False) -> ConnectionPool:
+    """Return a connection pool of the current app, creating it if needed.
+
+    Args:
+        read_only (bool): Return the read-only pool instead of the writer pool.
+
+    Returns:
+        ConnectionPool: The pool configured from the app config.
+    """
+    key: str = "flaskr_read_pool" if read_only else "flaskr_pool"
+    pool = current_app.extensions.get(key)
+
+    if pool is None:
+        with _pool_lock:
+            pool = current_app.extensions.get(key)
+            if pool is None:
+                pool = ConnectionPool.from_config(current_app.config, read_only)
+                current_app.extensions[key] = pool
+
+    return pool
+
+
+def _checkout(name: str, read_only: bool) -> Connection:
+    if name not in g:
+        db: Any = get_pool(read_only).acquire()
+        trace: bool = current_app.config["SQL_TRACE"]
+        slow_ms: Optional[float] = current_app.config["SQL_SLOW_QUERY_MS"]
+
+        if trace or slow_ms is not None:
+            stats = g.get("sql_stats") or tracing.QueryStats()
+            if trace:
+                g.sql_stats = stats
+            db = tracing.TracedConnection(
+                db, stats, None if slow_ms is None else slow_ms / 1000
+            )
+
+        setattr(g, name, db)
+
+    return cast(Connection, g.get(name))
+
 
 def get_db() -> Connection:
     """Returns a connetion to the database.
 
+    GET and HEAD requests get the read-only connection from get_read_db; \
+    everything else, including commands run outside a request, gets the \
+    writer from get_write_db.
+
+    Returns:
+        Connection: The sqlite3 database connection.
+    """
+    if has_request_context() and request.method in ("GET", "HEAD"):
+        return get_read_db()
+    return get_write_db()
+
+
+def get_write_db() -> Connection:
+    """Returns the read-write connection to the database.
+
+    The connection is checked out of the app's writer pool the first time it
+    is needed and stays in ``g.db`` until the app context ends, so check it
+    out as late as possible. It is only wrapped for tracing when
+    ``SQL_TRACE`` or ``SQL_SLOW_QUERY_MS`` is set.
+
     Returns:
         Connection: The sqlite3 database connection.
     """
-    if "db" not in g:
-        g.db = sqlite3.connect(
-            current_app.config["DATABASE"], detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+    return _checkout("db", read_only=False)
 
-    print(type(g.db))
-    return g.db
+
+def get_read_db() -> Connection:
+    """Returns a read-only connection to the database.
+
+    Use it for the reads made while handling a POST, so they do not wait \
+    for the writer. It stays in ``g.read_db`` until the app context ends.
+
+    Returns:
+        Connection: The sqlite3 database connection.
+    """
+    return _checkout("read_db", read_only=True)
 
 
 def close_db(e: Exception = None) -> None:
-    """Close the database instance and remove it from the global variable.
+    """Return the database connections to their pools and remove them from g.
 
     Args:
         e (Exception): Defaults to None.
     """
-    db = g.pop("db", None)
+    for name in ("db", "read_db"):
+        db = g.pop(name, None)
 
-    if db is not None:
-        db.close()
+        if db is not None:
+            db.close()
 
 
 def init_db() -> None:
     """Initalise the database by creating the tables."""
-    db: Connection = get_db()
+    db: Connection = get_write_db()
 
     with current_app.open_resource("schema.sql", "r") as f:
         # db.executescript(f.read().decode("utf8"))
         db.executescript(f.read())
 
+    upgrade_db()
+
+
+def list_migrations() -> List[Tuple[int, str]]:
+    """List the migration scripts shipped in the migrations folder.
+
+    Scripts are named ``<version>_<name>.sql`` and applied in version order.
+
+    Returns:
+        List[Tuple[int, str]]: The version and file name of each migration.
+    """
+    folder: str = os.path.join(current_app.root_path, "migrations")
+    migrations: List[Tuple[int, str]] = []
+
+    for filename in os.listdir(folder):
+        match = re.fullmatch(r"(\d+)_\w+\.sql", filename)
+        if match is not None:
+            migrations.append((int(match.group(1)), filename))
+
+    return sorted(migrations)
+
+
+def get_schema_version() -> int:
+    """Return the version of the last migration applied to the database.
+
+    Returns:
+        int: The schema version, 0 when no migration has been applied.
+    """
+    db: Connection = get_write_db()
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INTEGER PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " applied TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    return db.execute(
+        "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+    ).fetchone()[0]
+
+
+def upgrade_db() -> List[str]:
+    """Apply the migrations newer than the current schema version.
+
+    Each migration runs in its own transaction together with the row that
+    records it in ``schema_version``, so existing data is kept and a failed
+    migration leaves the database at the previous version. Migrations can
+    call the SQL functions of flaskr.render.
+
+    Returns:
+        List[str]: The file names of the migrations that were applied.
+
+    Raises:
+        sqlite3.Error: If a migration fails; it is rolled back first.
+    """
+    db: Connection = get_write_db()
+    current: int = get_schema_version()
+    applied: List[str] = []
+    render.register_functions(db, current_app.config["EXCERPT_LENGTH"])
+
+    for version, filename in list_migrations():
+        if version <= current:
+            continue
+
+        with current_app.open_resource(os.path.join("migrations", filename), "r") as f:
+            script: str = f.read()
+
+        try:
+            # The script leaves its transaction open, so the version row is
+            # committed with it.
+            db.executescript(f"BEGIN;\n{script}")
+            db.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, filename),
+            )
+            db.commit()
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.rollback()
+            raise
+
+        applied.append(filename)
+
+    return applied
+
 
 @click.command("init-db")
 @with_appcontext
@@ -52,6 +212,99 @@ def init_db_command() -> None:
     click.echo("Initialised the database")
 
 
+@click.command("db-upgrade")
+@with_appcontext
+def upgrade_db_command() -> None:
+    """Apply pending migrations without touching existing data."""
+    applied: List[str] = upgrade_db()
+
+    for filename in applied:
+        click.echo(f"Applied {filename}")
+
+    click.echo(f"Database is at version {get_schema_version()}")
+
+
+def rebuild_search_index() -> int:
+    """Rebuild the full-text index of posts from the post table.
+
+    Returns:
+        int: The number of posts indexed.
+    """
+    db: Connection = get_write_db()
+    db.execute("INSERT INTO post_search (post_search) VALUES ('rebuild')")
+    db.execute("INSERT INTO post_search (post_search) VALUES ('optimize')")
+    db.commit()
+    return db.execute("SELECT COUNT(*) FROM post").fetchone()[0]
+
+
+@click.command("search-rebuild")
+@with_appcontext
+def rebuild_search_index_command() -> None:
+    """Rebuild the full-text search index in bulk."""
+    click.echo(f"Indexed {rebuild_search_index()} posts")
+
+
+def render_posts() -> int:
+    """Compute the excerpt and HTML of every post again.
+
+    Run it after changing ``EXCERPT_LENGTH`` or the renderers.
+
+    Returns:
+        int: The number of posts rendered.
+    """
+    db: Connection = get_write_db()
+    render.register_functions(db, current_app.config["EXCERPT_LENGTH"])
+    count: int = db.execute(
+        "UPDATE post SET excerpt = make_excerpt(body), body_html = render_body(body)"
+    ).rowcount
+    db.commit()
+    return count
+
+
+@click.command("posts-render")
+@with_appcontext
+def render_posts_command() -> None:
+    """Recompute the stored excerpt and HTML of every post."""
+    click.echo(f"Rendered {render_posts()} posts")
+
+
+def database_locked(e: sqlite3.OperationalError) -> Any:
+    """Ask the client to retry when SQLite could not get a lock in time.
+
+    Other operational errors are raised again and end in a 500 as before.
+
+    Args:
+        e (sqlite3.OperationalError): The error.
+
+    Returns:
+        Any: A 503 response with a Retry-After header.
+
+    Raises:
+        e: The error, if it is not a lock timeout.
+    """
+    if "locked" not in str(e):
+        raise e
+
+    current_app.logger.warning("%s: %s %s", e, request.method, request.path)
+    return str(e), 503, {"Retry-After": "1", "Content-Type": "text/plain"}
+
+
+def database_busy(e: PoolTimeoutError) -> Any:
+    """Ask the client to retry when no pooled connection came free in time.
+
+    With one writer connection, this is how contention between writers \
+    shows up, so it is answered like a lock timeout.
+
+    Args:
+        e (PoolTimeoutError): The error.
+
+    Returns:
+        Any: A 503 response with a Retry-After header.
+    """
+    current_app.logger.warning("%s: %s %s", e, request.method, request.path)
+    return str(e), 503, {"Retry-After": "1", "Content-Type": "text/plain"}
+
+
 def init_app(app: Flask) -> None:
     """Register the close_db and init_db_command functions.
 
@@ -61,4 +314,8 @@ def init_app(app: Flask) -> None:
         app (Flask): The Flask application instance.
     """
     app.teardown_appcontext(close_db)
+    app.after_request(tracing.server_timing)
+    app.register_error_handler(sqlite3.OperationalError, database_locked)
+    app.register_error_handler(PoolTimeoutError, database_busy)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(upgrade_db_command)
@@ -0,0 +1,180 @@
+"""Password hashing on a bounded pool of worker threads."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from flask import current_app
+from werkzeug.security import (
+    check_password_hash,
+    DEFAULT_PBKDF2_ITERATIONS,
+    generate_password_hash,
+)
+
+from flaskr import metrics
+
+
+class HasherBusyError(RuntimeError):
+    """Raised when the hashing pool is full or a job outlasts the timeout."""
+
+
+class PasswordHasher:
+    """Hash and check passwords away from the request threads.
+
+    At most ``workers`` hashes run at once and ``queue_size`` more may wait.
+    Anything beyond that is refused at once with HasherBusyError, so a burst
+    of logins cannot tie up every request thread of the worker.
+    """
+
+    def __init__(
+        self: Any,
+        workers: int = 2,
+        queue_size: int = 8,
+        timeout: float = 10.0,
+        method: str = f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}",
+        salt_length: int = 8,
+    ) -> None:
+        """Create the hasher; its threads are started on first use.
+
+        Args:
+            workers (int): The number of hashing threads.
+            queue_size (int): How many jobs may wait for a thread.
+            timeout (float): How long a request waits for its result.
+            method (str): The werkzeug hash method, such as \
+            ``pbkdf2:sha256:150000``.
+            salt_length (int): The length of the salt.
+        """
+        self.workers: int = workers
+        self.timeout: float = timeout
+        self.method: str = method
+        self.salt_length: int = salt_length
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: int = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls: Any, config: Any) -> "PasswordHasher":
+        """Create a hasher from the application config.
+
+        Args:
+            config (Any): The Flask config.
+
+        Returns:
+            PasswordHasher: The new hasher.
+        """
+        return cls(
+            workers=config["PASSWORD_HASH_WORKERS"],
+            queue_size=config["PASSWORD_HASH_QUEUE_SIZE"],
+            timeout=config["PASSWORD_HASH_TIMEOUT"],
+            method=config["PASSWORD_HASH_METHOD"],
+            salt_length=config["PASSWORD_SALT_LENGTH"],
+        )
+
+    def hash(self: Any, password: str) -> str:
+        """Hash a password with the configured method.
+
+        Args:
+            password (str): The password.
+
+        Returns:
+            str: The hash to store.
+        """
+        return self._timed(
+            "hash", generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self: Any, pwhash: str, password: str) -> bool:
+        """Check a password against a stored hash.
+
+        Args:
+            pwhash (str): The stored hash.
+            password (str): The password to check.
+
+        Returns:
+            bool: Whether the password matches.
+        """
+        return self._timed("verify", check_password_hash, pwhash, password)
+
+    def needs_rehash(self: Any, pwhash: str) -> bool:
+        """Whether a stored hash was made with other parameters.
+
+        Args:
+            pwhash (str): The stored hash.
+
+        Returns:
+            bool: True if the hash should be replaced.
+        """
+        if pwhash.count("$") != 2:
+            return True
+
+        method, salt, _ = pwhash.split("$")
+        return (
+            _with_iterations(method) != _with_iterations(self.method)
+            or len(salt) != self.salt_length
+        )
+
+    def _timed(
+        self: Any, operation: str, function: Callable[..., Any], *args: Any
+    ) -> Any:
+        start: float = time.perf_counter()
+        result: Any = self._run(function, *args)
+        metrics.observe(
+            "flaskr_password_hash_duration_seconds",
+            time.perf_counter() - start,
+            operation=operation,
+        )
+        return result
+
+    def _run(self: Any, function: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError("Too many password checks are in progress.")
+
+        try:
+            future: Future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            # The job keeps its slot until it ends, so the pool stays bounded.
+            raise HasherBusyError(
+                f"The password check took longer than {self.timeout}s."
+            ) from None
+
+    def _get_executor(self: Any) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, so each process starts its own.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="flaskr-hash"
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+
+def _with_iterations(method: str) -> str:
+    if method.startswith("pbkdf2:") and method.count(":") == 1:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def get_hasher() -> PasswordHasher:
+    """Return the password hasher of the current app, creating it if needed.
+
+    Returns:
+        PasswordHasher: The hasher configured from the app config.
+    """
+    hasher: Optional[PasswordHasher] = current_app.extensions.get("flaskr_hasher")
+
+    if hasher is None:
+        hasher = current_app.extensions.setdefault(
+            "flaskr_hasher", PasswordHasher.from_config(current_app.config)
+        )
+
+    return hasher
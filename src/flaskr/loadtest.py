@@ -0,0 +1,288 @@
+"""Replay a mix of reads, logins and writes from a pool of threads."""
+from concurrent.futures import ThreadPoolExecutor
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import (
+    build_opener,
+    HTTPCookieProcessor,
+    HTTPRedirectHandler,
+    OpenerDirector,
+)
+
+import click
+from flask import current_app, Flask
+from flask.cli import with_appcontext
+
+#: The kinds of request in a mix, in the order they are reported.
+KINDS = ("read", "login", "write")
+
+#: How the 503s sent by flaskr.db on lock, pool and write queue timeouts start.
+CONTENTION = (
+    b"database is locked",
+    b"No database connection free",
+    b"Write not started",
+)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Return a nearest-rank percentile of sorted values.
+
+    Args:
+        ordered (List[float]): The values, sorted.
+        fraction (float): The percentile as a fraction, such as 0.95.
+
+    Returns:
+        float: The percentile.
+    """
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse a mix such as ``read=80,login=10,write=10`` into weights.
+
+    Args:
+        value (str): The mix.
+
+    Returns:
+        Dict[str, float]: The weight of each kind of request.
+
+    Raises:
+        BadParameter: If a kind is unknown or a weight is not a number.
+    """
+    weights: Dict[str, float] = dict.fromkeys(KINDS, 0.0)
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in weights:
+            raise click.BadParameter(
+                f"unknown request kind {kind!r}", param_hint="--mix"
+            )
+        try:
+            weights[kind] = float(weight)
+        except ValueError as e:
+            raise click.BadParameter(
+                f"{weight!r} is not a weight", param_hint="--mix"
+            ) from e
+
+    if sum(weights.values()) <= 0:
+        raise click.BadParameter(
+            "at least one weight must be positive", param_hint="--mix"
+        )
+    return weights
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Hand redirects back as responses; a 302 after a form post is a success."""
+
+    def redirect_request(self: Any, *args: Any) -> None:
+        """Never follow a redirect.
+
+        Args:
+            *args (Any): Ignored.
+        """
+
+
+class LoadTest:
+    """A run of requests against the current app or a URL.
+
+    Reads are anonymous. Each login starts a new session, and writes are made
+    as ``username`` from a session that each thread logs in once, untimed.
+    """
+
+    def __init__(
+        self: Any,
+        app: Flask,
+        url: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> None:
+        """Prepare a run; no request is made until run is called.
+
+        Args:
+            app (Flask): The application to call in process.
+            url (str, optional): The base URL to call instead of the app.
+            username (str, optional): The user that logs in and writes.
+            password (str, optional): Their password.
+        """
+        self.app = app
+        self.url = url.rstrip("/") if url else None
+        self.login = {"username": username or "", "password": password or ""}
+        self._local = threading.local()
+
+    def _new_client(self: Any) -> Any:
+        if self.url is None:
+            return self.app.test_client()
+        return build_opener(HTTPCookieProcessor(), _NoRedirect())
+
+    def _client(self: Any, kind: str) -> Any:
+        if kind == "login":
+            return self._new_client()
+
+        client = getattr(self._local, kind, None)
+        if client is None:
+            client = self._new_client()
+            if kind == "write":
+                self._call(client, "/auth/login", self.login)
+            setattr(self._local, kind, client)
+        return client
+
+    def _call(
+        self: Any, client: Any, path: str, form: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, bytes]:
+        if self.url is None:
+            if form is None:
+                response = client.get(path)
+            else:
+                response = client.post(path, data=form)
+            return response.status_code, response.get_data()
+
+        opener: OpenerDirector = client
+        data: Optional[bytes] = None if form is None else urlencode(form).encode()
+        try:
+            with opener.open(self.url + path, data, timeout=30) as response:
+                return response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def request(self: Any, kind: str, number: int) -> Tuple[str, float, int, bool]:
+        """Make and time one request.
+
+        Args:
+            kind (str): One of :data:`KINDS`.
+            number (int): The position of the request, used to vary writes.
+
+        Returns:
+            Tuple[str, float, int, bool]: The kind, latency and status, and \
+            whether SQLite timed out on a lock or the writer pool on a \
+            connection.
+        """
+        client: Any = self._client(kind)
+        path, form = {
+            "read": ("/", None),
+            "login": ("/auth/login", self.login),
+            "write": ("/create", {"title": f"load {number}", "body": "load test"}),
+        }[kind]
+
+        start: float = time.perf_counter()
+        try:
+            status, body = self._call(client, path, form)
+        except Exception as e:  # noqa: B902
+            status, body = 0, str(e).encode()
+        contended: bool = body.startswith(CONTENTION)
+        return kind, time.perf_counter() - start, status, contended
+
+    def run(
+        self: Any, mix: Dict[str, float], count: int, threads: int, seed: int = 0
+    ) -> Dict[str, Any]:
+        """Make ``count`` requests drawn from ``mix`` on ``threads`` threads.
+
+        Responses other than 200, 302 and 304 count as errors, and the 503s \
+        sent when SQLite timed out on a lock, or the writer pool on a \
+        connection, are also counted on their own.
+
+        Args:
+            mix (Dict[str, float]): The weight of each kind of request.
+            count (int): The number of requests.
+            threads (int): The number of threads.
+            seed (int): The seed that picks the order of the requests.
+
+        Returns:
+            Dict[str, Any]: The totals, overall and for each kind.
+        """
+        rng = random.Random(seed)
+        kinds: List[str] = rng.choices(list(mix), list(mix.values()), k=count)
+
+        start: float = time.perf_counter()
+        with ThreadPoolExecutor(threads, thread_name_prefix="loadtest") as pool:
+            results = list(pool.map(self.request, kinds, range(count)))
+        elapsed: float = time.perf_counter() - start
+
+        report: Dict[str, Any] = summarize(results, elapsed)
+        report["kinds"] = {
+            kind: summarize([r for r in results if r[0] == kind], elapsed)
+            for kind in KINDS
+            if kind in kinds
+        }
+        return report
+
+
+def summarize(
+    results: List[Tuple[str, float, int, bool]], elapsed: float
+) -> Dict[str, Any]:
+    """Total a list of results from :meth:`LoadTest.request`.
+
+    Args:
+        results (List[Tuple[str, float, int, bool]]): The results.
+        elapsed (float): The wall time of the whole run.
+
+    Returns:
+        Dict[str, Any]: The request, error and lock counts, rate and \
+        latencies in ms.
+    """
+    ordered: List[float] = sorted(r[1] for r in results)
+    errors: int = sum(r[2] not in (200, 302, 304) for r in results)
+    locked: int = sum(r[2] == 503 and r[3] for r in results)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "locked": locked,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000 if ordered else 0.0,
+        "p95_ms": percentile(ordered, 0.95) * 1000 if ordered else 0.0,
+        "p99_ms": percentile(ordered, 0.99) * 1000 if ordered else 0.0,
+    }
+
+
+def _line(name: str, totals: Dict[str, Any]) -> str:
+    error_rate: float = totals["errors"] / max(totals["requests"], 1) * 100
+    return (
+        f"{name:<6} {totals['requests']:>8} {totals['rps']:>9.1f}"
+        f" {totals['p50_ms']:>8.2f} {totals['p95_ms']:>8.2f}"
+        f" {totals['p99_ms']:>8.2f} {error_rate:>6.1f}% {totals['locked']:>7}"
+    )
+
+
+@click.command("loadtest")
+@click.option("--url", help="Base URL of a running server [default: in process].")
+@click.option(
+    "--mix",
+    default="read=80,login=10,write=10",
+    show_default=True,
+    help="Weights of each kind of request.",
+)
+@click.option("-n", "--requests", "count", default=1000, show_default=True)
+@click.option("-t", "--threads", default=8, show_default=True)
+@click.option("--username", help="The user that logs in and writes.")
+@click.option("--password", help="Their password.")
+@click.option("--seed", default=0, show_default=True)
+@with_appcontext
+def loadtest_command(
+    url: Optional[str],
+    mix: str,
+    count: int,
+    threads: int,
+    username: Optional[str],
+    password: Optional[str],
+    seed: int,
+) -> None:
+    """Load test the app, or a server at URL, and report latencies."""
+    weights: Dict[str, float] = parse_mix(mix)
+    if (weights["login"] or weights["write"]) and not (username and password):
+        raise click.UsageError("Logins and writes need --username and --password.")
+
+    test = LoadTest(current_app._get_current_object(), url, username, password)
+    report: Dict[str, Any] = test.run(weights, count, threads, seed)
+
+    click.echo(
+        f"{'kind':<6} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'p99 ms':>8} {'errors':>7} {'locked':>7}"
+    )
+    for kind, totals in report["kinds"].items():
+        click.echo(_line(kind, totals))
+    click.echo(_line("total", report))
@@ -0,0 +1,470 @@
+"""Request, database and hashing metrics in the Prometheus text format.
+
+Each process counts in memory and writes its totals to its own file in
+``METRICS_DIR`` at most every ``METRICS_FLUSH_INTERVAL`` seconds. The
+``/metrics`` view sums the files of all processes, so any worker can answer
+a scrape for the whole server. The files of processes that have exited are
+merged into one archive file when a scrape finds them, so the directory
+does not grow with every worker ever started.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Blueprint, current_app, Flask, g, has_app_context, request
+from werkzeug import Response
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+bp = Blueprint("metrics", __name__)
+
+#: The upper bounds of the histogram buckets, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+#: The type and help text of each metric.
+METRICS = {
+    "flaskr_http_requests_total": (
+        "counter",
+        "Requests handled, by endpoint, method and status.",
+    ),
+    "flaskr_http_request_duration_seconds": (
+        "histogram",
+        "Time from the start of a request to its response, by endpoint.",
+    ),
+    "flaskr_db_checkouts_total": (
+        "counter",
+        "Connections checked out of a pool by a request.",
+    ),
+    "flaskr_db_queries_total": (
+        "counter",
+        "SQL statements run, by endpoint, while SQL_TRACE is set.",
+    ),
+    "flaskr_db_query_seconds_total": (
+        "counter",
+        "Time spent running SQL statements, by endpoint, while SQL_TRACE is set.",
+    ),
+    "flaskr_db_connections": (
+        "gauge",
+        "Connections of the live processes, by pool and state.",
+    ),
+    "flaskr_password_hash_duration_seconds": (
+        "histogram",
+        "Time to hash or verify a password, waiting for a thread included.",
+    ),
+}
+
+#: The file, in ``METRICS_DIR``, holding the totals of exited processes.
+ARCHIVE = "archive.json"
+
+#: A metric name and its labels, sorted.
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """The metrics of one process, and the file they are written to."""
+
+    def __init__(self: Any, directory: str, flush_interval: float = 1.0) -> None:
+        """Create an empty registry; nothing is written until a flush.
+
+        Args:
+            directory (str): Where each process writes its file.
+            flush_interval (float): The least time between two writes.
+        """
+        self.directory: str = directory
+        self.flush_interval: float = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self: Any) -> None:
+        self._counters: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, List[float]] = {}
+        self._flushed: float = 0.0
+        self._pid: int = os.getpid()
+        # Pids are reused, so the file name also tells processes apart.
+        self.filename: str = f"{self._pid}-{secrets.token_hex(4)}.json"
+
+    def _check_pid(self: Any) -> None:
+        # A forked worker starts from zero; its parent reports what came before.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self: Any, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Add to a counter.
+
+        Args:
+            name (str): The metric.
+            value (float): The amount.
+            **labels (Any): The labels.
+        """
+        key: _Key = _key(name, labels)
+        with self._lock:
+            self._check_pid()
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self: Any, name: str, value: float, **labels: Any) -> None:
+        """Record a value in a histogram.
+
+        Args:
+            name (str): The metric.
+            value (float): The value, in seconds.
+            **labels (Any): The labels.
+        """
+        key: _Key = _key(name, labels)
+        with self._lock:
+            self._check_pid()
+            # One count per bucket, then the +Inf bucket, the sum and the count.
+            histogram: List[float] = self._histograms.setdefault(
+                key, [0.0] * (len(BUCKETS) + 3)
+            )
+            histogram[bisect_left(BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self: Any, gauges: Dict[_Key, float]) -> Dict[str, Any]:
+        """Return the metrics of this process in the form they are written in.
+
+        Args:
+            gauges (Dict[_Key, float]): The current gauge values.
+
+        Returns:
+            Dict[str, Any]: The pid and the counters, histograms and gauges.
+        """
+        with self._lock:
+            self._check_pid()
+            return {
+                "pid": self._pid,
+                "counters": [[*key, value] for key, value in self._counters.items()],
+                "histograms": [
+                    [*key, list(values)] for key, values in self._histograms.items()
+                ],
+                "gauges": [[*key, value] for key, value in gauges.items()],
+            }
+
+    def flush(self: Any, gauges: Dict[_Key, float], force: bool = False) -> None:
+        """Write the metrics of this process, if the interval has passed.
+
+        Args:
+            gauges (Dict[_Key, float]): The current gauge values.
+            force (bool): Write even if the last write was recent.
+        """
+        now: float = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+
+        snapshot: Dict[str, Any] = self.snapshot(gauges)
+        path: str = os.path.join(self.directory, self.filename)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f"{path}.{threading.get_ident()}.tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(f.name, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _snapshots(directory: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    try:
+        filenames: List[str] = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return
+
+    for filename in filenames:
+        if filename.endswith(".json") and filename != ARCHIVE:
+            path: str = os.path.join(directory, filename)
+            try:
+                with open(path) as f:
+                    yield path, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+@contextmanager
+def _locked(directory: str) -> Iterator[None]:
+    with open(os.path.join(directory, ".lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _add(
+    totals: Dict[str, Dict[_Key, Any]], snapshot: Dict[str, Any], kinds: Iterable[str]
+) -> None:
+    for kind in kinds:
+        summed: Dict[_Key, Any] = totals[kind]
+        for name, labels, value in snapshot[kind]:
+            key: _Key = (name, tuple(tuple(label) for label in labels))
+            if kind == "histograms":
+                total: List[float] = summed.get(key, [0.0] * len(value))
+                summed[key] = [a + b for a, b in zip(total, value)]
+            else:
+                summed[key] = summed.get(key, 0.0) + value
+
+
+def _archive(directory: str, dead: List[Tuple[str, Dict[str, Any]]]) -> None:
+    path: str = os.path.join(directory, ARCHIVE)
+    archived: Dict[str, Dict[_Key, Any]] = {"counters": {}, "histograms": {}}
+    try:
+        with open(path) as f:
+            _add(archived, json.load(f), archived)
+    except FileNotFoundError:
+        pass
+
+    for _, snapshot in dead:
+        _add(archived, snapshot, archived)
+
+    with open(path + ".tmp", "w") as f:
+        json.dump(
+            {
+                kind: [[name, labels, value] for (name, labels), value in items.items()]
+                for kind, items in archived.items()
+            },
+            f,
+        )
+    os.replace(f.name, path)
+    for dead_path, _ in dead:
+        os.remove(dead_path)
+
+
+def collect(directory: str) -> Dict[str, Dict[_Key, Any]]:
+    """Sum the metrics written by every process.
+
+    Counters and histograms of processes that have exited are kept, so the \
+    totals never go down; gauges only count the processes still running. \
+    The files of exited processes are merged into :data:`ARCHIVE` and \
+    removed, under a lock that every scrape takes, so no scrape sees a \
+    process counted twice or not at all.
+
+    Args:
+        directory (str): The ``METRICS_DIR``.
+
+    Returns:
+        Dict[str, Dict[_Key, Any]]: The counters, histograms and gauges.
+    """
+    totals: Dict[str, Dict[_Key, Any]] = {
+        "counters": {},
+        "histograms": {},
+        "gauges": {},
+    }
+    if not os.path.isdir(directory):
+        return totals
+
+    with _locked(directory):
+        alive: List[Dict[str, Any]] = []
+        dead: List[Tuple[str, Dict[str, Any]]] = []
+        for path, snapshot in _snapshots(directory):
+            if _alive(snapshot["pid"]):
+                alive.append(snapshot)
+            else:
+                dead.append((path, snapshot))
+
+        # Without a file lock, two scrapes could merge the same file twice.
+        if dead and fcntl is not None:
+            _archive(directory, dead)
+            dead = []
+
+        try:
+            with open(os.path.join(directory, ARCHIVE)) as f:
+                _add(totals, json.load(f), ("counters", "histograms"))
+        except FileNotFoundError:
+            pass
+
+    for _, snapshot in dead:
+        _add(totals, snapshot, ("counters", "histograms"))
+    for snapshot in alive:
+        _add(totals, snapshot, totals)
+
+    return totals
+
+
+def _quote(value: str) -> str:
+    escaped: str = value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+    return '"' + escaped + '"'
+
+
+def _sample(
+    name: str, labels: Iterable[Tuple[str, str]], value: float, suffix: str = ""
+) -> str:
+    text: str = ",".join(f"{k}={_quote(v)}" for k, v in labels)
+    if text:
+        return f"{name}{suffix}{{{text}}} {float(value)!r}"
+    return f"{name}{suffix} {float(value)!r}"
+
+
+def render(totals: Dict[str, Dict[_Key, Any]]) -> str:
+    """Format summed metrics in the Prometheus text format.
+
+    Args:
+        totals (Dict[str, Dict[_Key, Any]]): What :func:`collect` returned.
+
+    Returns:
+        str: The exposition.
+    """
+    samples: Dict[str, List[str]] = {name: [] for name in METRICS}
+
+    for kind in ("counters", "gauges"):
+        for (name, labels), value in sorted(totals[kind].items()):
+            samples.setdefault(name, []).append(_sample(name, labels, value))
+
+    for (name, labels), values in sorted(totals["histograms"].items()):
+        cumulative: float = 0.0
+        for bound, count in zip((*BUCKETS, float("inf")), values):
+            cumulative += count
+            le: str = "+Inf" if bound == float("inf") else f"{bound:g}"
+            samples.setdefault(name, []).append(
+                _sample(name, (*labels, ("le", le)), cumulative, "_bucket")
+            )
+        samples[name].append(_sample(name, labels, values[-2], "_sum"))
+        samples[name].append(_sample(name, labels, values[-1], "_count"))
+
+    lines: List[str] = []
+    for name, lines_of_metric in samples.items():
+        if not lines_of_metric:
+            continue
+        kind, help_text = METRICS.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(lines_of_metric)
+    return "\n".join(lines) + "\n"
+
+
+def get_registry() -> Optional[Registry]:
+    """Return the metrics of the current app, creating them if needed.
+
+    Returns:
+        Optional[Registry]: The registry, or None when ``METRICS_ENABLED`` \
+        is off or there is no app context.
+    """
+    if not has_app_context() or not current_app.config["METRICS_ENABLED"]:
+        return None
+
+    registry: Optional[Registry] = current_app.extensions.get("flaskr_metrics")
+    if registry is None:
+        registry = current_app.extensions.setdefault(
+            "flaskr_metrics",
+            Registry(
+                current_app.config["METRICS_DIR"],
+                current_app.config["METRICS_FLUSH_INTERVAL"],
+            ),
+        )
+    return registry
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record a value in a histogram of the current app, if metrics are on.
+
+    Args:
+        name (str): The metric.
+        value (float): The value, in seconds.
+        **labels (Any): The labels.
+    """
+    registry: Optional[Registry] = get_registry()
+    if registry is not None:
+        registry.observe(name, value, **labels)
+
+
+def _gauges() -> Dict[_Key, float]:
+    gauges: Dict[_Key, float] = {}
+    for pool, extension in (("write", "flaskr_pool"), ("read", "flaskr_read_pool")):
+        # Pools are only read, never created, by a scrape.
+        connection_pool: Any = current_app.extensions.get(extension)
+        if connection_pool is not None:
+            for state, value in connection_pool.stats.items():
+                labels: Dict[str, str] = {"pool": pool, "state": state}
+                gauges[_key("flaskr_db_connections", labels)] = value
+    return gauges
+
+
+def start_timer() -> None:
+    """Note when the request started."""
+    g.metrics_start = time.perf_counter()
+
+
+def record_request(response: Response) -> Response:
+    """Count the request, its status, latency and SQL.
+
+    Args:
+        response (Response): The response.
+
+    Returns:
+        Response: The response, unchanged.
+    """
+    registry: Optional[Registry] = get_registry()
+    start: Optional[float] = g.get("metrics_start")
+    if registry is None or start is None:
+        return response
+
+    endpoint: str = request.endpoint or "none"
+    registry.inc(
+        "flaskr_http_requests_total",
+        endpoint=endpoint,
+        method=request.method,
+        status=response.status_code,
+    )
+    registry.observe(
+        "flaskr_http_request_duration_seconds",
+        time.perf_counter() - start,
+        endpoint=endpoint,
+    )
+
+    for name, pool in (("db", "write"), ("read_db", "read")):
+        if name in g:
+            registry.inc("flaskr_db_checkouts_total", pool=pool)
+    # Only there when SQL_TRACE is set, as tracing times every statement.
+    stats: Any = g.get("sql_stats")
+    if stats is not None and stats.count:
+        registry.inc("flaskr_db_queries_total", stats.count, endpoint=endpoint)
+        registry.inc("flaskr_db_query_seconds_total", stats.total, endpoint=endpoint)
+
+    registry.flush(_gauges())
+    return response
+
+
+@bp.route("/metrics")
+def metrics() -> Response:
+    """Serve the metrics of every process.
+
+    Returns:
+        Response: The metrics, in the Prometheus text format.
+    """
+    registry: Optional[Registry] = get_registry()
+    if registry is None:
+        return Response("Metrics are disabled.\n", 404, mimetype="text/plain")
+
+    registry.flush(_gauges(), force=True)
+    return Response(
+        render(collect(registry.directory)),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def init_app(app: Flask) -> None:
+    """Time every request and serve ``/metrics``.
+
+    Register it before the other request hooks, so its timing covers them.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    app.register_blueprint(bp)
@@ -0,0 +1,5 @@
+-- The index page walks posts newest first by (created, id).
+CREATE INDEX IF NOT EXISTS post_created_id_idx ON post (created, id);
+
+-- Listing or counting one author's posts, newest first.
+CREATE INDEX IF NOT EXISTS post_author_created_id_idx ON post (author_id, created, id);
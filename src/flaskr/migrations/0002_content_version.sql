@@ -0,0 +1,28 @@
+-- A single row that changes whenever a post is written, so HTTP validators
+-- can be checked without reading any posts.
+CREATE TABLE IF NOT EXISTS content_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    modified TIMESTAMP NOT NULL
+);
+
+INSERT OR IGNORE INTO content_version (id, version, modified)
+VALUES (1, 1, CURRENT_TIMESTAMP);
+
+CREATE TRIGGER IF NOT EXISTS post_insert_version AFTER INSERT ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_update_version AFTER UPDATE ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_delete_version AFTER DELETE ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
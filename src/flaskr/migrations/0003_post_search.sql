@@ -0,0 +1,31 @@
+-- Full-text index over post titles and bodies. It stores no copy of the text:
+-- the triggers below keep it in step with the post table.
+CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5(
+    title,
+    body,
+    content='post',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+INSERT INTO post_search (post_search) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS post_search_insert AFTER INSERT ON post
+BEGIN
+    INSERT INTO post_search (rowid, title, body)
+    VALUES (new.id, new.title, new.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_search_delete AFTER DELETE ON post
+BEGIN
+    INSERT INTO post_search (post_search, rowid, title, body)
+    VALUES ('delete', old.id, old.title, old.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_search_update AFTER UPDATE OF title, body ON post
+BEGIN
+    INSERT INTO post_search (post_search, rowid, title, body)
+    VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO post_search (rowid, title, body)
+    VALUES (new.id, new.title, new.body);
+END;
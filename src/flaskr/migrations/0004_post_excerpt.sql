@@ -0,0 +1,82 @@
+-- The excerpt shown on the index and the HTML shown on the post page are
+-- computed when a post is saved, so the index never reads the full body.
+-- The table is rebuilt so that excerpt is stored before body: SQLite reads a
+-- row's columns in order, and a long body spills onto overflow pages that
+-- would otherwise be read to reach a column added after it.
+-- make_excerpt and render_body are the Python functions in flaskr.render.
+CREATE TABLE post_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    author_id INTEGER NOT NULL,
+    created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    title TEXT NOT NULL,
+    excerpt TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL,
+    body_html TEXT NOT NULL DEFAULT '',
+    FOREIGN KEY (author_id) REFERENCES user (id)
+);
+
+INSERT INTO post_new (id, author_id, created, title, excerpt, body, body_html)
+SELECT id, author_id, created, title, make_excerpt(body), body, render_body(body)
+FROM post;
+
+-- Dropping the old table also drops its AUTOINCREMENT high-water mark, so
+-- carry it over; otherwise the ids of deleted newest posts would be reused.
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'post')
+WHERE name = 'post_new'
+AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'post');
+
+INSERT INTO sqlite_sequence (name, seq)
+SELECT 'post_new', seq FROM sqlite_sequence
+WHERE name = 'post'
+AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'post_new');
+
+-- Dropping the old table drops its indexes and triggers; the ids are kept,
+-- so the search index stays valid.
+DROP TABLE post;
+ALTER TABLE post_new RENAME TO post;
+
+CREATE INDEX post_created_id_idx ON post (created, id);
+CREATE INDEX post_author_created_id_idx ON post (author_id, created, id);
+
+CREATE TRIGGER post_insert_version AFTER INSERT ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+CREATE TRIGGER post_update_version AFTER UPDATE ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+CREATE TRIGGER post_delete_version AFTER DELETE ON post
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
+END;
+
+CREATE TRIGGER post_search_insert AFTER INSERT ON post
+BEGIN
+    INSERT INTO post_search (rowid, title, body)
+    VALUES (new.id, new.title, new.body);
+END;
+
+CREATE TRIGGER post_search_delete AFTER DELETE ON post
+BEGIN
+    INSERT INTO post_search (post_search, rowid, title, body)
+    VALUES ('delete', old.id, old.title, old.body);
+END;
+
+CREATE TRIGGER post_search_update AFTER UPDATE OF title, body ON post
+BEGIN
+    INSERT INTO post_search (post_search, rowid, title, body)
+    VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO post_search (rowid, title, body)
+    VALUES (new.id, new.title, new.body);
+END;
+
+-- The pages now show excerpts, so cached copies are out of date.
+UPDATE content_version
+SET version = version + 1, modified = CURRENT_TIMESTAMP WHERE id = 1;
@@ -0,0 +1,43 @@
+-- The number of posts of each user, kept by triggers, so an author page
+-- reads its count from one row instead of counting the author's posts.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES user (id)
+);
+
+INSERT OR REPLACE INTO user_stats (user_id, post_count)
+SELECT u.id, count(p.id)
+FROM user u LEFT JOIN post p ON p.author_id = u.id
+GROUP BY u.id;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_insert AFTER INSERT ON user
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id, post_count) VALUES (new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_delete AFTER DELETE ON user
+BEGIN
+    DELETE FROM user_stats WHERE user_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_insert_user_stats AFTER INSERT ON post
+BEGIN
+    UPDATE user_stats SET post_count = post_count + 1
+    WHERE user_id = new.author_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_delete_user_stats AFTER DELETE ON post
+BEGIN
+    UPDATE user_stats SET post_count = post_count - 1
+    WHERE user_id = old.author_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS post_author_user_stats AFTER UPDATE OF author_id ON post
+WHEN new.author_id IS NOT old.author_id
+BEGIN
+    UPDATE user_stats SET post_count = post_count - 1
+    WHERE user_id = old.author_id;
+    UPDATE user_stats SET post_count = post_count + 1
+    WHERE user_id = new.author_id;
+END;
@@ -0,0 +1,317 @@
+"""A pool of tuned SQLite connections shared by the requests of a worker."""
+import os
+import sqlite3
+from sqlite3 import Connection
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection becomes free before the pool timeout."""
+
+
+class PooledConnection:
+    """A connection checked out of a ConnectionPool.
+
+    It behaves like the sqlite3.Connection it wraps. Closing it hands the
+    connection back to the pool, after which it acts like a closed connection.
+    """
+
+    __slots__ = ("_pool", "_connection")
+
+    def __init__(self: Any, pool: "ConnectionPool", connection: Connection) -> None:
+        """Wrap a connection taken from the pool.
+
+        Args:
+            pool (ConnectionPool): The pool the connection belongs to.
+            connection (Connection): The checked out connection.
+        """
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_connection", connection)
+
+    def _checked_out(self: Any) -> Connection:
+        connection: Optional[Connection] = self._connection
+        if connection is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return connection
+
+    def __getattr__(self: Any, name: str) -> Any:
+        """Delegate to the underlying connection.
+
+        Args:
+            name (str): The attribute name.
+
+        Returns:
+            Any: The attribute of the underlying connection.
+        """
+        return getattr(self._checked_out(), name)
+
+    def __setattr__(self: Any, name: str, value: Any) -> None:
+        """Set an attribute, such as row_factory, on the underlying connection.
+
+        Args:
+            name (str): The attribute name.
+            value (Any): The new value.
+        """
+        setattr(self._checked_out(), name, value)
+
+    def __enter__(self: Any) -> Any:
+        """Start a transaction block, as sqlite3.Connection does.
+
+        Returns:
+            Any: This connection.
+        """
+        self._checked_out().__enter__()
+        return self
+
+    def __exit__(self: Any, *args: Any) -> Any:
+        """Commit or roll back the transaction block.
+
+        Args:
+            *args (Any): The exception details, if any.
+
+        Returns:
+            Any: Whether the exception was handled.
+        """
+        return self._checked_out().__exit__(*args)
+
+    def close(self: Any) -> None:
+        """Return the connection to the pool instead of closing it."""
+        connection: Optional[Connection] = self._connection
+        if connection is not None:
+            object.__setattr__(self, "_connection", None)
+            self._pool.release(connection)
+
+
+class ConnectionPool:
+    """Keep SQLite connections open between requests.
+
+    Connections are set up once, when they are opened, and handed out to one
+    thread at a time. At most ``size`` connections are open; when all of them
+    are checked out, ``acquire`` waits up to ``timeout`` seconds for one to be
+    released. A connection that has been idle for longer than
+    ``ping_interval`` seconds is checked with ``SELECT 1`` before it is reused.
+
+    A ``read_only`` pool opens the database with a ``mode=ro`` URI, so its
+    connections can never take a write lock.
+    """
+
+    def __init__(
+        self: Any,
+        database: str,
+        size: int = 8,
+        timeout: float = 10.0,
+        ping_interval: float = 30.0,
+        pragmas: Optional[Mapping[str, Any]] = None,
+        read_only: bool = False,
+        isolation_level: Optional[str] = "",
+    ) -> None:
+        """Create an empty pool; connections are opened on demand.
+
+        Args:
+            database (str): The path to the database file.
+            size (int): The maximum number of open connections.
+            timeout (float): How long to wait for a free connection.
+            ping_interval (float): Idle time after which a connection is \
+            checked before use.
+            pragmas (Mapping[str, Any], optional): PRAGMA statements run \
+            on every new connection.
+            read_only (bool): Open the database read-only.
+            isolation_level (Optional[str]): How sqlite3 begins implicit \
+            transactions, such as ``"IMMEDIATE"``.
+        """
+        self.database: str = database
+        self.size: int = size
+        self.timeout: float = timeout
+        self.ping_interval: float = ping_interval
+        self.pragmas: Dict[str, Any] = dict(pragmas or {})
+        self.read_only: bool = read_only
+        self.isolation_level: Optional[str] = isolation_level
+        self._idle: List[Tuple[Connection, float]] = []
+        self._open: int = 0
+        self._pid: int = os.getpid()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(
+        cls: Any, config: Mapping[str, Any], read_only: bool = False
+    ) -> "ConnectionPool":
+        """Create a pool from the application config.
+
+        The writer pool holds ``DATABASE_WRITE_POOL_SIZE`` connections, one \
+        by default, so writers queue here instead of failing on the SQLite \
+        lock, and they begin transactions with ``BEGIN IMMEDIATE``. The \
+        read-only pool holds ``DATABASE_POOL_SIZE`` connections, set to \
+        ``query_only``, and leaves the journal mode to the writer.
+
+        Args:
+            config (Mapping[str, Any]): The Flask config.
+            read_only (bool): Create the read-only pool.
+
+        Returns:
+            ConnectionPool: The new pool.
+        """
+        pragmas: Dict[str, Any] = {
+            "busy_timeout": config["SQLITE_BUSY_TIMEOUT"],
+            "cache_size": config["SQLITE_CACHE_SIZE"],
+            "mmap_size": config["SQLITE_MMAP_SIZE"],
+        }
+        if read_only:
+            pragmas["query_only"] = 1
+        else:
+            pragmas["journal_mode"] = config["SQLITE_JOURNAL_MODE"]
+            pragmas["synchronous"] = config["SQLITE_SYNCHRONOUS"]
+
+        return cls(
+            config["DATABASE"],
+            size=config[
+                "DATABASE_POOL_SIZE" if read_only else "DATABASE_WRITE_POOL_SIZE"
+            ],
+            timeout=config["DATABASE_POOL_TIMEOUT"],
+            ping_interval=config["DATABASE_POOL_PING_INTERVAL"],
+            pragmas=pragmas,
+            read_only=read_only,
+            isolation_level=None if read_only else "IMMEDIATE",
+        )
+
+    def connect(self: Any) -> Connection:
+        """Open and set up a new connection.
+
+        Returns:
+            Connection: The connection.
+        """
+        database: str = self.database
+        if self.read_only:
+            database = f"file:{quote(database)}?mode=ro"
+
+        connection: Connection = sqlite3.connect(
+            database,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            isolation_level=self.isolation_level,
+            uri=self.read_only,
+        )
+        connection.row_factory = sqlite3.Row
+
+        for name, value in self.pragmas.items():
+            if value is not None:
+                connection.execute(f"PRAGMA {name} = {value}")
+
+        return connection
+
+    def acquire(self: Any) -> PooledConnection:
+        """Check a connection out of the pool.
+
+        Returns:
+            PooledConnection: The connection, to be closed when finished with.
+
+        Raises:
+            PoolTimeoutError: If every connection stays checked out for \
+            longer than the timeout.
+        """
+        deadline: float = time.monotonic() + self.timeout
+        connection: Optional[Connection] = None
+        idle_since: float = 0.0
+
+        with self._condition:
+            self._after_fork()
+            while connection is None:
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+                elif self._open < self.size:
+                    self._open += 1
+                    break
+                elif not self._condition.wait(deadline - time.monotonic()):
+                    raise PoolTimeoutError(
+                        f"No database connection free after {self.timeout}s."
+                    )
+
+        if connection is not None and not self._healthy(connection, idle_since):
+            # Keep the slot and replace the broken connection.
+            _close_quietly(connection)
+            connection = None
+
+        if connection is None:
+            try:
+                connection = self.connect()
+            finally:
+                if connection is None:
+                    # Opening failed, so give the slot back.
+                    self._discard(None)
+
+        return PooledConnection(self, connection)
+
+    def release(self: Any, connection: Connection) -> None:
+        """Return a connection, rolling back anything left uncommitted.
+
+        Args:
+            connection (Connection): The connection given out by acquire.
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            if self._pid != os.getpid():
+                return
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close(self: Any) -> None:
+        """Close the idle connections.
+
+        Connections that are checked out are closed when they are released.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+
+        for connection, _ in idle:
+            _close_quietly(connection)
+
+    @property
+    def stats(self: Any) -> Dict[str, int]:
+        """The number of open and idle connections.
+
+        Returns:
+            Dict[str, int]: The counters.
+        """
+        with self._condition:
+            return {"open": self._open, "idle": len(self._idle)}
+
+    def _healthy(self: Any, connection: Connection, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            connection.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _discard(self: Any, connection: Optional[Connection]) -> None:
+        if connection is not None:
+            _close_quietly(connection)
+
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def _after_fork(self: Any) -> None:
+        # Connections must not be shared with a parent process, so a forked
+        # worker forgets them and opens its own.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._open = 0
+
+
+def _close_quietly(connection: Connection) -> None:
+    try:
+        connection.close()
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,345 @@
+"""Profile single requests on demand, with cProfile or a sampling thread.
+
+A request is profiled when ``PROFILER_ENABLED`` is set and it either sends
+a token made by ``flask profiles token`` in the ``X-Flaskr-Profile`` header,
+or comes from one of the ``PROFILER_ADMINS`` with a ``_profile`` query
+argument. cProfile runs write a ``.pstats`` file and sampled runs a
+``.collapsed`` file of stacks, which flamegraph.pl and speedscope read, to
+``PROFILER_DIR``, next to a ``.json`` file describing the request.
+"""
+from collections import Counter
+import cProfile
+from datetime import datetime
+import io
+import json
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+import click
+from flask import current_app, Flask, g, request
+from flask.cli import with_appcontext
+from itsdangerous import BadSignature, TimestampSigner
+from werkzeug import Response
+
+#: The request header carrying a signed token.
+HEADER = "X-Flaskr-Profile"
+
+#: How requests can be profiled, and the file each mode writes.
+MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+
+class Sampler:
+    """Record the stack of one thread at a fixed interval, from another thread."""
+
+    def __init__(self: Any, thread_id: int, interval: float) -> None:
+        """Create the sampler; its thread starts with start.
+
+        Args:
+            thread_id (int): The thread to sample.
+            interval (float): The time between samples, in seconds.
+        """
+        self.thread_id: int = thread_id
+        self.interval: float = interval
+        self.stacks: "Counter[str]" = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="flaskr-sampler", daemon=True
+        )
+
+    def start(self: Any) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self: Any) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self: Any) -> None:
+        while not self._stop.wait(self.interval):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def dump(self: Any, path: str) -> None:
+        """Write the stacks in the collapsed format: frames, a space, a count.
+
+        Args:
+            path (str): The file to write.
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def collapse(frame: FrameType) -> str:
+    """Format a stack, outermost frame first, separated by semicolons.
+
+    Args:
+        frame (FrameType): The innermost frame.
+
+    Returns:
+        str: The stack.
+    """
+    names: List[str] = []
+    current: Optional[FrameType] = frame
+    while current is not None:
+        code = current.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        current = current.f_back
+    return ";".join(reversed(names))
+
+
+def _signer() -> TimestampSigner:
+    return TimestampSigner(current_app.secret_key, salt="flaskr-profile")
+
+
+def make_token(mode: str = "cprofile") -> str:
+    """Sign a token that has a request profiled in the given mode.
+
+    Args:
+        mode (str): One of :data:`MODES`.
+
+    Returns:
+        str: The value to send in the ``X-Flaskr-Profile`` header.
+    """
+    return _signer().sign(mode).decode()
+
+
+def requested_mode() -> Optional[str]:
+    """Return how the current request asks to be profiled, if it may be.
+
+    Returns:
+        Optional[str]: One of :data:`MODES`, or None.
+    """
+    token: Optional[str] = request.headers.get(HEADER)
+    if token:
+        try:
+            mode: str = (
+                _signer()
+                .unsign(token, max_age=current_app.config["PROFILER_TOKEN_MAX_AGE"])
+                .decode()
+            )
+        except BadSignature:
+            current_app.logger.warning("Ignoring a bad %s header", HEADER)
+            return None
+        return mode if mode in MODES else None
+
+    if "_profile" in request.args:
+        user: Any = g.get("user")
+        if user is not None and user.username in current_app.config["PROFILER_ADMINS"]:
+            mode = request.args["_profile"] or "cprofile"
+            return mode if mode in MODES else None
+
+    return None
+
+
+def start_profile() -> None:
+    """Start profiling the request, if it asked to be and may be."""
+    mode: Optional[str] = requested_mode()
+    if mode is None:
+        return
+
+    profiler: Any
+    if mode == "sample":
+        profiler = Sampler(
+            threading.get_ident(), current_app.config["PROFILER_SAMPLE_INTERVAL"]
+        )
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active, as with a concurrent profiled request.
+            current_app.logger.warning("Not profiling: another profile is running")
+            return
+
+    g.profile = {
+        "id": f"{datetime.now():%Y%m%dT%H%M%S}-{secrets.token_hex(3)}",
+        "mode": mode,
+        "profiler": profiler,
+        "start": time.perf_counter(),
+    }
+
+
+def tag_response(response: Response) -> Response:
+    """Tell the client the id of its profile.
+
+    Args:
+        response (Response): The response.
+
+    Returns:
+        Response: The response, with the profile id in a header.
+    """
+    profile: Optional[Dict[str, Any]] = g.get("profile")
+    if profile is not None:
+        response.headers[HEADER] = profile["id"]
+        profile["status"] = response.status_code
+    return response
+
+
+def finish_profile(error: Optional[BaseException] = None) -> None:
+    """Stop profiling and write the profile, when the request is done.
+
+    Args:
+        error (Optional[BaseException]): The unhandled error, if any.
+    """
+    profile: Optional[Dict[str, Any]] = g.pop("profile", None)
+    if profile is None:
+        return
+
+    profiler: Any = profile.pop("profiler")
+    duration: float = time.perf_counter() - profile.pop("start")
+    directory: str = current_app.config["PROFILER_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    path: str = os.path.join(directory, profile["id"])
+
+    if isinstance(profiler, Sampler):
+        profiler.stop()
+        profiler.dump(path + MODES["sample"])
+    else:
+        profiler.disable()
+        profiler.dump_stats(path + MODES["cprofile"])
+
+    profile.update(
+        method=request.method,
+        path=request.full_path.rstrip("?"),
+        endpoint=request.endpoint,
+        duration=duration,
+        error=None if error is None else repr(error),
+    )
+    with open(path + ".json", "w") as f:
+        json.dump(profile, f)
+
+    prune(directory, current_app.config["PROFILER_KEEP"])
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    """Read the descriptions of the profiles, newest first.
+
+    Args:
+        directory (str): The ``PROFILER_DIR``.
+
+    Returns:
+        List[Dict[str, Any]]: The descriptions.
+    """
+    try:
+        names: List[str] = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    profiles: List[Dict[str, Any]] = []
+    for name in sorted(names, reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+    return profiles
+
+
+def prune(directory: str, keep: int) -> None:
+    """Delete all but the newest profiles.
+
+    Args:
+        directory (str): The ``PROFILER_DIR``.
+        keep (int): How many profiles to keep.
+    """
+    for profile in list_profiles(directory)[keep:]:
+        for suffix in (".json", MODES[profile["mode"]]):
+            try:
+                os.remove(os.path.join(directory, profile["id"] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def summarize(path: str, limit: int = 20, sort: str = "cumulative") -> str:
+    """Summarize a profile file.
+
+    Args:
+        path (str): A ``.pstats`` or ``.collapsed`` file.
+        limit (int): How many functions to show.
+        sort (str): The pstats sort key.
+
+    Returns:
+        str: The pstats table, or the functions most often on top of the \
+        sampled stacks.
+    """
+    out = io.StringIO()
+    if path.endswith(MODES["cprofile"]):
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    leaves: "Counter[str]" = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, samples = line.rstrip("\n").rpartition(" ")
+            leaves[stack.rpartition(";")[2]] += int(samples)
+
+    total: int = sum(leaves.values())
+    out.write(f"{total} samples\n\n{'samples':>8} {'%':>6}  function\n")
+    for leaf, count in leaves.most_common(limit):
+        out.write(f"{count:>8} {count / total * 100:>5.1f}%  {leaf}\n")
+    return out.getvalue()
+
+
+@click.group("profiles")
+def profiles_command() -> None:
+    """List and summarize request profiles."""
+
+
+@profiles_command.command("list")
+@with_appcontext
+def list_command() -> None:
+    """List the recent profiles, newest first."""
+    for profile in list_profiles(current_app.config["PROFILER_DIR"]):
+        click.echo(
+            f"{profile['id']}  {profile['mode']:<8}"
+            f" {profile['duration'] * 1000:>8.1f} ms  {profile.get('status', '-')}"
+            f"  {profile['method']} {profile['path']}"
+        )
+
+
+@profiles_command.command("show")
+@click.argument("profile_id")
+@click.option("-n", "--limit", default=20, show_default=True)
+@click.option("--sort", default="cumulative", show_default=True)
+@with_appcontext
+def show_command(profile_id: str, limit: int, sort: str) -> None:
+    """Summarize the profile PROFILE_ID."""
+    directory: str = current_app.config["PROFILER_DIR"]
+    for suffix in MODES.values():
+        path: str = os.path.join(directory, os.path.basename(profile_id) + suffix)
+        if os.path.exists(path):
+            click.echo(f"{path}\n")
+            click.echo(summarize(path, limit, sort))
+            return
+    raise click.ClickException(f"No profile {profile_id!r} in {directory}.")
+
+
+@profiles_command.command("token")
+@click.option(
+    "--mode", type=click.Choice(list(MODES)), default="cprofile", show_default=True
+)
+@with_appcontext
+def token_command(mode: str) -> None:
+    """Print a header that has a request profiled."""
+    click.echo(f"{HEADER}: {make_token(mode)}")
+
+
+def init_app(app: Flask) -> None:
+    """Profile the requests that ask to be.
+
+    Register it after the auth blueprint, so g.user is loaded first.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.before_request(start_profile)
+    app.after_request(tag_response)
+    app.teardown_request(finish_profile)
@@ -0,0 +1,316 @@
+"""The SQL used by the views, and the records its rows are read into.
+
+Every statement is a module constant, so each one is compiled once per
+connection and then found in the connection's statement cache, and each
+names the columns it reads. Rows are built straight into small
+``__slots__`` records instead of sqlite3.Row objects.
+"""
+from datetime import datetime
+from itertools import zip_longest
+from sqlite3 import Connection, Cursor
+from typing import Any, Optional, Tuple
+
+
+class Record:
+    """A row read into attributes.
+
+    Fields are read as attributes; ``record["name"]`` also works, so \
+    templates and code written for sqlite3.Row keep working.
+    """
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __init__(self: Any, *values: Any) -> None:
+        """Set the fields in the order of ``__slots__``; missing ones are None.
+
+        Args:
+            *values (Any): The column values.
+        """
+        for name, value in zip_longest(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_row(cls: Any, cursor: Cursor, row: Tuple[Any, ...]) -> Any:
+        """Build a record; usable as a sqlite3 row factory.
+
+        Args:
+            cursor (Cursor): The cursor the row was read from.
+            row (Tuple[Any, ...]): The column values.
+
+        Returns:
+            Any: The record.
+        """
+        return cls(*row)
+
+    def __getitem__(self: Any, name: str) -> Any:
+        """Read a field by name.
+
+        Args:
+            name (str): The field name.
+
+        Returns:
+            Any: The value.
+
+        Raises:
+            KeyError: If there is no such field.
+        """
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __eq__(self: Any, other: Any) -> bool:
+        """Compare records field by field.
+
+        Args:
+            other (Any): The other record.
+
+        Returns:
+            bool: Whether they are the same type with the same values.
+        """
+        return type(other) is type(self) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self: Any) -> str:
+        """Show the fields.
+
+        Returns:
+            str: The representation.
+        """
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class User(Record):
+    """A user; ``password`` is only read when logging in."""
+
+    __slots__ = ("id", "username", "password")
+
+    id: int
+    username: str
+    password: Optional[str]
+
+
+class Post(Record):
+    """A post with the name of its author.
+
+    Lists of posts only read up to ``excerpt``; ``body`` and ``body_html`` \
+    are None unless the post was read on its own.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "created",
+        "author_id",
+        "username",
+        "excerpt",
+        "body",
+        "body_html",
+    )
+
+    id: int
+    title: str
+    created: datetime
+    author_id: int
+    username: str
+    excerpt: str
+    body: Optional[str]
+    body_html: Optional[str]
+
+
+class Author(Record):
+    """A user with the number of posts they wrote."""
+
+    __slots__ = ("id", "username", "post_count")
+
+    id: int
+    username: str
+    post_count: int
+
+
+class SearchResult(Record):
+    """A search match with its highlighted title and body snippet."""
+
+    __slots__ = ("id", "created", "author_id", "username", "title", "snippet")
+
+    id: int
+    created: datetime
+    author_id: int
+    username: str
+    title: str
+    snippet: str
+
+
+_POST = (
+    "SELECT p.id, p.title, p.created, p.author_id, u.username, p.excerpt"
+    " FROM post p JOIN user u ON p.author_id = u.id"
+)
+
+#: The post with the given id, with its body and body HTML.
+POST_BY_ID = (
+    "SELECT p.id, p.title, p.created, p.author_id, u.username, p.excerpt,"
+    " p.body, p.body_html"
+    " FROM post p JOIN user u ON p.author_id = u.id"
+    " WHERE p.id = ?"
+)
+
+#: The newest posts, newest first.
+LATEST_POSTS = _POST + " ORDER BY p.created DESC, p.id DESC LIMIT ?"
+
+#: The posts older than a (created, id) position, newest first.
+POSTS_BEFORE = (
+    _POST + " WHERE (p.created, p.id) < (?, ?)"
+    " ORDER BY p.created DESC, p.id DESC LIMIT ?"
+)
+
+#: The posts newer than a (created, id) position, oldest first.
+POSTS_AFTER = (
+    _POST + " WHERE (p.created, p.id) > (?, ?)"
+    " ORDER BY p.created ASC, p.id ASC LIMIT ?"
+)
+
+#: The newest posts of an author, newest first.
+AUTHOR_POSTS = (
+    _POST + " WHERE p.author_id = ?"
+    " ORDER BY p.created DESC, p.id DESC LIMIT ?"
+)
+
+#: The posts of an author older than a (created, id) position, newest first.
+AUTHOR_POSTS_BEFORE = (
+    _POST + " WHERE p.author_id = ? AND (p.created, p.id) < (?, ?)"
+    " ORDER BY p.created DESC, p.id DESC LIMIT ?"
+)
+
+#: The posts of an author newer than a (created, id) position, oldest first.
+AUTHOR_POSTS_AFTER = (
+    _POST + " WHERE p.author_id = ? AND (p.created, p.id) > (?, ?)"
+    " ORDER BY p.created ASC, p.id ASC LIMIT ?"
+)
+
+#: Posts matching an FTS5 query, best first, title matches counting more.
+SEARCH_POSTS = (
+    "SELECT p.id, p.created, p.author_id, u.username,"
+    " highlight(post_search, 0, char(2), char(3)),"
+    " snippet(post_search, 1, char(2), char(3), '…', 24)"
+    " FROM post_search"
+    " JOIN post p ON p.id = post_search.rowid"
+    " JOIN user u ON p.author_id = u.id"
+    " WHERE post_search MATCH ?"
+    " ORDER BY bm25(post_search, 5.0, 1.0)"
+    " LIMIT ? OFFSET ?"
+)
+
+INSERT_POST = (
+    "INSERT INTO post (title, body, excerpt, body_html, author_id)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
+UPDATE_POST = (
+    "UPDATE post SET title = ?, body = ?, excerpt = ?, body_html = ? WHERE id = ?"
+)
+DELETE_POST = "DELETE FROM post WHERE id = ?"
+
+#: The user with the given id, without the password hash.
+USER_BY_ID = "SELECT id, username FROM user WHERE id = ?"
+
+#: The user with the given name, with the password hash.
+USER_BY_USERNAME = "SELECT id, username, password FROM user WHERE username = ?"
+
+#: The user with the given name and their post count.
+AUTHOR_BY_USERNAME = (
+    "SELECT u.id, u.username, s.post_count"
+    " FROM user u JOIN user_stats s ON s.user_id = u.id"
+    " WHERE u.username = ?"
+)
+
+USERNAME_TAKEN = "SELECT 1 FROM user WHERE username = ?"
+INSERT_USER = "INSERT INTO user (username, password) VALUES (?, ?)"
+UPDATE_PASSWORD = "UPDATE user SET password = ? WHERE id = ?"
+
+#: The content version and when it last changed.
+CONTENT_VERSION = "SELECT version, modified FROM content_version WHERE id = 1"
+
+
+def fetch(db: Connection, record: Any, sql: str, *params: Any) -> Cursor:
+    """Run a query and read its rows into records as they are iterated.
+
+    Args:
+        db (Connection): The connection.
+        record (Any): The Record class to build.
+        sql (str): One of the statements above.
+        *params (Any): The parameters.
+
+    Returns:
+        Cursor: The cursor, which yields records.
+    """
+    cursor: Cursor = db.execute(sql, params)
+    cursor.row_factory = record.from_row
+    return cursor
+
+
+def fetch_one(db: Connection, record: Any, sql: str, *params: Any) -> Any:
+    """Run a query and read its first row into a record.
+
+    Args:
+        db (Connection): The connection.
+        record (Any): The Record class to build.
+        sql (str): One of the statements above.
+        *params (Any): The parameters.
+
+    Returns:
+        Any: The record, or None if there are no rows.
+    """
+    return fetch(db, record, sql, *params).fetchone()
+
+
+def get_post(db: Connection, id: int) -> Optional[Post]:
+    """Read a post by id.
+
+    Args:
+        db (Connection): The connection.
+        id (int): The post id.
+
+    Returns:
+        Optional[Post]: The post, or None.
+    """
+    return fetch_one(db, Post, POST_BY_ID, id)
+
+
+def get_user(db: Connection, id: int) -> Optional[User]:
+    """Read a user by id, without the password hash.
+
+    Args:
+        db (Connection): The connection.
+        id (int): The user id.
+
+    Returns:
+        Optional[User]: The user, or None.
+    """
+    return fetch_one(db, User, USER_BY_ID, id)
+
+
+def get_user_by_username(db: Connection, username: str) -> Optional[User]:
+    """Read a user by name, with the password hash.
+
+    Args:
+        db (Connection): The connection.
+        username (str): The user name.
+
+    Returns:
+        Optional[User]: The user, or None.
+    """
+    return fetch_one(db, User, USER_BY_USERNAME, username)
+
+
+def get_author(db: Connection, username: str) -> Optional[Author]:
+    """Read a user by name, with their post count.
+
+    Args:
+        db (Connection): The connection.
+        username (str): The user name.
+
+    Returns:
+        Optional[Author]: The author, or None.
+    """
+    return fetch_one(db, Author, AUTHOR_BY_USERNAME, username)
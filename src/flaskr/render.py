@@ -0,0 +1,75 @@
+"""Turn post bodies into the excerpt and HTML stored next to them."""
+from sqlite3 import Connection
+from typing import Tuple
+
+from markupsafe import escape
+
+
+def render_body(body: str) -> str:
+    """Render a body as HTML that is safe to insert into a page.
+
+    Bodies are plain text, so rendering escapes them; line breaks are kept \
+    by the ``white-space: pre-line`` style of ``.body``.
+
+    Args:
+        body (str): The body as written.
+
+    Returns:
+        str: The HTML.
+    """
+    return str(escape(body))
+
+
+def make_excerpt(body: str, length: int) -> str:
+    """Cut a body down to at most ``length`` characters.
+
+    A body that is too long is cut at the last space that fits and ends \
+    with an ellipsis.
+
+    Args:
+        body (str): The body as written.
+        length (int): The most characters to keep, ellipsis included.
+
+    Returns:
+        str: The excerpt, as plain text.
+    """
+    body = body.strip()
+    if len(body) <= length:
+        return body
+
+    cut: str = body[: max(length - 1, 0)]
+    if not (cut[-1:].isspace() or body[len(cut)].isspace()):
+        # Drop the word that was cut in two, unless it is the only one.
+        words = cut.rsplit(None, 1)
+        if len(words) == 2:
+            cut = words[0]
+    return cut.rstrip() + "…"
+
+
+def render_post(body: str, excerpt_length: int) -> Tuple[str, str]:
+    """Compute the columns stored with a post's body.
+
+    Args:
+        body (str): The body as written.
+        excerpt_length (int): The ``EXCERPT_LENGTH`` setting.
+
+    Returns:
+        Tuple[str, str]: The ``excerpt`` and ``body_html`` columns.
+    """
+    return make_excerpt(body, excerpt_length), render_body(body)
+
+
+def register_functions(db: Connection, excerpt_length: int) -> None:
+    """Make the renderers callable from SQL, for migrations and re-rendering.
+
+    Args:
+        db (Connection): The connection.
+        excerpt_length (int): The ``EXCERPT_LENGTH`` setting.
+    """
+    db.create_function(
+        "make_excerpt",
+        1,
+        lambda body: make_excerpt(body, excerpt_length),
+        deterministic=True,
+    )
+    db.create_function("render_body", 1, render_body, deterministic=True)
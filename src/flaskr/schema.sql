@@ -1,5 +1,9 @@
 DROP TABLE IF EXISTS user;
 DROP TABLE IF EXISTS post;
+DROP TABLE IF EXISTS schema_version;
+DROP TABLE IF EXISTS content_version;
+DROP TABLE IF EXISTS post_search;
+DROP TABLE IF EXISTS user_stats;
 
 CREATE TABLE user (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -0,0 +1,107 @@
+"""Time the phases of create_app and keep command-line code out of it."""
+from contextlib import contextmanager
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from werkzeug.utils import import_string
+
+
+class StartupTimer:
+    """The time create_app spent in each of its phases.
+
+    Timing is always on: it costs a clock read per phase, and the timer is \
+    kept as ``app.extensions["flaskr_startup"]``.
+    """
+
+    def __init__(self: Any) -> None:
+        """Start with no phases."""
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self: Any, name: str) -> Iterator[None]:
+        """Add the time spent in the block to a phase.
+
+        Args:
+            name (str): The phase.
+
+        Yields:
+            None: Control, while the phase runs.
+        """
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    @property
+    def total(self: Any) -> float:
+        """The time spent in all the phases, in seconds."""
+        return sum(self.phases.values())
+
+
+class LazyGroup(AppGroup):
+    """The app's command group, importing a command's module when it is used.
+
+    Commands that only run from the command line are registered by import \
+    name, so serving a request never pays to import them.
+    """
+
+    def __init__(self: Any, *args: Any, **kwargs: Any) -> None:
+        """Create the group with no lazy commands.
+
+        Args:
+            *args (Any): Passed to AppGroup.
+            **kwargs (Any): Passed to AppGroup.
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_commands: Dict[str, str] = {}
+
+    def add_lazy_command(self: Any, name: str, import_name: str) -> None:
+        """Register a command to import when it is first looked up.
+
+        Args:
+            name (str): The command name.
+            import_name (str): Where the command is, as ``module:attribute``.
+        """
+        self.lazy_commands[name] = import_name
+
+    def list_commands(self: Any, ctx: click.Context) -> List[str]:
+        """List the commands, imported or not.
+
+        Args:
+            ctx (click.Context): The click context.
+
+        Returns:
+            List[str]: The command names, sorted.
+        """
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self: Any, ctx: click.Context, name: str) -> Any:
+        """Return a command, importing it if needed.
+
+        Args:
+            ctx (click.Context): The click context.
+            name (str): The command name.
+
+        Returns:
+            Any: The command, or None if there is none by that name.
+        """
+        command: Optional[click.Command] = super().get_command(ctx, name)
+        if command is None and name in self.lazy_commands:
+            command = import_string(self.lazy_commands.pop(name))
+            self.add_command(command, name)
+        return command
+
+
+def use_lazy_commands(app: Flask) -> None:
+    """Replace the app's command group with a :class:`LazyGroup`.
+
+    Args:
+        app (Flask): The application, before any command is added.
+    """
+    app.cli = LazyGroup(app.name)
@@ -0,0 +1,174 @@
+"""Per-request SQL instrumentation and the slow-query log."""
+import logging
+import time
+from typing import Any, Optional
+
+from flask import g
+from werkzeug import Response
+
+logger = logging.getLogger("flaskr.sql")
+
+
+class QueryStats:
+    """What the statements of one request cost."""
+
+    __slots__ = ("count", "total", "slowest", "slowest_sql")
+
+    def __init__(self: Any) -> None:
+        """Start with no statements recorded."""
+        self.count: int = 0
+        self.total: float = 0.0
+        self.slowest: float = 0.0
+        self.slowest_sql: Optional[str] = None
+
+    def record(self: Any, sql: str, duration: float) -> None:
+        """Record one statement.
+
+        Args:
+            sql (str): The statement.
+            duration (float): How long it took, in seconds.
+        """
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_sql = sql
+
+
+class TracedConnection:
+    """Time the statements run through a connection.
+
+    Only ``execute``, ``executemany`` and ``executescript`` are timed; rows
+    fetched later from the returned cursor are not. Everything else is passed
+    straight to the wrapped connection.
+    """
+
+    __slots__ = ("_connection", "_stats", "_slow")
+
+    def __init__(
+        self: Any, connection: Any, stats: QueryStats, slow: Optional[float] = None
+    ) -> None:
+        """Wrap a connection.
+
+        Args:
+            connection (Any): The connection to trace.
+            stats (QueryStats): Where to record the statements.
+            slow (float, optional): Statements taking at least this many \
+            seconds are logged to the ``flaskr.sql`` logger.
+        """
+        object.__setattr__(self, "_connection", connection)
+        object.__setattr__(self, "_stats", stats)
+        object.__setattr__(self, "_slow", slow)
+
+    def __getattr__(self: Any, name: str) -> Any:
+        """Delegate to the wrapped connection.
+
+        Args:
+            name (str): The attribute name.
+
+        Returns:
+            Any: The attribute of the wrapped connection.
+        """
+        return getattr(self._connection, name)
+
+    def __setattr__(self: Any, name: str, value: Any) -> None:
+        """Set an attribute, such as row_factory, on the wrapped connection.
+
+        Args:
+            name (str): The attribute name.
+            value (Any): The new value.
+        """
+        setattr(self._connection, name, value)
+
+    def __enter__(self: Any) -> Any:
+        """Start a transaction block on the wrapped connection.
+
+        Returns:
+            Any: This connection.
+        """
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self: Any, *args: Any) -> Any:
+        """Commit or roll back the transaction block.
+
+        Args:
+            *args (Any): The exception details, if any.
+
+        Returns:
+            Any: Whether the exception was handled.
+        """
+        return self._connection.__exit__(*args)
+
+    def execute(self: Any, sql: str, *args: Any) -> Any:
+        """Run and time one statement.
+
+        Args:
+            sql (str): The statement.
+            *args (Any): The parameters.
+
+        Returns:
+            Any: The cursor.
+        """
+        start: float = time.perf_counter()
+        try:
+            return self._connection.execute(sql, *args)
+        finally:
+            self._record(sql, time.perf_counter() - start)
+
+    def executemany(self: Any, sql: str, *args: Any) -> Any:
+        """Run and time a statement against every set of parameters.
+
+        Args:
+            sql (str): The statement.
+            *args (Any): The sequence of parameters.
+
+        Returns:
+            Any: The cursor.
+        """
+        start: float = time.perf_counter()
+        try:
+            return self._connection.executemany(sql, *args)
+        finally:
+            self._record(sql, time.perf_counter() - start)
+
+    def executescript(self: Any, sql: str) -> Any:
+        """Run and time a script.
+
+        Args:
+            sql (str): The script.
+
+        Returns:
+            Any: The cursor.
+        """
+        start: float = time.perf_counter()
+        try:
+            return self._connection.executescript(sql)
+        finally:
+            self._record(sql, time.perf_counter() - start)
+
+    def _record(self: Any, sql: str, duration: float) -> None:
+        self._stats.record(sql, duration)
+        if self._slow is not None and duration >= self._slow:
+            logger.warning("Slow query (%.1f ms): %s", duration * 1000, sql)
+
+
+def server_timing(response: Response) -> Response:
+    """Report the SQL cost of the request in a Server-Timing header.
+
+    Args:
+        response (Response): The response.
+
+    Returns:
+        Response: The response, with the header added when SQL was traced.
+    """
+    stats: Optional[QueryStats] = g.get("sql_stats")
+
+    if stats is not None:
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.total * 1000:.2f};desc="{stats.count} queries", '
+            f"db-slowest;dur={stats.slowest * 1000:.2f}",
+        )
+
+    return response
@@ -0,0 +1,103 @@
+"""Get a worker ready before it takes traffic."""
+import sqlite3
+import time
+from typing import Dict, List
+
+import click
+from flask import current_app, Flask
+from flask.cli import with_appcontext
+
+from flaskr import queries
+from flaskr.db import get_pool
+from flaskr.pool import PooledConnection
+
+
+def compile_templates(app: Flask) -> int:
+    """Load every template into the Jinja environment.
+
+    Templates are read from the bytecode cache when it has them, and are
+    written to it when it does not.
+
+    Args:
+        app (Flask): The application.
+
+    Returns:
+        int: The number of templates loaded.
+    """
+    names: List[str] = [
+        name for name in app.jinja_env.list_templates() if name.endswith(".html")
+    ]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def open_connections(app: Flask) -> int:
+    """Open the writer and every read-only connection in the pools.
+
+    Each reader runs the index query once, so the statement is compiled and
+    the pages it reads are cached by the time the first visitor asks for them.
+
+    Args:
+        app (Flask): The application.
+
+    Returns:
+        int: The number of connections made ready.
+    """
+    with app.app_context():
+        readers = get_pool(read_only=True)
+        connections: List[PooledConnection] = []
+        try:
+            for _ in range(readers.size - readers.stats["open"]):
+                db: PooledConnection = readers.acquire()
+                connections.append(db)
+                db.execute(
+                    queries.LATEST_POSTS, (app.config["POSTS_PER_PAGE"] + 1,)
+                ).fetchall()
+        finally:
+            for db in connections:
+                db.close()
+
+        # Only once the readers found the tables, so a missing database is
+        # not created empty by the writer.
+        get_pool().acquire().close()
+
+    return len(connections) + 1
+
+
+def warmup(app: Flask) -> Dict[str, int]:
+    """Compile the templates, open the database and render the index once.
+
+    The database steps are skipped, with a warning, if the database has \
+    not been created yet.
+
+    Args:
+        app (Flask): The application.
+
+    Returns:
+        Dict[str, int]: How many templates, connections and pages were \
+        prepared.
+    """
+    done: Dict[str, int] = {"templates": compile_templates(app)}
+
+    try:
+        done["connections"] = open_connections(app)
+    except sqlite3.Error as e:
+        app.logger.warning("Skipping database warmup: %s", e)
+        return done
+
+    # Renders the first page for logged out visitors into the page cache.
+    done["pages"] = int(app.test_client().get("/").status_code == 200)
+    return done
+
+
+@click.command("warmup")
+@with_appcontext
+def warmup_command() -> None:
+    """Compile templates and prime the pools and caches."""
+    start: float = time.perf_counter()
+    done: Dict[str, int] = warmup(current_app._get_current_object())
+    click.echo(
+        ", ".join(f"{count} {name}" for name, count in done.items())
+        + f" ready in {time.perf_counter() - start:.2f}s"
+    )
@@ -0,0 +1,257 @@
+"""Group commit: writes from concurrent requests share one transaction."""
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import os
+import queue
+import sqlite3
+from sqlite3 import Connection
+import threading
+import time
+from typing import Any, Callable, cast, List, Optional, Tuple
+
+from flask import current_app
+
+from flaskr.db import get_pool, get_write_db
+from flaskr.pool import ConnectionPool, PooledConnection, PoolTimeoutError
+
+#: A write: a function that runs statements on a connection, and its result.
+_Job = Tuple[Callable[[Connection], Any], Future]
+
+
+class WriteQueueTimeoutError(PoolTimeoutError):
+    """Raised when a queued write was not started before the queue timeout."""
+
+
+class WriteQueue:
+    """Run writes on one thread and commit them in batches.
+
+    A batch starts with the first write queued and takes the writes queued
+    behind it, waiting up to ``max_delay`` seconds for up to ``max_batch`` of
+    them. The batch runs in a single ``BEGIN IMMEDIATE`` transaction on a
+    connection from the writer pool, so it pays for one commit. Each write
+    runs in its own savepoint: one that raises is rolled back alone and its
+    error is handed to its caller, while the others commit.
+
+    Batches are committed with ``PRAGMA synchronous`` set to ``synchronous``,
+    ``full`` by default, so a write is on disk when its caller is told it is
+    committed; in WAL mode the pool's usual ``normal`` can lose the last
+    commits on power failure. That one fsync per batch is what group commit
+    shares out. The connection gets the pool's setting back afterwards.
+    """
+
+    def __init__(
+        self: Any,
+        pool: ConnectionPool,
+        max_batch: int = 64,
+        max_delay: float = 0.002,
+        timeout: float = 10.0,
+        synchronous: str = "full",
+    ) -> None:
+        """Create the queue; its thread is started on first use.
+
+        Args:
+            pool (ConnectionPool): The writer pool.
+            max_batch (int): The most writes committed together.
+            max_delay (float): How long a batch waits for more writes.
+            timeout (float): How long a request waits for its write to start.
+            synchronous (str): The ``PRAGMA synchronous`` batches commit with.
+        """
+        self.pool: ConnectionPool = pool
+        self.max_batch: int = max_batch
+        self.max_delay: float = max_delay
+        self.timeout: float = timeout
+        self.synchronous: str = synchronous
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: int = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls: Any, pool: ConnectionPool, config: Any) -> "WriteQueue":
+        """Create a write queue from the application config.
+
+        Args:
+            pool (ConnectionPool): The writer pool.
+            config (Any): The Flask config.
+
+        Returns:
+            WriteQueue: The new queue.
+        """
+        return cls(
+            pool,
+            max_batch=config["WRITE_QUEUE_MAX_BATCH"],
+            max_delay=config["WRITE_QUEUE_MAX_DELAY"],
+            timeout=config["WRITE_QUEUE_TIMEOUT"],
+            synchronous=config["WRITE_QUEUE_SYNCHRONOUS"],
+        )
+
+    def submit(self: Any, write: Callable[[Connection], Any]) -> Any:
+        """Queue a write and wait until it is committed.
+
+        The write runs on the queue's thread, so it must not use the request \
+        context; pass it the values it needs instead. It must not commit.
+
+        A write that has not started within ``timeout`` is cancelled, so it \
+        is never committed after its caller was told it failed. One that has \
+        started is waited for, as its batch is about to commit.
+
+        Args:
+            write (Callable[[Connection], Any]): Runs the statements.
+
+        Returns:
+            Any: What the write returned.
+
+        Raises:
+            WriteQueueTimeoutError: If the write was cancelled.
+        """
+        future: Future = Future()
+        self._start()
+        self._queue.put((write, future))
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if not future.cancel():
+                return future.result()
+            raise WriteQueueTimeoutError(
+                f"Write not started after {self.timeout}s; the writer is busy."
+            ) from None
+
+    def close(self: Any) -> None:
+        """Commit the writes already queued and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            thread.join()
+
+    def _start(self: Any) -> None:
+        # Threads do not survive a fork, so each process starts its own.
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(
+                    target=self._run, name="flaskr-writer", daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _run(self: Any) -> None:
+        jobs: "queue.Queue[Optional[_Job]]" = self._queue
+        stopping: bool = False
+
+        while not stopping:
+            job: Optional[_Job] = jobs.get()
+            if job is None:
+                break
+
+            batch: List[_Job] = [job]
+            deadline: float = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    job = jobs.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+
+            self._commit(batch)
+
+    def _commit(self: Any, batch: List[_Job]) -> None:
+        # Skip the writes whose callers stopped waiting; the rest can no
+        # longer be cancelled.
+        batch = [job for job in batch if job[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        results: List[Tuple[Future, Any, Optional[Exception]]] = []
+        db: Optional[PooledConnection] = None
+
+        try:
+            db = self.pool.acquire()
+            db.execute(f"PRAGMA synchronous = {self.synchronous}")
+            db.execute("BEGIN IMMEDIATE")
+            for write, future in batch:
+                db.execute("SAVEPOINT write")
+                try:
+                    results.append((future, write(cast(Connection, db)), None))
+                except Exception as e:  # noqa: B902
+                    db.execute("ROLLBACK TO write")
+                    results.append((future, None, e))
+                db.execute("RELEASE write")
+            db.commit()
+        except (sqlite3.Error, PoolTimeoutError) as e:
+            # Nothing was committed, so every write fails with the batch.
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            if db is not None:
+                self._release(db)
+
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _release(self: Any, db: PooledConnection) -> None:
+        # The setting can only change outside a transaction.
+        synchronous: Any = self.pool.pragmas.get("synchronous")
+        try:
+            if db.in_transaction:
+                db.rollback()
+            if synchronous is not None:
+                db.execute(f"PRAGMA synchronous = {synchronous}")
+        except sqlite3.Error:
+            pass
+        db.close()
+
+
+def get_write_queue() -> WriteQueue:
+    """Return the write queue of the current app, creating it if needed.
+
+    Returns:
+        WriteQueue: The queue configured from the app config.
+    """
+    write_queue: Optional[WriteQueue] = current_app.extensions.get("flaskr_write_queue")
+
+    if write_queue is None:
+        write_queue = current_app.extensions.setdefault(
+            "flaskr_write_queue",
+            WriteQueue.from_config(get_pool(), current_app.config),
+        )
+
+    return write_queue
+
+
+def run_write(write: Callable[[Connection], Any]) -> Any:
+    """Run a write and commit it.
+
+    With ``WRITE_QUEUE_ENABLED`` the write goes through the write queue and \
+    is committed together with the writes of concurrent requests; otherwise \
+    it runs on the request's writer connection and is committed alone. \
+    Either way it has been committed when this returns, and if it raises, \
+    it has been rolled back. Through the queue, the commit is also synced \
+    to disk with ``WRITE_QUEUE_SYNCHRONOUS``, ``full`` by default.
+
+    Args:
+        write (Callable[[Connection], Any]): Runs the statements, without \
+        committing or using the request context.
+
+    Returns:
+        Any: What the write returned.
+
+    Raises:
+        WriteQueueTimeoutError: If the queue is too busy; it is answered \
+        with a 503 like a pool timeout.
+
+    # noqa: DAR402 WriteQueueTimeoutError
+    """
+    if current_app.config["WRITE_QUEUE_ENABLED"]:
+        return get_write_queue().submit(write)
+
+    db: Connection = get_write_db()
+    with db:
+        return write(db)
@@ -11,22 +11,35 @@ import pytest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
 from flaskr import create_app  # noqa
-from flaskr.db import get_db, init_db  # noqa
+from flaskr.db import get_db, get_pool, init_db  # noqa
 
 with open(os.path.join(os.path.dirname(__file__), "data.sql"), "rb") as f:
     _data_sql = f.read().decode("utf8")
 
 
 @pytest.fixture
-def app() -> Generator:
+def app(tmp_path: Any) -> Generator:
     """summary.
 
+    Metrics and compiled templates are written under ``tmp_path``, so runs \
+    leave nothing in the instance folder and never see each other's files.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+
     Yields:
         [Flask]: [The Flask App]
     """
     db_fd, db_path = tempfile.mkstemp()
 
-    app = create_app({"TESTING": True, "DATABASE": db_path})
+    app = create_app(
+        {
+            "TESTING": True,
+            "DATABASE": db_path,
+            "METRICS_DIR": str(tmp_path / "metrics"),
+            "JINJA_BYTECODE_CACHE": str(tmp_path / "jinja-cache"),
+        }
+    )
 
     with app.app_context():
         init_db()
@@ -34,6 +47,10 @@ def app() -> Generator:
 
     yield app
 
+    with app.app_context():
+        get_pool().close()
+        get_pool(read_only=True).close()
+
     os.close(db_fd)
     os.unlink(db_path)
 
@@ -0,0 +1,85 @@
+"""Test the JSON API."""
+
+import json
+from sqlite3 import Connection
+from typing import Any, Dict
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+
+from flaskr.db import get_db
+
+
+def test_list_posts(client: FlaskClient) -> None:
+    """Test the first page of posts.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+    """
+    r: Response = client.get("/api/posts")
+    assert r.mimetype == "application/json"
+    assert b": " not in r.data
+    assert r.headers["ETag"]
+    assert json.loads(r.data) == {
+        "posts": [
+            {
+                "id": 1,
+                "title": "test title",
+                "excerpt": "test\nbody",
+                "created": "2018-01-01T00:00:00",
+                "author": {"id": 1, "username": "test"},
+            }
+        ],
+        "older": None,
+        "newer": None,
+    }
+
+
+def test_list_posts_paging(app: Flask, client: FlaskClient) -> None:
+    """Test following the cursors.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["POSTS_PER_PAGE"] = 1
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute(
+            "INSERT INTO post (title, body, author_id, created)"
+            " VALUES ('newer', '', 2, '2018-01-02 00:00:00')"
+        )
+        db.commit()
+
+    first: Dict[str, Any] = json.loads(client.get("/api/posts").data)
+    assert [p["title"] for p in first["posts"]] == ["newer"]
+
+    second: Dict[str, Any] = json.loads(
+        client.get(f"/api/posts?before={first['older']}").data
+    )
+    assert [p["title"] for p in second["posts"]] == ["test title"]
+    assert second["older"] is None
+
+    back: Dict[str, Any] = json.loads(
+        client.get(f"/api/posts?after={second['newer']}").data
+    )
+    assert back == first
+
+
+def test_post_detail(client: FlaskClient) -> None:
+    """Test fetching one post and the JSON errors.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+    """
+    post: Dict[str, Any] = json.loads(client.get("/api/posts/1").data)
+    assert post["title"] == "test title"
+    assert post["body"] == "test\nbody"
+
+    r: Response = client.get("/api/posts/2")
+    assert r.status_code == 404
+    assert json.loads(r.data) == {"error": "Post id 2 does not exist."}
+
+    r = client.get("/api/posts?before=bad")
+    assert r.status_code == 400
+    assert json.loads(r.data) == {"error": "Invalid pagination cursor."}
@@ -0,0 +1,159 @@
+"""Test the hashed, precompressed static files."""
+
+import gzip
+import json
+import os
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskClient, FlaskCliRunner
+import pytest
+
+from flaskr import assets
+from flaskr.assets import asset_url, build_assets, hashed_name
+
+
+@pytest.fixture
+def built(app: Flask, tmp_path: Any) -> str:
+    """Build the assets into a temporary folder.
+
+    Args:
+        app (Flask): The flaskr application.
+        tmp_path (Any): The pytest temporary directory.
+
+    Returns:
+        str: The name of the hashed copy of style.css.
+    """
+    app.config["ASSETS_FOLDER"] = str(tmp_path)
+    return build_assets(app.static_folder, str(tmp_path), use_brotli=False)[
+        "style.css"
+    ]
+
+
+def test_build(app: Flask, built: str) -> None:
+    """Test that each file gets a hashed copy, a gzip copy and an entry.
+
+    Args:
+        app (Flask): The flaskr application.
+        built (str): The name of the copy of style.css.
+    """
+    folder: str = app.config["ASSETS_FOLDER"]
+    with open(os.path.join(app.static_folder, "style.css"), "rb") as f:
+        content: bytes = f.read()
+
+    assert built == hashed_name("style.css", content)
+    assert built != hashed_name("style.css", content + b" ")
+    with open(os.path.join(folder, built + ".gz"), "rb") as f:
+        assert gzip.decompress(f.read()) == content
+    assert not os.path.exists(os.path.join(folder, built + ".br"))
+    with open(os.path.join(folder, assets.MANIFEST)) as f:
+        assert json.load(f) == {"style.css": built}
+
+
+def test_compress_only_when_smaller(tmp_path: Any) -> None:
+    """Test that a copy that would not be smaller is not written.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    path = str(tmp_path / "a.bin")
+    assert assets.compress(path, os.urandom(64), use_brotli=False) == []
+    assert assets.compress(path, b"a" * 1000, use_brotli=False) == ["gzip"]
+    assert os.path.exists(path + ".gz")
+
+
+def test_asset_url(app: Flask, tmp_path: Any) -> None:
+    """Test that the URL points to the static route until assets are built.
+
+    Args:
+        app (Flask): The flaskr application.
+        tmp_path (Any): The pytest temporary directory.
+    """
+    app.config["ASSETS_FOLDER"] = str(tmp_path)
+    with app.test_request_context():
+        assert asset_url("style.css") == "/static/style.css"
+
+    app.extensions.pop("flaskr_assets")
+    built = build_assets(app.static_folder, str(tmp_path))["style.css"]
+    with app.test_request_context():
+        assert asset_url("style.css") == f"/assets/{built}"
+        assert asset_url("missing.css") == "/static/missing.css"
+
+
+def test_page_links_asset(client: FlaskClient, built: str) -> None:
+    """Test that pages link to the hashed copy.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+        built (str): The name of the copy of style.css.
+    """
+    assert f'href="/assets/{built}"'.encode() in client.get("/").data
+
+
+@pytest.mark.parametrize(
+    ("accept", "encoding"), (("gzip, deflate", "gzip"), ("", None), ("gzip;q=0", None))
+)
+def test_serve(client: FlaskClient, built: str, accept: str, encoding: Any) -> None:
+    """Test that the gzip copy is sent to clients that accept it.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+        built (str): The name of the copy of style.css.
+        accept (str): The Accept-Encoding header.
+        encoding (Any): The expected Content-Encoding.
+    """
+    response = client.get(f"/assets/{built}", headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.content_encoding == encoding
+    assert response.mimetype == "text/css"
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert "Accept-Encoding" in response.vary
+
+    data: bytes = response.get_data()
+    if encoding == "gzip":
+        data = gzip.decompress(data)
+    assert b"body" in data
+
+
+def test_serve_brotli(client: FlaskClient, built: str) -> None:
+    """Test that the brotli copy is preferred when there is one.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+        built (str): The name of the copy of style.css.
+    """
+    brotli = pytest.importorskip("brotli")
+    app: Flask = client.application
+    build_assets(app.static_folder, app.config["ASSETS_FOLDER"])
+
+    response = client.get(
+        f"/assets/{built}", headers={"Accept-Encoding": "gzip, deflate, br"}
+    )
+    assert response.content_encoding == "br"
+    assert b"body" in brotli.decompress(response.get_data())
+
+
+def test_serve_missing(client: FlaskClient, built: str) -> None:
+    """Test that an unknown asset is not found.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+        built (str): The name of the copy of style.css.
+    """
+    response = client.get("/assets/missing.css", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 404
+
+
+def test_build_command(app: Flask, runner: FlaskCliRunner, tmp_path: Any) -> None:
+    """Test the assets-build command.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+        tmp_path (Any): The pytest temporary directory.
+    """
+    app.config["ASSETS_FOLDER"] = str(tmp_path)
+    result = runner.invoke(args=["assets-build", "--no-brotli"])
+    assert f"Built 1 assets in {tmp_path}" in result.output
+    assert os.path.exists(tmp_path / assets.MANIFEST)
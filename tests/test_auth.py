@@ -4,6 +4,8 @@ from flask import Flask, g, Response, session
 from flask.testing import FlaskClient
 import pytest
 
+from flaskr.auth import invalidate_user, rehash_password
+from flaskr.cache import get_cache
 from flaskr.db import get_db
 from tests.conftest import AuthActions
 
@@ -104,3 +106,48 @@ def test_logout(client: FlaskClient, auth: AuthActions) -> None:
     with client:
         auth.logout()
         assert "user_id" not in session
+
+
+def test_user_cache(app: Flask, client: FlaskClient, auth: AuthActions) -> None:
+    """Test that the logged in user is loaded once and can be invalidated.
+
+    Args:
+        app (Flask): The application.
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The class with the auth methods.
+    """
+    auth.login()
+    app.config["SQL_TRACE"] = True
+
+    with client:
+        client.get("/hello")
+        assert g.get("user", "unset") is None
+
+        client.get("/")
+        assert (g.user.id, g.user.username, g.user.password) == (1, "test", None)
+        assert g.sql_stats.count == 3
+
+        client.get("/")
+        assert g.sql_stats.count == 2
+
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE user SET username = 'renamed' WHERE id = 1")
+        db.commit()
+        invalidate_user(1)
+
+    with client:
+        client.get("/")
+        assert g.user["username"] == "renamed"
+
+
+def test_rehash_invalidates_user(app: Flask) -> None:
+    """Test that storing a new password hash drops the cached user.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    with app.app_context():
+        get_cache("user").set(1, "stale")
+        rehash_password(1, "test")
+        assert get_cache("user").get(1) is None
@@ -0,0 +1,112 @@
+"""Test the benchmark suite."""
+
+import json
+from typing import Any, Dict
+
+from click.testing import CliRunner
+from flask import Flask
+import pytest
+
+from benchmarks.__main__ import cli
+from benchmarks.dataset import generate
+from benchmarks.runner import percentile, run_scenario, summarize
+from flaskr.cache import get_cache
+from flaskr.db import get_db
+
+
+def test_percentile() -> None:
+    """Test nearest-rank percentiles."""
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([1.0], 0.99) == 1.0
+
+
+def test_summarize() -> None:
+    """Test that latencies are reported in milliseconds."""
+    summary: Dict[str, Any] = summarize([0.002, 0.001], 0.5, 1)
+    assert summary["requests"] == 2
+    assert summary["errors"] == 1
+    assert summary["rps"] == 4.0
+    assert summary["p50_ms"] == 1.0
+    assert summary["max_ms"] == 2.0
+    assert summarize([], 0.0, 0)["rps"] == 0.0
+
+
+def test_generate(app: Flask) -> None:
+    """Test that the same seed gives the same dataset.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    generate(app, users=3, posts=10, body_size=50, seed=1)
+    with app.app_context():
+        first = get_db().execute("SELECT * FROM post ORDER BY id").fetchall()
+        assert len(first) == 10
+        assert {row["author_id"] for row in first} <= {1, 2, 3}
+
+    generate(app, users=3, posts=10, body_size=50, seed=1)
+    with app.app_context():
+        second = get_db().execute("SELECT * FROM post ORDER BY id").fetchall()
+        assert [tuple(row) for row in first] == [tuple(row) for row in second]
+
+
+@pytest.mark.parametrize(
+    "scenario", ("index", "uncached", "login", "update", "delete")
+)
+def test_run_scenario(app: Flask, scenario: str) -> None:
+    """Test that each scenario runs without errors.
+
+    Args:
+        app (Flask): The flaskr application.
+        scenario (str): The scenario to run.
+    """
+    generate(app, users=2, posts=20, body_size=50)
+    summary: Dict[str, Any] = run_scenario(app, scenario, count=3, warmup=1)
+    assert summary["errors"] == 0
+    assert summary["requests"] == 3
+
+
+def test_uncached_misses_page_cache(app: Flask) -> None:
+    """Test that every request of the uncached scenario renders the page.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    generate(app, users=2, posts=20, body_size=50)
+    run_scenario(app, "index", count=3, warmup=1)
+    with app.app_context():
+        assert len(get_cache("page")) == 1
+
+    run_scenario(app, "uncached", count=3, warmup=1)
+    with app.app_context():
+        assert len(get_cache("page")) == 5
+
+
+def test_run_and_compare(tmp_path: Any) -> None:
+    """Test running the suite and comparing two result files.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    runner = CliRunner()
+    output = str(tmp_path / "new.json")
+    result = runner.invoke(
+        cli,
+        ["run", "--users", "2", "--posts", "10", "--requests", "2", "--warmup", "0"]
+        + ["--scenario", "index", "-c", "PAGE_CACHE_SIZE=0", "-o", output],
+    )
+    assert result.exit_code == 0, result.output
+
+    with open(output) as f:
+        results: Dict[str, Any] = json.load(f)
+    assert results["parameters"]["config"] == {"PAGE_CACHE_SIZE": 0}
+    assert list(results["scenarios"]) == ["index"]
+
+    baseline = tmp_path / "old.json"
+    results["scenarios"]["index"]["rps"] *= 10
+    baseline.write_text(json.dumps(results))
+    result = runner.invoke(cli, ["compare", str(baseline), output])
+    assert result.exit_code == 1
+    assert "REGRESSION" in result.output
+    assert runner.invoke(cli, ["compare", output, output]).exit_code == 0
@@ -1,5 +1,6 @@
 """Testing the blog."""
 
+from datetime import datetime
 from sqlite3 import Connection
 from typing import Any, Dict, List
 
@@ -7,6 +8,7 @@ from flask import Flask, Response
 from flask.testing import FlaskClient
 import pytest
 
+from flaskr.blog import decode_cursor, encode_cursor
 from flaskr.db import get_db
 from tests.conftest import AuthActions
 
@@ -27,7 +29,7 @@ def test_index(client: FlaskClient, auth: AuthActions) -> None:
 
     assert b"Log Out" in r1.data
     assert b"test title" in r1.data
-    assert b"by test on 2018-01-01" in r1.data
+    assert b'by <a href="/user/test">test</a> on 2018-01-01' in r1.data
     assert b"test\nbody" in r1.data
     assert b'href="/1/update"' in r1.data
 
@@ -129,7 +131,7 @@ def test_update(client: FlaskClient, auth: AuthActions, app: Flask) -> None:
         assert post["title"] == "updated"
 
 
-@pytest.mark.parametrize("path", ("/create", "/2/update"))
+@pytest.mark.parametrize("path", ("/create", "/1/update"))
 def test_create_update_validate(
     client: FlaskClient, auth: AuthActions, path: str
 ) -> None:
@@ -167,3 +169,229 @@ def test_delete(client: FlaskClient, auth: AuthActions, app: Flask) -> None:
         db: Connection = get_db()
         post: List[Any] = db.execute("SELECT * FROM post WHERE id = ?", (1,)).fetchone()
         assert post is None
+
+
+def test_cursor_round_trip() -> None:
+    """Test that a cursor decodes to the position it was built from."""
+    cursor: str = encode_cursor(datetime(2018, 1, 1, 12, 30), 7)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2018-01-01 12:30:00", 7)
+
+
+@pytest.mark.parametrize("cursor", ("", "not-a-cursor", "MjAxOC0wMS0wMXx4"))
+def test_invalid_cursor(client: FlaskClient, cursor: str) -> None:
+    """Test that a malformed cursor is rejected.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+        cursor (str): The malformed cursor.
+    """
+    assert client.get(f"/?before={cursor}").status_code == 400
+    assert client.get(f"/?after={cursor}").status_code == 400
+
+
+def test_index_pagination(app: Flask, client: FlaskClient) -> None:
+    """Test walking the index with the older and newer links.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["POSTS_PER_PAGE"] = 2
+    with app.app_context():
+        db: Connection = get_db()
+        db.executemany(
+            "INSERT INTO post (title, body, author_id, created)"
+            " VALUES (?, '', 1, '2018-01-02 00:00:00')",
+            [(f"post {n}",) for n in range(2, 5)],
+        )
+        db.commit()
+
+    first: Response = client.get("/")
+    assert b"post 4" in first.data and b"post 3" in first.data
+    assert b"post 2" not in first.data
+    assert b"Newer posts" not in first.data
+    older: str = encode_cursor(datetime(2018, 1, 2), 3)
+    assert f'href="/?before={older}"'.encode() in first.data
+
+    second: Response = client.get(f"/?before={older}")
+    assert b"post 2" in second.data and b"test title" in second.data
+    assert b"Older posts" not in second.data
+    newer: str = encode_cursor(datetime(2018, 1, 2), 2)
+    assert f'href="/?after={newer}"'.encode() in second.data
+
+    back: Response = client.get(f"/?after={newer}")
+    assert back.data.index(b"post 4") < back.data.index(b"post 3")
+    assert b"post 2" not in back.data
+    assert b"Newer posts" not in back.data
+    assert b"Older posts" in back.data
+
+
+def test_index_page_cache(app: Flask, client: FlaskClient, auth: AuthActions) -> None:
+    """Test that the anonymous index is cached until a post changes.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The object which will login.
+    """
+    app.config["SQL_TRACE"] = True
+    assert 'desc="2 queries"' in client.get("/").headers["Server-Timing"]
+
+    # Only the content version is read on a hit.
+    r: Response = client.get("/")
+    assert 'desc="1 queries"' in r.headers["Server-Timing"]
+    assert b"test title" in r.data
+
+    # A change made elsewhere bumps the version, so the entry is not used.
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute("UPDATE post SET title = 'changed' WHERE id = 1")
+        db.commit()
+
+    assert b"changed" in client.get("/").data
+
+    auth.login()
+    client.post("/1/update", data={"title": "edited", "body": ""})
+    auth.logout()
+
+    assert b"edited" in client.get("/").data
+
+
+def test_index_streaming(app: Flask, client: FlaskClient) -> None:
+    """Test that the streamed index matches the buffered one and is cached.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["POSTS_PER_PAGE"] = 1
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute(
+            "INSERT INTO post (title, body, author_id, created)"
+            " VALUES ('newer', '', 1, '2018-01-02 00:00:00')"
+        )
+        db.commit()
+
+    buffered: bytes = client.get("/?x=1").data
+    app.config["STREAM_INDEX"] = True
+    app.config["SQL_TRACE"] = True
+
+    r: Response = client.get("/")
+    assert "Content-Length" not in r.headers
+    assert r.data == buffered
+    assert b"Older posts" in buffered
+
+    r = client.get("/")
+    assert r.headers["Content-Length"] == str(len(buffered))
+    assert 'desc="1 queries"' in r.headers["Server-Timing"]
+    assert r.data == buffered
+
+
+def test_author(client: FlaskClient) -> None:
+    """Test that an author page lists only that author's posts and their count.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+    """
+    r: Response = client.get("/user/test")
+    assert r.status_code == 200
+    assert b"Posts by test" in r.data
+    assert b"1 post<" in r.data
+    assert b"test title" in r.data
+
+    other: Response = client.get("/user/other")
+    assert b"0 posts" in other.data
+    assert b"test title" not in other.data
+
+    assert client.get("/user/nobody").status_code == 404
+
+
+def test_author_with_slash(app: Flask, client: FlaskClient) -> None:
+    """Test that a user name containing a slash has a working author page.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute("INSERT INTO user (username, password) VALUES ('a/b', '')")
+        db.execute(
+            "INSERT INTO post (title, body, author_id, created)"
+            " SELECT 'slash title', '', id, '2018-01-02 00:00:00'"
+            " FROM user WHERE username = 'a/b'"
+        )
+        db.commit()
+
+    assert b'href="/user/a/b"' in client.get("/").data
+
+    r: Response = client.get("/user/a/b")
+    assert r.status_code == 200
+    assert b"Posts by a/b" in r.data
+    assert b"slash title" in r.data
+
+
+def test_author_pagination(app: Flask, client: FlaskClient) -> None:
+    """Test that the author page pages through the author's posts only.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["POSTS_PER_PAGE"] = 2
+    with app.app_context():
+        db: Connection = get_db()
+        db.executemany(
+            "INSERT INTO post (title, body, author_id, created)"
+            " VALUES (?, '', ?, '2018-01-02 00:00:00')",
+            [(f"post {n}", 1 + n % 2) for n in range(2, 7)],
+        )
+        db.commit()
+
+    first: Response = client.get("/user/test")
+    assert b"4 posts" in first.data
+    assert b"post 6" in first.data and b"post 4" in first.data
+    assert b"post 5" not in first.data and b"post 2" not in first.data
+    older: str = encode_cursor(datetime(2018, 1, 2), 4)
+    assert f'href="/user/test?before={older}"'.encode() in first.data
+
+    second: Response = client.get(f"/user/test?before={older}")
+    assert b"post 2" in second.data and b"test title" in second.data
+    assert b"Older posts" not in second.data
+    newer: str = encode_cursor(datetime(2018, 1, 2), 2)
+    assert f'href="/user/test?after={newer}"'.encode() in second.data
+
+    back: Response = client.get(f"/user/test?after={newer}")
+    assert back.data.index(b"post 6") < back.data.index(b"post 4")
+    assert b"post 2" not in back.data
+
+
+def test_author_count_follows_writes(
+    app: Flask, client: FlaskClient, auth: AuthActions
+) -> None:
+    """Test that creating and deleting posts keeps the post count right.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The object which will login.
+    """
+    auth.login()
+    client.post("/create", data={"title": "created", "body": ""})
+    assert b"2 posts" in client.get("/user/test").data
+
+    client.post("/1/delete")
+    client.post("/2/delete")
+    assert b"0 posts" in client.get("/user/test").data
+
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute("INSERT INTO post (title, body, author_id) VALUES ('', '', 2)")
+        db.execute("UPDATE post SET author_id = 1")
+        db.commit()
+        counts: List[Any] = db.execute(
+            "SELECT user_id, post_count FROM user_stats ORDER BY user_id"
+        ).fetchall()
+        assert [tuple(row) for row in counts] == [(1, 1), (2, 0)]
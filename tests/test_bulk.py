@@ -0,0 +1,120 @@
+"""Test the NDJSON export and import commands."""
+
+import json
+from sqlite3 import Connection
+from typing import Any, Dict, List
+
+from flask import Flask
+from flask.testing import FlaskCliRunner
+
+from flaskr.bulk import import_records
+from flaskr.cache import get_cache
+from flaskr.db import get_db, init_db
+
+
+def test_export(runner: FlaskCliRunner) -> None:
+    """Test that users come before posts, one record per line.
+
+    Args:
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    result = runner.invoke(args=["export"])
+    records: List[Dict[str, Any]] = [
+        json.loads(line) for line in result.stdout_bytes.decode().splitlines()
+    ]
+
+    assert [r["type"] for r in records] == ["user", "user", "post"]
+    assert records[0]["username"] == "test"
+    assert records[2] == {
+        "type": "post",
+        "id": 1,
+        "author_id": 1,
+        "created": "2018-01-01 00:00:00",
+        "title": "test title",
+        "body": "test\nbody",
+    }
+    assert "Exported 2 users and 1 posts" in result.output
+
+
+def test_round_trip(app: Flask, runner: FlaskCliRunner, tmp_path: Any) -> None:
+    """Test that an export imports into an empty database unchanged.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+        tmp_path (Any): The pytest temporary directory.
+    """
+    dump: str = str(tmp_path / "dump.ndjson")
+    runner.invoke(args=["export", dump])
+
+    with app.app_context():
+        init_db()
+
+    result = runner.invoke(args=["import", dump, "--batch-size", "1"])
+    assert "Imported 2 users and 1 posts" in result.output
+    assert "rows/s" in result.output
+
+    with app.app_context():
+        db: Connection = get_db()
+        post: Any = db.execute("SELECT * FROM post").fetchone()
+        assert post["title"] == "test title"
+        assert str(post["created"]) == "2018-01-01 00:00:00"
+        assert db.execute("SELECT COUNT(*) FROM user").fetchone()[0] == 2
+
+    assert "Error" in runner.invoke(args=["import", dump]).output
+    result = runner.invoke(args=["import", dump, "--skip-existing"])
+    assert result.exit_code == 0
+
+
+def test_import_batches(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test importing many posts in batches from stdin.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    lines: str = "\n".join(
+        json.dumps(
+            {
+                "type": "post",
+                "id": n,
+                "author_id": 2,
+                "created": "2020-01-01 00:00:00",
+                "title": f"post {n}",
+                "body": "",
+            }
+        )
+        for n in range(2, 12)
+    )
+    app.config["IMPORT_BATCH_SIZE"] = 3
+    result = runner.invoke(args=["import"], input=lines + "\n\n")
+
+    assert "Imported 0 users and 10 posts" in result.output
+    with app.app_context():
+        assert get_db().execute("SELECT COUNT(*) FROM post").fetchone()[0] == 11
+
+
+def test_import_invalidates_users(app: Flask) -> None:
+    """Test that importing a user drops it from the user cache.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    line: str = json.dumps(
+        {"type": "user", "id": 3, "username": "new", "password": "x"}
+    )
+    with app.app_context():
+        get_cache("user").set(3, "stale")
+        import_records([line], batch_size=10)
+        assert get_cache("user").get(3) is None
+
+
+def test_import_invalid(runner: FlaskCliRunner) -> None:
+    """Test that a malformed line is reported with its number.
+
+    Args:
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    result = runner.invoke(args=["import"], input='{"type": "user"}\n')
+    assert result.exit_code == 1
+    assert "Line 1 is not a valid record" in result.output
@@ -0,0 +1,57 @@
+"""Test the in-process caches."""
+
+from typing import Any
+
+from flaskr.cache import TTLCache
+
+
+def test_lru_eviction() -> None:
+    """Test that the least recently used entry is evicted first."""
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_expiry(monkeypatch: Any) -> None:
+    """Test that entries expire after the ttl.
+
+    Args:
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+    now: float = 1000.0
+    monkeypatch.setattr("flaskr.cache.time.monotonic", lambda: now)
+    cache = TTLCache(2, 10)
+    cache.set("a", 1)
+
+    now += 9
+    assert cache.get("a") == 1
+    now += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_delete_and_clear() -> None:
+    """Test explicit invalidation."""
+    cache = TTLCache(4, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None and cache.get("b") == 2
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_disabled() -> None:
+    """Test that a cache of size 0 stores nothing."""
+    cache = TTLCache(0, 60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
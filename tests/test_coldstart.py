@@ -0,0 +1,35 @@
+"""Test the cold start report."""
+
+from functools import partial
+from typing import Any
+
+from click.testing import CliRunner
+
+from flaskr import coldstart
+from flaskr.coldstart import startup_report_command
+
+
+def test_startup_report(tmp_path: Any, monkeypatch: Any) -> None:
+    """Test that the report lists every phase and enforces the budget.
+
+    The generous budget keeps a loaded machine from failing the first run.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+        monkeypatch (Any): The pytest monkeypatch fixture.
+    """
+    config = {"TESTING": True, "JINJA_BYTECODE_CACHE": str(tmp_path)}
+    monkeypatch.setattr(coldstart, "measure", partial(coldstart.measure, config=config))
+
+    result = CliRunner().invoke(
+        startup_report_command, ["--runs", "1", "--budget", "60"]
+    )
+    assert result.exit_code == 0, result.output
+    for phase in ("import", "config", "makedirs", "db", "blueprints", "total"):
+        assert f"\n{phase} " in result.output
+
+    result = CliRunner().invoke(
+        startup_report_command, ["--runs", "1", "--budget", "0"]
+    )
+    assert result.exit_code == 1
+    assert "over the 0 ms budget" in result.output
@@ -0,0 +1,120 @@
+"""Test the compression of responses."""
+
+import gzip
+from typing import List
+import zlib
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr.compress import compress_response
+
+GZIP = {"Accept-Encoding": "gzip, deflate"}
+
+
+def test_compress(client: FlaskClient) -> None:
+    """Test that a page is sent gzipped to a client that accepts it.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+    """
+    plain: Response = client.get("/")
+    r: Response = client.get("/", headers=GZIP)
+    assert r.content_encoding == "gzip"
+    assert "Accept-Encoding" in r.vary
+    assert int(r.headers["Content-Length"]) < len(plain.data)
+    assert gzip.decompress(r.data) == plain.data
+
+    assert plain.content_encoding is None
+    assert "Accept-Encoding" in plain.vary
+    assert plain.get_etag() == (r.get_etag()[0], False)
+    assert r.get_etag()[1]
+
+
+def test_not_modified(client: FlaskClient) -> None:
+    """Test that the weak ETag of a compressed page still validates.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+    """
+    etag: str = client.get("/", headers=GZIP).headers["ETag"]
+    assert etag.startswith("W/")
+
+    r: Response = client.get("/", headers={**GZIP, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content_encoding is None
+
+
+def test_min_size(app: Flask, client: FlaskClient) -> None:
+    """Test that responses shorter than COMPRESS_MIN_SIZE are sent as they are.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flaskr test client.
+    """
+    assert client.get("/hello", headers=GZIP).content_encoding is None
+
+    app.config["COMPRESS_MIN_SIZE"] = 0
+    r: Response = client.get("/hello", headers=GZIP)
+    assert r.content_encoding == "gzip"
+    assert gzip.decompress(r.data) == b"<h1>Hello, World!</h1>"
+
+
+def test_stream(app: Flask, client: FlaskClient) -> None:
+    """Test that a streamed page is compressed chunk by chunk.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flaskr test client.
+    """
+    app.config["PAGE_CACHE_SIZE"] = 0
+    buffered: bytes = client.get("/").data
+    app.config["STREAM_INDEX"] = True
+    app.config["STREAM_BUFFER_SIZE"] = 2
+
+    r: Response = client.get("/", headers=GZIP, buffered=False)
+    assert r.content_encoding == "gzip"
+    assert "Content-Length" not in r.headers
+
+    chunks: List[bytes] = list(r.response)
+    r.close()
+    assert len(chunks) > 2
+    # Each chunk is flushed, so it can be decompressed on its own arrival.
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(chunks[0])
+    assert gzip.decompress(b"".join(chunks)) == buffered
+
+
+def test_brotli(client: FlaskClient) -> None:
+    """Test that brotli is preferred when the brotli package is installed.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+    """
+    brotli = pytest.importorskip("brotli")
+    plain: Response = client.get("/")
+    r: Response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert r.content_encoding == "br"
+    assert brotli.decompress(r.data) == plain.data
+
+
+@pytest.mark.parametrize(
+    "headers",
+    (
+        {"Content-Encoding": "gzip"},
+        {"Cache-Control": "no-transform"},
+        {"Content-Type": "image/png"},
+    ),
+)
+def test_skip(app: Flask, headers: dict) -> None:
+    """Test that responses that are encoded or not text are left alone.
+
+    Args:
+        app (Flask): The flaskr application.
+        headers (dict): The headers of the response.
+    """
+    body: bytes = b"x" * 1000
+    with app.test_request_context(headers=GZIP):
+        r: Response = compress_response(Response(body, headers=headers))
+    assert r.get_data() == body
+    assert r.headers.get("Content-Encoding") == headers.get("Content-Encoding")
@@ -0,0 +1,140 @@
+"""Test conditional GET support."""
+
+from sqlite3 import Connection
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr.conditional import get_content_version
+from flaskr.db import get_db
+from tests.conftest import AuthActions
+
+
+@pytest.mark.parametrize("path", ("/", "/1"))
+def test_validators(app: Flask, client: FlaskClient, path: str) -> None:
+    """Test that pages carry an ETag and Last-Modified.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        path (str): The page to check.
+    """
+    with app.app_context():
+        version, _ = get_content_version()
+
+    r: Response = client.get(path)
+    assert r.status_code == 200
+    assert r.headers["ETag"] == f'"0.1.0-{version}-0"'
+    assert r.last_modified is not None
+    assert r.cache_control.no_cache
+    assert "Cookie" in r.vary
+
+
+@pytest.mark.parametrize("path", ("/", "/1"))
+def test_not_modified(app: Flask, client: FlaskClient, path: str) -> None:
+    """Test that matching validators get a 304 without running the view.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        path (str): The page to check.
+    """
+    first: Response = client.get(path)
+    app.config["SQL_TRACE"] = True
+
+    r: Response = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    assert r.status_code == 304
+    assert r.data == b""
+    assert 'desc="1 queries"' in r.headers["Server-Timing"]
+
+    r = client.get(
+        path, headers={"If-Modified-Since": first.headers["Last-Modified"]}
+    )
+    assert r.status_code == 304
+
+    r = client.get(path, headers={"If-None-Match": '"stale"'})
+    assert r.status_code == 200
+
+
+def test_version_changes_on_write(app: Flask) -> None:
+    """Test that every kind of write to post bumps the content version.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        version, _ = get_content_version()
+
+        db.execute("INSERT INTO post (title, body, author_id) VALUES ('a', '', 1)")
+        db.execute("UPDATE post SET title = 'b' WHERE id = 1")
+        db.execute("DELETE FROM post WHERE id = 1")
+        db.commit()
+
+        assert get_content_version()[0] == version + 3
+
+
+def test_validators_depend_on_user(client: FlaskClient, auth: AuthActions) -> None:
+    """Test that logging in changes the ETag and makes the page private.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The object which will login.
+    """
+    anonymous: str = client.get("/").headers["ETag"]
+    auth.login()
+    r: Response = client.get("/", headers={"If-None-Match": anonymous})
+
+    assert r.status_code == 200
+    assert r.headers["ETag"] != anonymous
+    assert r.cache_control.private
+
+
+def test_flashes_skip_validators(client: FlaskClient) -> None:
+    """Test that a page showing flash messages is never a 304.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+    """
+    etag: str = client.get("/").headers["ETag"]
+
+    with client.session_transaction() as session:
+        session["_flashes"] = [("message", "hello")]
+
+    r: Response = client.get("/", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert "ETag" not in r.headers
+    assert b"hello" in r.data
+
+
+def test_detail(client: FlaskClient, auth: AuthActions) -> None:
+    """Test the single post page.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The object which will login.
+    """
+    r: Response = client.get("/1")
+    assert b"test title" in r.data
+    assert b"test\nbody" in r.data
+    assert b'href="/1/update"' not in r.data
+
+    auth.login()
+    assert b'href="/1/update"' in client.get("/1").data
+    assert client.get("/2").status_code == 404
+
+
+def test_detail_escapes_body(client: FlaskClient, auth: AuthActions) -> None:
+    """Test that markup in a post body is shown as text, not run.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+        auth (AuthActions): The object which will login.
+    """
+    auth.login()
+    client.post("/create", data={"title": "xss", "body": "<script>alert(1)</script>"})
+
+    r: Response = client.get("/2")
+    assert b"<script>alert(1)</script>" not in r.data
+    assert b"&lt;script&gt;alert(1)&lt;/script&gt;" in r.data
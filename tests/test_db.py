@@ -1,14 +1,21 @@
 """Test the database."""
 
+import io
 import sqlite3
 from sqlite3 import Connection
 from typing import Any
 
 from flask import Flask
-from flask.testing import FlaskCliRunner
+from flask.testing import FlaskClient, FlaskCliRunner
 import pytest
 
-from flaskr.db import get_db
+from flaskr.db import (
+    get_db,
+    get_pool,
+    get_schema_version,
+    list_migrations,
+    upgrade_db,
+)
 
 
 def test_get_close_db(app: Flask) -> None:
@@ -47,3 +54,185 @@ def test_init_db_command(runner: FlaskCliRunner, monkeypatch: Any) -> None:
     result = runner.invoke(args=["init-db"])
     assert "Initialised" in result.output
     assert Recorder.called
+
+
+def test_init_db_applies_migrations(app: Flask) -> None:
+    """Test that a fresh database is created at the latest schema version.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        assert get_schema_version() == list_migrations()[-1][0]
+        assert upgrade_db() == []
+
+
+def test_upgrade_db_keeps_data(app: Flask) -> None:
+    """Test that upgrading a database from the base schema keeps its rows.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        with app.open_resource("schema.sql") as f:
+            db.executescript(f.read().decode("utf8"))
+        db.executescript(
+            "INSERT INTO user (username, password) VALUES ('a', '');"
+            "INSERT INTO post (title, body, author_id) VALUES ('t', '<b>', 1);"
+        )
+        assert get_schema_version() == 0
+
+        assert upgrade_db() == [filename for _, filename in list_migrations()]
+        assert tuple(db.execute("SELECT excerpt, body_html FROM post").fetchone()) == (
+            "<b>",
+            "&lt;b&gt;",
+        )
+
+        plan: str = " ".join(
+            row[3]
+            for row in db.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM post ORDER BY created DESC, id DESC"
+            )
+        )
+        assert "post_created_id_idx" in plan
+
+        assert tuple(
+            db.execute("SELECT user_id, post_count FROM user_stats").fetchone()
+        ) == (1, 1)
+
+
+@pytest.mark.parametrize("deleted", ["3", "1, 2, 3"])
+def test_upgrade_db_keeps_post_ids(app: Flask, deleted: str) -> None:
+    """Test that rebuilding the post table does not reuse deleted post ids.
+
+    Args:
+        app (Flask): The Flask application.
+        deleted (str): The ids of the posts deleted before upgrading.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        with app.open_resource("schema.sql") as f:
+            db.executescript(f.read().decode("utf8"))
+        db.executescript(
+            "INSERT INTO user (username, password) VALUES ('a', '');"
+            "INSERT INTO post (title, body, author_id)"
+            " VALUES ('1', '', 1), ('2', '', 1), ('3', '', 1);"
+            f"DELETE FROM post WHERE id IN ({deleted});"
+        )
+
+        upgrade_db()
+        db.execute("INSERT INTO post (title, body, author_id) VALUES ('4', '', 1)")
+        assert db.execute("SELECT max(id) FROM post").fetchone()[0] == 4
+
+
+def test_upgrade_db_rolls_back(app: Flask, monkeypatch: Any) -> None:
+    """Test that a failing migration leaves the schema version unchanged.
+
+    Args:
+        app (Flask): The Flask application.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+    with app.app_context():
+        version: int = get_schema_version()
+        monkeypatch.setattr(
+            "flaskr.db.list_migrations", lambda: [(version + 1, "9999_broken.sql")]
+        )
+        monkeypatch.setattr(
+            app,
+            "open_resource",
+            lambda *args: io.StringIO(
+                "CREATE TABLE scratch (id); CREATE TABLE post (id);"
+            ),
+        )
+
+        with pytest.raises(sqlite3.OperationalError):
+            upgrade_db()
+
+        db: Connection = get_db()
+        assert get_schema_version() == version
+        assert not db.in_transaction
+        assert (
+            db.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'scratch'"
+            ).fetchone()
+            is None
+        )
+
+
+def test_upgrade_db_records_name(app: Flask, monkeypatch: Any) -> None:
+    """Test that a migration's file name is stored as it is, quotes included.
+
+    Args:
+        app (Flask): The Flask application.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+    with app.app_context():
+        version: int = get_schema_version() + 1
+        monkeypatch.setattr(
+            "flaskr.db.list_migrations", lambda: [(version, "9999_it's.sql")]
+        )
+        monkeypatch.setattr(
+            app, "open_resource", lambda *args: io.StringIO("CREATE TABLE x (id);")
+        )
+
+        assert upgrade_db() == ["9999_it's.sql"]
+        assert get_schema_version() == version
+        assert get_db().execute(
+            "SELECT name FROM schema_version WHERE version = ?", (version,)
+        ).fetchone()[0] == "9999_it's.sql"
+
+
+def test_upgrade_db_command(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test that db-upgrade reports the schema version.
+
+    Args:
+        app (Flask): The Flask application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    with app.app_context():
+        latest: int = list_migrations()[-1][0]
+
+    result = runner.invoke(args=["db-upgrade"])
+    assert f"version {latest}" in result.output
+
+
+def test_database_locked(app: Flask, client: FlaskClient) -> None:
+    """Test that lock timeouts become a 503 and other errors still raise.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+
+    @app.route("/locked/<message>")
+    def locked(message: str) -> None:
+        raise sqlite3.OperationalError(message)
+
+    response = client.get("/locked/database is locked")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.data == b"database is locked"
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        client.get("/locked/no such table")
+
+
+def test_database_busy(app: Flask, client: FlaskClient) -> None:
+    """Test that a pool timeout becomes a 503 instead of a 500.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    client.post("/auth/login", data={"username": "test", "password": "test"})
+    with app.app_context():
+        get_pool().timeout = 0.01
+        held: Any = get_pool().acquire()
+
+    response = client.post("/create", data={"title": "busy", "body": ""})
+    held.close()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.data.startswith(b"No database connection free")
@@ -1,15 +1,28 @@
 """Test factory for the application."""
 
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
 from flask import Response
 from flask.testing import FlaskClient
+import pytest
 
 from flaskr import create_app
+from flaskr.coldstart import BUDGET, measure
+from flaskr.startup import StartupTimer
+
 
+def test_config(tmp_path: Any) -> None:
+    """Test the configuration.
 
-def test_config() -> None:
-    """Test the configuration."""
-    assert not create_app().testing
-    assert create_app({"TESTING": True}).testing
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    assert not create_app({"JINJA_BYTECODE_CACHE": str(tmp_path)}).testing
+    assert create_app({"TESTING": True, "JINJA_BYTECODE_CACHE": None}).testing
 
 
 def test_hello(client: FlaskClient) -> None:
@@ -20,3 +33,58 @@ def test_hello(client: FlaskClient) -> None:
     """
     response: Response = client.get("/hello")
     assert response.data == b"<h1>Hello, World!</h1>"
+
+
+def test_startup_phases() -> None:
+    """Test that create_app records the time of each phase."""
+    timer: StartupTimer = create_app(
+        {"TESTING": True, "JINJA_BYTECODE_CACHE": None}
+    ).extensions["flaskr_startup"]
+    assert list(timer.phases) == [
+        "app",
+        "config",
+        "makedirs",
+        "metrics",
+        "db",
+        "blueprints",
+        "commands",
+    ]
+    assert timer.total == sum(timer.phases.values()) > 0
+
+
+@pytest.mark.skipif(
+    not os.environ.get("FLASKR_STARTUP_BUDGET"),
+    reason="Wall-clock check; set FLASKR_STARTUP_BUDGET=1 to run it.",
+)
+def test_startup_budget(tmp_path: Any) -> None:
+    """Test that a cold start stays within the budget.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    config: Dict[str, Any] = {
+        "TESTING": True,
+        "METRICS_DIR": str(tmp_path / "metrics"),
+        "JINJA_BYTECODE_CACHE": str(tmp_path / "jinja-cache"),
+    }
+    totals: List[float] = [sum(phases.values()) for phases in measure(3, config)]
+    assert statistics.median(totals) < BUDGET
+
+
+def test_commands_not_imported() -> None:
+    """Test that creating the app does not import command-line modules."""
+    child: str = (
+        "import sys, flaskr\n"
+        "flaskr.create_app({'TESTING': True, 'JINJA_BYTECODE_CACHE': None})\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    modules: List[str] = subprocess.run(
+        [sys.executable, "-c", child],
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, sys.path))},
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.split()
+    assert "flaskr.blog" in modules
+    for module in ("bulk", "coldstart", "loadtest", "warmup"):
+        assert f"flaskr.{module}" not in modules
@@ -0,0 +1,166 @@
+"""Test password hashing."""
+
+import threading
+from typing import Any
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr import hashing
+from flaskr.db import get_db
+from flaskr.hashing import HasherBusyError, PasswordHasher
+from tests.conftest import AuthActions
+
+
+def test_hash_and_verify() -> None:
+    """Test that a hash made with the configured method verifies."""
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", salt_length=12)
+    pwhash: str = hasher.hash("secret")
+
+    assert pwhash.startswith("pbkdf2:sha256:1000$")
+    assert hasher.verify(pwhash, "secret")
+    assert not hasher.verify(pwhash, "wrong")
+    assert not hasher.needs_rehash(pwhash)
+
+
+@pytest.mark.parametrize(
+    ("method", "pwhash", "expected"),
+    (
+        ("pbkdf2:sha256", "pbkdf2:sha256:150000$abcdefgh$00", False),
+        ("pbkdf2:sha256:150000", "pbkdf2:sha256$abcdefgh$00", False),
+        ("pbkdf2:sha256:150000", "pbkdf2:sha256:50000$abcdefgh$00", True),
+        ("pbkdf2:sha256:150000", "pbkdf2:sha256:150000$abcd$00", True),
+        ("pbkdf2:sha512", "pbkdf2:sha256$abcdefgh$00", True),
+        ("pbkdf2:sha256", "plaintext", True),
+    ),
+)
+def test_needs_rehash(method: str, pwhash: str, expected: bool) -> None:
+    """Test detecting hashes made with other parameters.
+
+    Args:
+        method (str): The configured method.
+        pwhash (str): The stored hash.
+        expected (bool): Whether a rehash is needed.
+    """
+    assert PasswordHasher(method=method).needs_rehash(pwhash) is expected
+
+
+def test_busy() -> None:
+    """Test that jobs beyond the workers and queue are refused at once."""
+    hasher = PasswordHasher(workers=1, queue_size=0, timeout=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(1)
+
+    thread = threading.Thread(target=hasher._run, args=(block,))
+    thread.start()
+    started.wait(1)
+
+    with pytest.raises(HasherBusyError):
+        hasher.verify("pbkdf2:sha256:1$a$b", "x")
+
+    release.set()
+    thread.join()
+    assert not hasher.verify("pbkdf2:sha256:1$a$b", "x")
+
+
+def test_timeout() -> None:
+    """Test that a job that outlasts the timeout is reported as busy."""
+    hasher = PasswordHasher(workers=1, queue_size=0, timeout=0.01)
+    release = threading.Event()
+
+    with pytest.raises(HasherBusyError):
+        hasher._run(release.wait, 5)
+    release.set()
+
+
+def test_login_rehashes(app: Flask, auth: AuthActions) -> None:
+    """Test that an outdated hash is replaced on a successful login.
+
+    Args:
+        app (Flask): The flaskr application.
+        auth (AuthActions): The class with the auth methods.
+    """
+    auth.login()
+
+    with app.app_context():
+        pwhash: str = (
+            get_db().execute("SELECT password FROM user WHERE id = 1").fetchone()[0]
+        )
+
+    assert pwhash.startswith("pbkdf2:sha256:150000$")
+    assert auth.login().headers["Location"] == "http://localhost/"
+
+
+def test_login_busy(client: FlaskClient, monkeypatch: Any) -> None:
+    """Test that a saturated hashing pool answers 503.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+
+    def busy(*args: Any) -> None:
+        raise HasherBusyError()
+
+    monkeypatch.setattr(PasswordHasher, "_run", busy)
+    r: Response = client.post(
+        "/auth/login", data={"username": "test", "password": "test"}
+    )
+
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    assert b"try again" in r.data
+
+
+def test_login_timeout(app: Flask, client: FlaskClient, monkeypatch: Any) -> None:
+    """Test that a password check that outlasts the timeout answers 503.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+    app.config["PASSWORD_HASH_TIMEOUT"] = 0.01
+    release = threading.Event()
+
+    def slow_check(*args: Any) -> bool:
+        release.wait(5)
+        return False
+
+    monkeypatch.setattr(hashing, "check_password_hash", slow_check)
+    r: Response = client.post(
+        "/auth/login", data={"username": "test", "password": "test"}
+    )
+    release.set()
+
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_rehash_skipped_when_busy(
+    app: Flask, auth: AuthActions, monkeypatch: Any
+) -> None:
+    """Test that login still succeeds when the rehash cannot be queued.
+
+    Args:
+        app (Flask): The flaskr application.
+        auth (AuthActions): The class with the auth methods.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+
+    def busy(*args: Any) -> None:
+        raise HasherBusyError()
+
+    monkeypatch.setattr(PasswordHasher, "hash", busy)
+    assert auth.login().headers["Location"] == "http://localhost/"
+
+    with app.app_context():
+        pwhash: str = (
+            get_db().execute("SELECT password FROM user WHERE id = 1").fetchone()[0]
+        )
+
+    assert pwhash.startswith("pbkdf2:sha256:50000$")
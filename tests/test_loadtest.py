@@ -0,0 +1,86 @@
+"""Test the load generator."""
+
+from typing import Any
+
+import click
+from flask import Flask
+from flask.testing import FlaskCliRunner
+import pytest
+
+from flaskr.db import get_db, get_pool
+from flaskr.loadtest import LoadTest, parse_mix, summarize
+
+
+def test_parse_mix() -> None:
+    """Test that kinds left out of a mix get no weight."""
+    assert parse_mix("read=3, write=1") == {"read": 3.0, "login": 0.0, "write": 1.0}
+
+    for mix in ("read=1,delete=1", "read=x", "read=0"):
+        with pytest.raises(click.BadParameter):
+            parse_mix(mix)
+
+
+def test_contention(app: Flask) -> None:
+    """Test that lock and pool timeouts both count as contention.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    load = LoadTest(app, username="test", password="test")
+    load._client("write")  # Log in while the writer is free
+    with app.app_context():
+        get_pool().timeout = 0.01
+        held: Any = get_pool().acquire()
+
+    _, _, status, contended = load.request("write", 1)
+    held.close()
+
+    assert status == 503
+    assert contended
+
+
+def test_summarize() -> None:
+    """Test that errors and lock timeouts are counted."""
+    totals = summarize(
+        [("read", 0.001, 200, False), ("write", 0.003, 503, True)], elapsed=0.5
+    )
+    assert totals["requests"] == 2
+    assert totals["errors"] == 1
+    assert totals["locked"] == 1
+    assert totals["rps"] == 4.0
+    assert totals["p50_ms"] == 1.0
+    assert totals["p99_ms"] == 3.0
+
+
+def test_run_in_process(app: Flask) -> None:
+    """Test a mixed run against the app.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    report = LoadTest(app, username="test", password="test").run(
+        {"read": 1, "login": 1, "write": 2}, count=20, threads=4
+    )
+
+    assert report["requests"] == 20
+    assert report["errors"] == 0
+    assert sum(kind["requests"] for kind in report["kinds"].values()) == 20
+
+    with app.app_context():
+        count = get_db().execute("SELECT COUNT(*) FROM post").fetchone()[0]
+    assert count == 1 + report["kinds"]["write"]["requests"]
+
+
+def test_loadtest_command(runner: FlaskCliRunner) -> None:
+    """Test the report and the check for credentials.
+
+    Args:
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    result = runner.invoke(args=["loadtest", "--mix", "read=1", "-n", "5"])
+    assert result.exit_code == 0
+    assert "total" in result.output
+    assert "read" in result.output
+
+    result = runner.invoke(args=["loadtest", "--mix", "write=1"])
+    assert "need --username and --password" in result.output
@@ -0,0 +1,233 @@
+"""Test the metrics and their aggregation across processes."""
+
+import json
+import os
+from typing import Any
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr import metrics
+from flaskr.metrics import collect, Registry, render
+from tests.conftest import AuthActions
+
+#: A pid above the Linux maximum, so no process has it.
+DEAD_PID = 2 ** 22 + 1
+
+
+@pytest.fixture
+def metrics_dir(app: Flask) -> str:
+    """The temporary directory the app keeps its metrics in.
+
+    Args:
+        app (Flask): The flaskr application.
+
+    Returns:
+        str: The directory.
+    """
+    return app.config["METRICS_DIR"]
+
+
+def test_registry(tmp_path: Any) -> None:
+    """Test counters, histograms and the file they are written to.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    registry = Registry(str(tmp_path), flush_interval=60)
+    registry.inc("requests", endpoint="a")
+    registry.inc("requests", 2, endpoint="a")
+    registry.observe("latency", 0.003, endpoint="a")
+    registry.observe("latency", 100, endpoint="a")
+
+    registry.flush({})
+    registry.inc("requests", endpoint="a")
+    registry.flush({})  # Too soon, so not written
+    assert registry.filename.startswith(f"{os.getpid()}-")
+    with open(tmp_path / registry.filename) as f:
+        snapshot = json.load(f)
+
+    assert snapshot["counters"] == [["requests", [["endpoint", "a"]], 3.0]]
+    [[name, labels, histogram]] = snapshot["histograms"]
+    assert histogram[metrics.BUCKETS.index(0.005)] == 1
+    assert histogram[len(metrics.BUCKETS)] == 1
+    assert histogram[-2:] == [100.003, 2]
+
+
+def test_registry_after_fork(tmp_path: Any) -> None:
+    """Test that a forked process does not report its parent's counts.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    registry = Registry(str(tmp_path))
+    registry.inc("requests")
+    filename: str = registry.filename
+    registry._pid = DEAD_PID
+    registry.inc("requests")
+    assert registry.snapshot({})["counters"] == [["requests", (), 1.0]]
+    assert registry.filename != filename
+
+
+def test_collect(tmp_path: Any) -> None:
+    """Test that processes are summed, and gauges only for live ones.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    for pid in (os.getpid(), DEAD_PID):
+        with open(tmp_path / f"{pid}.json", "w") as f:
+            json.dump(
+                {
+                    "pid": pid,
+                    "counters": [["requests", [["endpoint", "a"]], 2]],
+                    "histograms": [["latency", [], [1, 0, 3, 0.5, 4]]],
+                    "gauges": [["open", [], 3]],
+                },
+                f,
+            )
+    (tmp_path / "partial.json.1.tmp").write_text("{")
+
+    totals = collect(str(tmp_path))
+    assert totals["counters"] == {("requests", (("endpoint", "a"),)): 4}
+    assert totals["histograms"] == {("latency", ()): [2, 0, 6, 1.0, 8]}
+    assert totals["gauges"] == {("open", ()): 3}
+
+    # The dead process was archived, and is still counted once.
+    assert not os.path.exists(tmp_path / f"{DEAD_PID}.json")
+    assert os.path.exists(tmp_path / metrics.ARCHIVE)
+    assert collect(str(tmp_path)) == totals
+
+
+def test_collect_reused_pid(tmp_path: Any) -> None:
+    """Test that a process reusing a dead one's pid does not replace its totals.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    first = Registry(str(tmp_path))
+    first.inc("requests", 5)
+    first.flush({}, force=True)
+    second = Registry(str(tmp_path))
+    second.inc("requests")
+    second.flush({}, force=True)
+
+    assert first.filename != second.filename
+    assert collect(str(tmp_path))["counters"] == {("requests", ()): 6}
+    assert collect(str(tmp_path / "missing")) == {
+        "counters": {},
+        "histograms": {},
+        "gauges": {},
+    }
+
+
+def test_render() -> None:
+    """Test the Prometheus text format."""
+    histogram = [0.0] * (len(metrics.BUCKETS) + 3)
+    histogram[0], histogram[-3], histogram[-2], histogram[-1] = 1, 1, 9.0005, 2
+    text: str = render(
+        {
+            "counters": {
+                ("flaskr_http_requests_total", (("endpoint", 'a"b\\'),)): 1234567
+            },
+            "histograms": {("flaskr_http_request_duration_seconds", ()): histogram},
+            "gauges": {},
+        }
+    )
+
+    assert text.startswith(
+        "# HELP flaskr_http_requests_total Requests handled, by endpoint,"
+        " method and status.\n"
+        "# TYPE flaskr_http_requests_total counter\n"
+        'flaskr_http_requests_total{endpoint="a\\"b\\\\"} 1234567.0\n'
+        "# HELP flaskr_http_request_duration_seconds"
+    )
+    assert 'flaskr_http_request_duration_seconds_bucket{le="0.001"} 1.0\n' in text
+    assert 'flaskr_http_request_duration_seconds_bucket{le="5"} 1.0\n' in text
+    assert 'flaskr_http_request_duration_seconds_bucket{le="+Inf"} 2.0\n' in text
+    assert "flaskr_http_request_duration_seconds_sum 9.0005\n" in text
+    assert text.endswith("flaskr_http_request_duration_seconds_count 2.0\n")
+    assert "flaskr_db_connections" not in text
+
+
+def test_endpoint(client: FlaskClient, metrics_dir: str) -> None:
+    """Test that requests, statuses, pools and latencies are reported.
+
+    Args:
+        client (FlaskClient): The flaskr test client.
+        metrics_dir (str): The metrics directory.
+    """
+    client.get("/")
+    client.get("/")
+    client.get("/missing")
+
+    r: Response = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    text: str = r.get_data(as_text=True)
+    assert (
+        'flaskr_http_requests_total{endpoint="blog.index",method="GET",status="200"}'
+        " 2.0" in text
+    )
+    assert (
+        'flaskr_http_requests_total{endpoint="none",method="GET",status="404"} 1.0'
+        in text
+    )
+    assert (
+        'flaskr_http_request_duration_seconds_count{endpoint="blog.index"} 2.0'
+        in text
+    )
+    assert 'flaskr_db_checkouts_total{pool="read"} 2.0' in text
+    assert 'flaskr_db_connections{pool="read",state="open"} 1.0' in text
+    assert "flaskr_db_queries_total" not in text
+    [filename] = [name for name in os.listdir(metrics_dir) if name.endswith(".json")]
+    assert filename.startswith(f"{os.getpid()}-")
+
+
+def test_queries(app: Flask, client: FlaskClient, metrics_dir: str) -> None:
+    """Test that statements are counted while SQL_TRACE is set.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flaskr test client.
+        metrics_dir (str): The metrics directory.
+    """
+    app.config["SQL_TRACE"] = True
+    client.get("/1")
+
+    text: str = client.get("/metrics").get_data(as_text=True)
+    assert 'flaskr_db_queries_total{endpoint="blog.detail"} 2.0' in text
+    assert 'flaskr_db_query_seconds_total{endpoint="blog.detail"}' in text
+
+
+def test_password_hashing(
+    auth: AuthActions, client: FlaskClient, metrics_dir: str
+) -> None:
+    """Test that password checks are timed.
+
+    Args:
+        auth (AuthActions): The class with the auth methods.
+        client (FlaskClient): The flaskr test client.
+        metrics_dir (str): The metrics directory.
+    """
+    auth.login()
+
+    text: str = client.get("/metrics").get_data(as_text=True)
+    assert (
+        'flaskr_password_hash_duration_seconds_count{operation="verify"} 1.0' in text
+    )
+
+
+def test_disabled(app: Flask, client: FlaskClient, metrics_dir: str) -> None:
+    """Test that nothing is recorded or served when metrics are off.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flaskr test client.
+        metrics_dir (str): The metrics directory.
+    """
+    app.config["METRICS_ENABLED"] = False
+    client.get("/")
+    assert client.get("/metrics").status_code == 404
+    assert not os.path.exists(metrics_dir)
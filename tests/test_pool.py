@@ -0,0 +1,182 @@
+"""Test the connection pool."""
+
+import sqlite3
+from sqlite3 import Connection
+from typing import Any
+
+from flask import Flask, g
+import pytest
+
+from flaskr.db import get_db, get_pool, get_read_db, get_write_db
+from flaskr.pool import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def pool(tmp_path: Any) -> ConnectionPool:
+    """A small pool over an empty database.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+
+    Returns:
+        ConnectionPool: The pool.
+    """
+    return ConnectionPool(
+        str(tmp_path / "pool.sqlite"),
+        size=2,
+        timeout=0.05,
+        pragmas={"journal_mode": "wal", "busy_timeout": 1234, "mmap_size": None},
+    )
+
+
+def test_connections_are_reused(app: Flask) -> None:
+    """Test that each app context reuses the same pooled connection.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.app_context():
+        first: Connection = get_db()._connection  # type: ignore
+        assert get_pool().stats == {"open": 1, "idle": 0}
+
+    with app.app_context():
+        assert get_db()._connection is first  # type: ignore
+        assert get_pool().stats == {"open": 1, "idle": 0}
+
+    with app.app_context():
+        assert get_pool().stats == {"open": 1, "idle": 1}
+
+
+def test_pragmas(pool: ConnectionPool) -> None:
+    """Test that the pragmas are run when a connection is opened.
+
+    Args:
+        pool (ConnectionPool): The pool.
+    """
+    db = pool.acquire()
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    assert isinstance(db.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+    db.close()
+
+
+def test_read_write_split(app: Flask) -> None:
+    """Test that GET requests read through the read-only pool.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    with app.test_request_context("/"):
+        db: Connection = get_db()
+        assert db is get_read_db()
+        assert "db" not in g
+        assert db.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            db.execute("DELETE FROM post")
+
+    with app.test_request_context("/create", method="POST"):
+        db = get_db()
+        assert db is get_write_db()
+        assert db.isolation_level == "IMMEDIATE"
+        assert get_pool().size == 1
+        assert get_pool(read_only=True).stats == {"open": 1, "idle": 1}
+
+
+def test_size_limit(pool: ConnectionPool) -> None:
+    """Test that acquire times out when every connection is checked out.
+
+    Args:
+        pool (ConnectionPool): The pool.
+    """
+    first, second = pool.acquire(), pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+
+    second.close()
+    assert pool.acquire() is not None
+    first.close()
+
+
+def test_release_rolls_back(pool: ConnectionPool) -> None:
+    """Test that uncommitted changes are not handed to the next user.
+
+    Args:
+        pool (ConnectionPool): The pool.
+    """
+    db = pool.acquire()
+    db.execute("CREATE TABLE t (x)")
+    db.execute("INSERT INTO t VALUES (1)")
+    db.close()
+
+    db = pool.acquire()
+    assert not db.in_transaction
+    assert db.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+    with db:
+        db.execute("INSERT INTO t VALUES (2)")
+    db.close()
+
+    with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+        db.execute("SELECT 1")
+
+    db = pool.acquire()
+    assert db.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    db.close()
+
+
+def test_health_check(pool: ConnectionPool) -> None:
+    """Test that a broken idle connection is replaced.
+
+    Args:
+        pool (ConnectionPool): The pool.
+    """
+    pool.ping_interval = 0
+    db = pool.acquire()
+    broken: Connection = db._connection
+    db.close()
+    broken.close()
+
+    db = pool.acquire()
+    assert db._connection is not broken
+    assert db.execute("SELECT 1").fetchone()[0] == 1
+    assert pool.stats == {"open": 1, "idle": 0}
+    db.close()
+
+
+def test_connect_failure(pool: ConnectionPool, monkeypatch: Any) -> None:
+    """Test that a failed connection attempt gives its slot back.
+
+    Args:
+        pool (ConnectionPool): The pool.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+
+    def fail() -> None:
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(pool, "connect", fail)
+
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+
+    assert pool.stats == {"open": 0, "idle": 0}
+
+
+def test_after_fork(pool: ConnectionPool, monkeypatch: Any) -> None:
+    """Test that a forked process does not reuse its parent's connections.
+
+    Args:
+        pool (ConnectionPool): The pool.
+        monkeypatch (Any): The monkeypatch fixture.
+    """
+    db = pool.acquire()
+    parent: Connection = db._connection
+    db.close()
+
+    monkeypatch.setattr("os.getpid", lambda: -1)
+    db = pool.acquire()
+    assert db._connection is not parent
+    assert pool.stats == {"open": 1, "idle": 0}
+    db.close()
+    parent.close()
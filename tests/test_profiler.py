@@ -0,0 +1,210 @@
+"""Test the on-demand request profiler."""
+
+import os
+import threading
+import time
+from typing import Any, Generator, List
+
+from flask import Flask, Response
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr import create_app
+from flaskr.db import get_pool
+from flaskr.profiler import HEADER, list_profiles, make_token, Sampler, summarize
+from tests.conftest import AuthActions
+
+
+@pytest.fixture
+def profiled(app: Flask, tmp_path: Any) -> Generator:
+    """An app on the test database with the profiler on.
+
+    Args:
+        app (Flask): The flaskr application, whose database is used.
+        tmp_path (Any): The pytest temporary directory.
+
+    Yields:
+        Flask: The app.
+    """
+    profiled = create_app(
+        {
+            "TESTING": True,
+            "DATABASE": app.config["DATABASE"],
+            "PROFILER_ENABLED": True,
+            "PROFILER_DIR": str(tmp_path / "profiles"),
+            "PROFILER_ADMINS": ["test"],
+            "METRICS_DIR": app.config["METRICS_DIR"],
+            "JINJA_BYTECODE_CACHE": app.config["JINJA_BYTECODE_CACHE"],
+        }
+    )
+    yield profiled
+
+    with profiled.app_context():
+        get_pool().close()
+        get_pool(read_only=True).close()
+
+
+def _token(app: Flask, mode: str = "cprofile") -> str:
+    with app.app_context():
+        return make_token(mode)
+
+
+def test_disabled(app: Flask, client: FlaskClient) -> None:
+    """Test that the profiler is not installed unless enabled.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flaskr test client.
+    """
+    r: Response = client.get("/", headers={HEADER: _token(app)})
+    assert HEADER not in r.headers
+
+
+def test_cprofile(profiled: Flask) -> None:
+    """Test that a signed header has the request profiled with cProfile.
+
+    Args:
+        profiled (Flask): The app with the profiler on.
+    """
+    r: Response = profiled.test_client().get(
+        "/1?x=1", headers={HEADER: _token(profiled)}
+    )
+    assert r.status_code == 200
+
+    [profile] = list_profiles(profiled.config["PROFILER_DIR"])
+    assert profile["id"] == r.headers[HEADER]
+    assert profile["mode"] == "cprofile"
+    assert profile["status"] == 200
+    assert profile["method"] == "GET"
+    assert profile["path"] == "/1?x=1"
+    assert profile["endpoint"] == "blog.detail"
+    assert profile["error"] is None
+
+    path: str = os.path.join(profiled.config["PROFILER_DIR"], profile["id"] + ".pstats")
+    assert "function calls" in summarize(path, limit=5)
+
+
+@pytest.mark.parametrize(
+    "token", ("not-a-token", "sample.bad.signature", "unknown-mode")
+)
+def test_bad_token(profiled: Flask, token: str) -> None:
+    """Test that a request with a bad token is served but not profiled.
+
+    Args:
+        profiled (Flask): The app with the profiler on.
+        token (str): The header value.
+    """
+    if token == "unknown-mode":
+        token = _token(profiled, "unknown")
+
+    r: Response = profiled.test_client().get("/", headers={HEADER: token})
+    assert r.status_code == 200
+    assert HEADER not in r.headers
+    assert list_profiles(profiled.config["PROFILER_DIR"]) == []
+
+
+@pytest.mark.parametrize(
+    ("username", "profiled_request"), ((None, False), ("other", False), ("test", True))
+)
+def test_admin_flag(profiled: Flask, username: Any, profiled_request: bool) -> None:
+    """Test that only admins can profile a request with the query flag.
+
+    Args:
+        profiled (Flask): The app with the profiler on.
+        username (Any): Who is logged in, if anyone.
+        profiled_request (bool): Whether the request should be profiled.
+    """
+    client: FlaskClient = profiled.test_client()
+    if username is not None:
+        AuthActions(client).login(username, username)
+
+    r: Response = client.get("/?_profile=sample")
+    assert r.status_code == 200
+    assert (HEADER in r.headers) is profiled_request
+
+    if profiled_request:
+        [profile] = list_profiles(profiled.config["PROFILER_DIR"])
+        assert profile["mode"] == "sample"
+        assert os.path.exists(
+            os.path.join(profiled.config["PROFILER_DIR"], profile["id"] + ".collapsed")
+        )
+
+
+def test_sampler(tmp_path: Any) -> None:
+    """Test that the sampler records the stacks of the target thread.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+
+    def busy_function() -> None:
+        end: float = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    thread = threading.Thread(target=busy_function)
+    thread.start()
+    assert thread.ident is not None
+    sampler = Sampler(thread.ident, 0.001)
+    sampler.start()
+    thread.join()
+    sampler.stop()
+
+    assert sum(sampler.stacks.values()) > 5
+    assert any(
+        stack.split(";")[-1].startswith("busy_function (") for stack in sampler.stacks
+    )
+
+    path = str(tmp_path / "a.collapsed")
+    sampler.dump(path)
+    summary: str = summarize(path)
+    assert f"{sum(sampler.stacks.values())} samples" in summary
+    assert "busy_function" in summary
+
+
+def test_prune(profiled: Flask) -> None:
+    """Test that only the newest PROFILER_KEEP profiles are kept.
+
+    Args:
+        profiled (Flask): The app with the profiler on.
+    """
+    profiled.config["PROFILER_KEEP"] = 2
+    client: FlaskClient = profiled.test_client()
+    ids: List[str] = [
+        client.get("/", headers={HEADER: _token(profiled)}).headers[HEADER]
+        for _ in range(3)
+    ]
+
+    kept = [p["id"] for p in list_profiles(profiled.config["PROFILER_DIR"])]
+    assert len(kept) == 2
+    assert len(os.listdir(profiled.config["PROFILER_DIR"])) == 4
+    assert set(kept) <= set(ids)
+
+
+def test_profiles_command(profiled: Flask) -> None:
+    """Test the token, list and show commands.
+
+    Args:
+        profiled (Flask): The app with the profiler on.
+    """
+    runner = profiled.test_cli_runner()
+    header: str = runner.invoke(args=["profiles", "token"]).output.strip()
+    name, _, token = header.partition(": ")
+    assert name == HEADER
+
+    profile_id: str = profiled.test_client().get("/", headers={name: token}).headers[
+        HEADER
+    ]
+
+    result = runner.invoke(args=["profiles", "list"])
+    assert profile_id in result.output
+    assert "cprofile" in result.output
+    assert "GET /" in result.output
+
+    result = runner.invoke(args=["profiles", "show", profile_id, "-n", "3"])
+    assert result.exit_code == 0
+    assert "function calls" in result.output
+
+    result = runner.invoke(args=["profiles", "show", "missing"])
+    assert result.exit_code != 0
+    assert "No profile 'missing'" in result.output
@@ -0,0 +1,49 @@
+"""Test the query layer and its records."""
+
+from datetime import datetime
+
+from flask import Flask
+import pytest
+
+from flaskr import queries
+from flaskr.db import get_db
+from flaskr.queries import Post, User
+
+
+def test_record() -> None:
+    """Test that records read like attributes and like sqlite3.Row."""
+    user = User(1, "test")
+    assert user.id == user["id"] == 1
+    assert user.password is None
+    assert user == User(1, "test", None)
+    assert repr(user) == "User(id=1, username='test', password=None)"
+
+    with pytest.raises(KeyError):
+        user["missing"]
+    with pytest.raises(AttributeError):
+        user.missing = True  # type: ignore
+
+
+def test_fetch(app: Flask) -> None:
+    """Test that rows are read into records.
+
+    Args:
+        app (Flask): The flaskr application.
+    """
+    with app.app_context():
+        db = get_db()
+        (post,) = queries.fetch(db, Post, queries.LATEST_POSTS, 10)
+        assert post == Post(
+            1, "test title", datetime(2018, 1, 1), 1, "test", "test\nbody"
+        )
+        assert post.body is None
+
+        full = queries.get_post(db, 1)
+        assert full is not None
+        assert (full.id, full.body, full.body_html) == (1, "test\nbody", "test\nbody")
+        assert queries.get_post(db, 2) is None
+
+        user = queries.get_user_by_username(db, "test")
+        assert user is not None
+        assert user.password.startswith("pbkdf2:")  # type: ignore
+        assert queries.get_user(db, 1) == User(1, "test")
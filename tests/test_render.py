@@ -0,0 +1,75 @@
+"""Test the rendering of post bodies."""
+
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskClient, FlaskCliRunner
+import pytest
+
+from flaskr.db import get_db
+from flaskr.render import make_excerpt, render_body
+
+
+@pytest.mark.parametrize(
+    ("body", "length", "expected"),
+    (
+        ("short", 10, "short"),
+        ("  padded\n", 6, "padded"),
+        ("one two three", 10, "one two…"),
+        ("one two three", 9, "one two…"),
+        ("unbroken", 5, "unbr…"),
+    ),
+)
+def test_make_excerpt(body: str, length: int, expected: str) -> None:
+    """Test that excerpts are cut between words and bounded.
+
+    Args:
+        body (str): The body.
+        length (int): The excerpt length.
+        expected (str): The excerpt.
+    """
+    assert make_excerpt(body, length) == expected
+    assert len(make_excerpt(body, length)) <= length
+
+
+def test_render_body() -> None:
+    """Test that markup in bodies is escaped."""
+    assert render_body("<script>x</script>\n&") == (
+        "&lt;script&gt;x&lt;/script&gt;\n&amp;"
+    )
+
+
+def test_index_shows_excerpt(app: Flask, client: FlaskClient, auth: Any) -> None:
+    """Test that the index shows the excerpt and the post page the full body.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        auth (Any): The class with the auth methods.
+    """
+    app.config["EXCERPT_LENGTH"] = 20
+    auth.login()
+    body = "<em>first</em> " + "word " * 20
+    client.post("/create", data={"title": "long", "body": body})
+
+    index = client.get("/").data
+    assert b"&lt;em&gt;first&lt;/em&gt; word\xe2\x80\xa6" in index
+    assert index.count(b"word") == 1
+
+    detail = client.get("/2").data
+    assert b"&lt;em&gt;first&lt;/em&gt;" in detail
+    assert detail.count(b"word") == 20
+
+
+def test_posts_render_command(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test rendering every post again after the excerpt length changes.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    app.config["EXCERPT_LENGTH"] = 5
+    assert "Rendered 1 posts" in runner.invoke(args=["posts-render"]).output
+
+    with app.app_context():
+        assert get_db().execute("SELECT excerpt FROM post").fetchone()[0] == "test…"
@@ -0,0 +1,121 @@
+"""Test full-text search."""
+
+from sqlite3 import Connection
+
+from flask import Flask, Response
+from flask.testing import FlaskClient, FlaskCliRunner
+import pytest
+
+from flaskr.blog import highlight, to_match_query
+from flaskr.db import get_db
+
+
+@pytest.mark.parametrize(
+    ("q", "expected"),
+    (
+        ("test body", '"test" "body"'),
+        ('bo* OR "x', '"bo"* "OR" "x"'),
+        ("  -- ", ""),
+    ),
+)
+def test_to_match_query(q: str, expected: str) -> None:
+    """Test that user input cannot inject FTS5 syntax.
+
+    Args:
+        q (str): The search terms.
+        expected (str): The MATCH expression.
+    """
+    assert to_match_query(q) == expected
+
+
+def test_highlight() -> None:
+    """Test that snippets are escaped before the marks are added."""
+    assert highlight("<b>\x02hit\x03</b>") == "&lt;b&gt;<mark>hit</mark>&lt;/b&gt;"
+
+
+def test_search(client: FlaskClient) -> None:
+    """Test that matches are highlighted.
+
+    Args:
+        client (FlaskClient): The flask testing client.
+    """
+    assert client.get("/search").status_code == 200
+
+    r: Response = client.get("/search?q=bod*")
+    assert b"<mark>body</mark>" in r.data
+    assert b'href="/1"' in r.data
+
+    assert b"No posts match" in client.get("/search?q=missing").data
+
+
+def test_search_follows_writes(app: Flask, client: FlaskClient) -> None:
+    """Test that the triggers keep the index in step with the post table.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute("UPDATE post SET body = 'replaced' WHERE id = 1")
+        db.execute("INSERT INTO post (title, body, author_id) VALUES ('new', 'x', 1)")
+        db.commit()
+
+    assert b"No posts match" in client.get("/search?q=body").data
+    assert b"<mark>replaced</mark>" in client.get("/search?q=replaced").data
+    assert b"<mark>new</mark>" in client.get("/search?q=new").data
+
+    with app.app_context():
+        db = get_db()
+        db.execute("DELETE FROM post")
+        db.commit()
+
+    assert b"No posts match" in client.get("/search?q=new").data
+
+
+def test_search_ranking_and_pages(app: Flask, client: FlaskClient) -> None:
+    """Test that title matches rank first and results are paginated.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["SEARCH_PER_PAGE"] = 1
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute(
+            "INSERT INTO post (title, body, author_id) VALUES ('body', 'other', 1)"
+        )
+        db.commit()
+
+    first: Response = client.get("/search?q=body")
+    assert b"<mark>body</mark></a></h1>" in first.data
+    assert b'href="/search?q=body&amp;page=2"' in first.data
+
+    second: Response = client.get("/search?q=body&page=2")
+    assert b"test title" in second.data
+    assert b"Next" not in second.data
+    assert b'href="/search?q=body&amp;page=1"' in second.data
+
+
+def test_search_rebuild_command(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test rebuilding the index from scratch.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    with app.app_context():
+        db: Connection = get_db()
+        db.execute("INSERT INTO post_search (post_search) VALUES ('delete-all')")
+        db.commit()
+
+    assert "Indexed 1 posts" in runner.invoke(args=["search-rebuild"]).output
+
+    with app.app_context():
+        assert (
+            get_db()
+            .execute("SELECT rowid FROM post_search WHERE post_search MATCH 'body'")
+            .fetchone()[0]
+            == 1
+        )
@@ -0,0 +1,48 @@
+"""Test the startup timer and the lazy command group."""
+
+import time
+
+from flask import Flask
+from flask.testing import FlaskCliRunner
+
+from flaskr.startup import LazyGroup, StartupTimer
+
+
+def test_timer() -> None:
+    """Test that the time of a phase entered twice is added up."""
+    timer = StartupTimer()
+    with timer.phase("one"):
+        time.sleep(0.01)
+    with timer.phase("two"):
+        pass
+    with timer.phase("one"):
+        time.sleep(0.01)
+
+    assert list(timer.phases) == ["one", "two"]
+    assert timer.phases["one"] >= 0.02
+    assert timer.total == timer.phases["one"] + timer.phases["two"]
+
+
+def test_lazy_commands(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test that a lazy command is listed, and imported when run.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    assert isinstance(app.cli, LazyGroup)
+    for name in ("loadtest", "posts-render", "search-rebuild"):
+        assert name in app.cli.lazy_commands
+        assert name not in app.cli.commands
+
+    result = runner.invoke(args=["--help"])
+    assert "loadtest" in result.output
+    assert "init-db" in result.output
+
+    result = runner.invoke(args=["loadtest", "--help"])
+    assert "--mix" in result.output
+    assert "loadtest" not in app.cli.lazy_commands
+    assert "loadtest" in app.cli.commands
+
+    result = runner.invoke(args=["missing"])
+    assert result.exit_code != 0
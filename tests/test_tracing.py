@@ -0,0 +1,107 @@
+"""Test the SQL instrumentation."""
+
+import logging
+import sqlite3
+from typing import Any
+
+from flask import Flask, g
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr.db import get_db
+from flaskr.pool import PooledConnection
+from flaskr.tracing import QueryStats, TracedConnection
+
+
+def test_disabled_by_default(app: Flask, client: FlaskClient) -> None:
+    """Test that the connection is not wrapped unless tracing is on.
+
+    Args:
+        app (Flask): The Flask application.
+        client (FlaskClient): The flask testing client.
+    """
+    with app.app_context():
+        assert isinstance(get_db(), PooledConnection)
+        assert "sql_stats" not in g
+
+    assert "Server-Timing" not in client.get("/").headers
+
+
+def test_server_timing(app: Flask, client: FlaskClient) -> None:
+    """Test that a traced request reports its queries.
+
+    Args:
+        app (Flask): The Flask application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["SQL_TRACE"] = True
+
+    with client:
+        timing: str = client.get("/").headers["Server-Timing"]
+        assert g.sql_stats.count == 2
+        assert g.sql_stats.slowest_sql.startswith("SELECT")
+
+    assert timing.startswith("db;dur=")
+    assert 'desc="2 queries"' in timing
+    assert "db-slowest;dur=" in timing
+
+
+def test_slow_query_log(app: Flask, caplog: Any) -> None:
+    """Test that statements over the threshold are logged.
+
+    Args:
+        app (Flask): The Flask application.
+        caplog (Any): The log capture fixture.
+    """
+    app.config["SQL_SLOW_QUERY_MS"] = 0
+
+    with app.app_context(), caplog.at_level(logging.WARNING, "flaskr.sql"):
+        db: Any = get_db()
+        assert isinstance(db, TracedConnection)
+        db.execute("SELECT 1")
+        assert "sql_stats" not in g
+
+    assert "Slow query" in caplog.text
+    assert "SELECT 1" in caplog.text
+
+
+def test_traced_connection(app: Flask) -> None:
+    """Test that every kind of statement is recorded, even when it fails.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    stats = QueryStats()
+
+    with app.app_context():
+        db = TracedConnection(get_db(), stats)
+        with db:
+            db.execute("CREATE TABLE t (x)")
+            db.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        db.executescript("DROP TABLE t;")
+
+        with pytest.raises(sqlite3.OperationalError):
+            db.execute("SELECT * FROM t")
+
+        assert not db.in_transaction
+
+    assert stats.count == 4
+    assert stats.total >= stats.slowest > 0
+
+
+def test_traced_connection_setattr(app: Flask) -> None:
+    """Test that attributes are set on the wrapped connection.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config["SQL_TRACE"] = True
+
+    with app.app_context():
+        db: Any = get_db()
+        assert isinstance(db, TracedConnection)
+
+        db.row_factory = None
+        assert db._connection.row_factory is None
+        assert isinstance(db.execute("SELECT 1").fetchone(), tuple)
+        db.row_factory = sqlite3.Row
@@ -0,0 +1,62 @@
+"""Test the template bytecode cache and the warmup."""
+
+import os
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskCliRunner
+
+from flaskr import create_app
+from flaskr.cache import get_cache
+from flaskr.db import get_pool
+
+
+def test_bytecode_cache(tmp_path: Any) -> None:
+    """Test that compiled templates are written under the cache directory.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    cache_dir = str(tmp_path / "jinja")
+    app = create_app({"TESTING": True, "JINJA_BYTECODE_CACHE": cache_dir})
+    app.jinja_env.get_template("base.html")
+    assert len(os.listdir(cache_dir)) == 1
+
+    app = create_app({"TESTING": True, "JINJA_BYTECODE_CACHE": None})
+    assert app.jinja_env.bytecode_cache is None
+
+
+def test_warmup_command(app: Flask, runner: FlaskCliRunner) -> None:
+    """Test that the warmup fills the pools and the page cache.
+
+    Args:
+        app (Flask): The flaskr application.
+        runner (FlaskCliRunner): The runner used to invoke click.
+    """
+    app.config["DATABASE_POOL_SIZE"] = 3
+    result = runner.invoke(args=["warmup"])
+    templates = len(app.jinja_env.list_templates())
+    assert f"{templates} templates, 4 connections, 1 pages ready in" in result.output
+
+    with app.app_context():
+        assert get_pool(read_only=True).stats == {"open": 3, "idle": 3}
+        assert len(get_cache("page")) == 1
+
+
+def test_warmup_on_startup(tmp_path: Any) -> None:
+    """Test that a missing database does not stop the app from starting.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    database = str(tmp_path / "missing.sqlite")
+    app = create_app(
+        {
+            "TESTING": True,
+            "DATABASE": database,
+            "WARMUP_ON_STARTUP": True,
+            "JINJA_BYTECODE_CACHE": str(tmp_path / "jinja-cache"),
+        }
+    )
+    assert app.jinja_env.cache
+    assert not os.path.exists(database)
@@ -0,0 +1,212 @@
+"""Test the group-commit write queue."""
+
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+from sqlite3 import Connection
+import threading
+from typing import Any, List
+
+from flask import Flask
+from flask.testing import FlaskClient
+import pytest
+
+from flaskr.db import get_db
+from flaskr.pool import ConnectionPool
+from flaskr.writequeue import get_write_queue, WriteQueue, WriteQueueTimeoutError
+
+
+@pytest.fixture
+def write_queue(tmp_path: Any) -> Any:
+    """A write queue over a table with a unique column.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+
+    Yields:
+        WriteQueue: The queue, closed afterwards.
+    """
+    pool = ConnectionPool(str(tmp_path / "queue.sqlite"), size=1)
+    db = pool.acquire()
+    db.execute("CREATE TABLE item (name TEXT UNIQUE)")
+    db.commit()
+    db.close()
+
+    write_queue = WriteQueue(pool, max_batch=8, max_delay=0.05)
+    yield write_queue
+    write_queue.close()
+    pool.close()
+
+
+def _insert(name: str) -> Any:
+    return lambda db: db.execute("INSERT INTO item VALUES (?)", (name,)).lastrowid
+
+
+def _names(write_queue: WriteQueue) -> List[str]:
+    db = write_queue.pool.acquire()
+    names = [row[0] for row in db.execute("SELECT name FROM item ORDER BY name")]
+    db.close()
+    return names
+
+
+def test_writes_are_batched(write_queue: WriteQueue, monkeypatch: Any) -> None:
+    """Test that concurrent writes share commits.
+
+    Args:
+        write_queue (WriteQueue): The queue.
+        monkeypatch (Any): The pytest monkeypatch fixture.
+    """
+    batches: List[int] = []
+    commit = write_queue._commit
+
+    def counted_commit(batch: List[Any]) -> None:
+        batches.append(len(batch))
+        commit(batch)
+
+    monkeypatch.setattr(write_queue, "_commit", counted_commit)
+
+    with ThreadPoolExecutor(8) as pool:
+        rowids = list(
+            pool.map(write_queue.submit, [_insert(str(n)) for n in range(16)])
+        )
+
+    assert sorted(rowids) == list(range(1, 17))
+    assert sum(batches) == 16
+    assert len(batches) < 16
+    assert max(batches) <= 8
+    assert len(_names(write_queue)) == 16
+
+
+def test_failed_write_is_rolled_back_alone(write_queue: WriteQueue) -> None:
+    """Test that one failing write does not undo the rest of its batch.
+
+    Args:
+        write_queue (WriteQueue): The queue.
+    """
+    write_queue.submit(_insert("taken"))
+
+    def duplicate() -> None:
+        with pytest.raises(sqlite3.IntegrityError):
+            write_queue.submit(_insert("taken"))
+
+    thread = threading.Thread(target=duplicate)
+    thread.start()
+    write_queue.submit(_insert("free"))
+    thread.join()
+
+    assert _names(write_queue) == ["free", "taken"]
+
+
+def test_timed_out_write_is_not_committed(write_queue: WriteQueue) -> None:
+    """Test that a write whose caller gave up waiting is skipped.
+
+    Args:
+        write_queue (WriteQueue): The queue.
+    """
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(db: Connection) -> None:
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=write_queue.submit, args=(slow,))
+    thread.start()
+    started.wait(5)
+
+    write_queue.timeout = 0.01
+    with pytest.raises(WriteQueueTimeoutError):
+        write_queue.submit(_insert("late"))
+    release.set()
+    thread.join()
+
+    write_queue.timeout = 10.0
+    write_queue.submit(_insert("next"))
+    assert _names(write_queue) == ["next"]
+
+
+def test_commits_are_synced(tmp_path: Any) -> None:
+    """Test that batches commit with synchronous=FULL and restore the pool's.
+
+    Args:
+        tmp_path (Any): The pytest temporary directory.
+    """
+    pool = ConnectionPool(
+        str(tmp_path / "sync.sqlite"),
+        size=1,
+        pragmas={"journal_mode": "wal", "synchronous": "normal"},
+    )
+    write_queue = WriteQueue(pool)
+    try:
+        level = write_queue.submit(
+            lambda db: db.execute("PRAGMA synchronous").fetchone()[0]
+        )
+        db = pool.acquire()
+        assert db.execute("PRAGMA synchronous").fetchone()[0] == 1
+        db.close()
+    finally:
+        write_queue.close()
+        pool.close()
+
+    assert level == 2
+
+
+def test_close(write_queue: WriteQueue) -> None:
+    """Test that the thread stops on close and starts again on the next write.
+
+    Args:
+        write_queue (WriteQueue): The queue.
+    """
+    write_queue.submit(_insert("a"))
+    thread: Any = write_queue._thread
+    write_queue.close()
+    assert not thread.is_alive()
+
+    write_queue.submit(_insert("b"))
+    assert _names(write_queue) == ["a", "b"]
+
+
+def test_blog_write_queue_timeout(
+    app: Flask, client: FlaskClient, monkeypatch: Any
+) -> None:
+    """Test that a write queue timeout is answered with a 503.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+        monkeypatch (Any): The pytest monkeypatch fixture.
+    """
+    app.config["WRITE_QUEUE_ENABLED"] = True
+    client.post("/auth/login", data={"username": "test", "password": "test"})
+
+    def busy(write: Any) -> None:
+        raise WriteQueueTimeoutError("Write not started after 0s; the writer is busy.")
+
+    with app.app_context():
+        monkeypatch.setattr(get_write_queue(), "submit", busy)
+
+    response = client.post("/create", data={"title": "late", "body": ""})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_blog_writes_through_queue(app: Flask, client: FlaskClient) -> None:
+    """Test creating, updating and deleting posts with the queue enabled.
+
+    Args:
+        app (Flask): The flaskr application.
+        client (FlaskClient): The flask testing client.
+    """
+    app.config["WRITE_QUEUE_ENABLED"] = True
+    client.post("/auth/login", data={"username": "test", "password": "test"})
+
+    client.post("/create", data={"title": "queued", "body": ""})
+    client.post("/1/update", data={"title": "updated", "body": ""})
+    client.post("/1/delete")
+
+    with app.app_context():
+        db: Connection = get_db()
+        assert [row["title"] for row in db.execute("SELECT title FROM post")] == [
+            "queued"
+        ]
+        assert get_write_queue()._thread is not None
+        get_write_queue().close()